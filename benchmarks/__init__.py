@@ -0,0 +1 @@
+# Benchmarks de rendimiento del proyecto (scraping, pipelines y ETL)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: reporte del ETL desde el cubo de agregados.
+
+Compara el reporte original (máscaras booleanas por moneda y un
+value_counts por distribución, sobre las filas) con calcular el cubo en una
+sola agrupación y leer el reporte de él, sobre el mismo CSV consolidado
+sintético. Las estadísticas de los dos caminos tienen que coincidir.
+"""
+
+import argparse
+import math
+import os
+import tempfile
+import time
+
+from benchmarks.bench_excel import preparar_csv
+from benchmarks.fixtures import parse_size, size_arg
+from etl import cubo, reporte
+
+
+def reporte_original(df):
+    """Las estadísticas como se calculaban antes del cubo"""
+    estadisticas = {}
+    for moneda in df['moneda_original'].dropna().unique():
+        subset = df[df['moneda_original'] == moneda]
+        estadisticas[f'cantidad_{moneda}'] = len(subset)
+        estadisticas[f'promedio_{moneda}'] = subset['precio_alquiler_original'].mean()
+        estadisticas[f'min_{moneda}'] = subset['precio_alquiler_original'].min()
+        estadisticas[f'max_{moneda}'] = subset['precio_alquiler_original'].max()
+    estadisticas.update({
+        'precio_promedio_ars': df[df['moneda_original'] == 'ARS']['precio_alquiler_original'].mean(),
+        'precio_promedio_usd': df[df['moneda_original'] == 'USD']['precio_alquiler_original'].mean(),
+        'precio_promedio_total_ars': df['precio_alquiler'].mean(),
+        'precio_mediano_total_ars': df['precio_alquiler'].median(),
+        'superficie_promedio': df['superficie'].mean(),
+        'ambientes': df['ambientes'].value_counts().to_dict(),
+        'barrios': df['barrio'].value_counts().to_dict(),
+    })
+    return estadisticas
+
+
+def reporte_cubo(tabla):
+    """Las mismas estadísticas, leídas del cubo"""
+    estadisticas = {}
+    for moneda, fila in cubo.agregar(tabla, ['moneda_original']).iterrows():
+        estadisticas[f'cantidad_{moneda}'] = fila['propiedades']
+        estadisticas[f'promedio_{moneda}'] = fila['precio_alquiler_original_media']
+        estadisticas[f'min_{moneda}'] = fila['precio_alquiler_original_min']
+        estadisticas[f'max_{moneda}'] = fila['precio_alquiler_original_max']
+    total = cubo.total(tabla)
+    estadisticas.update({
+        'precio_promedio_ars': estadisticas['promedio_ARS'],
+        'precio_promedio_usd': estadisticas['promedio_USD'],
+        'precio_promedio_total_ars': total['precio_alquiler_media'],
+        'precio_mediano_total_ars': total['precio_alquiler_mediana'],
+        'superficie_promedio': total['superficie_media'],
+        'ambientes': cubo.agregar(tabla, ['ambientes'])['propiedades'].to_dict(),
+        'barrios': cubo.agregar(tabla, ['barrio'])['propiedades'].to_dict(),
+    })
+    return estadisticas
+
+
+def iguales(a, b):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(iguales(a[k], b[k]) for k in a)
+    return math.isclose(float(a), float(b), rel_tol=1e-9)
+
+
+def medir(funcion, *args, repeticiones=3):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        start = time.perf_counter()
+        resultado = funcion(*args)
+        mejor = min(mejor, time.perf_counter() - start)
+    return resultado, mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=size_arg, default='1m', help='filas del CSV consolidado')
+    args = parser.parse_args()
+
+    n = parse_size(args.size)
+    csv_path = os.path.join(tempfile.mkdtemp(prefix='bench_cubo_'), 'propiedades_transformadas.csv')
+    preparar_csv(csv_path, n)
+    df = reporte.cargar_dataset(csv_path)
+
+    original, t_original = medir(reporte_original, df)
+    tabla, t_cubo = medir(cubo.calcular, df)
+    desde_cubo, t_lectura = medir(reporte_cubo, tabla)
+    print(f"{n:,} filas, cubo de {len(tabla) - 1:,} celdas")
+    print(f"{'camino':<28}{'segundos':>10}")
+    print(f"{'reporte sobre las filas':<28}{t_original:>10.3f}")
+    print(f"{'calcular el cubo':<28}{t_cubo:>10.3f}")
+    print(f"{'reporte desde el cubo':<28}{t_lectura:>10.3f}")
+    if not iguales(original, desde_cubo):
+        print("⚠️ las estadísticas del cubo no coinciden con las originales")
+        raise SystemExit(1)
+    print("Estadísticas idénticas")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: items/seg del sink sqlite de ExportPipeline contra el INSERT +
+commit por item.
+
+El camino previo hacía un INSERT OR REPLACE y un commit() (un fsync) por
+propiedad en el hilo del reactor. ExportPipeline entrega lotes de
+EXPORT_FLUSH_ITEMS filas al sink sqlite, que los encola y un hilo escritor los
+inserta con executemany en modo WAL. El tiempo medido incluye el close_spider
+(el vaciado de la cola).
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.fixtures import synthetic_items
+
+FIELDS = (
+    'precio_alquiler', 'expensas', 'precio_total', 'direccion', 'zona', 'superficie',
+    'ambientes', 'habitaciones', 'banos', 'descripcion', 'url', 'scraped_at',
+)
+
+
+class PerItemCommitSink:
+    """Un INSERT OR REPLACE + commit por item, como el pipeline de base de datos original"""
+
+    def __init__(self, db_path):
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute(f'''
+            CREATE TABLE IF NOT EXISTS propiedades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {', '.join(FIELDS)},
+                UNIQUE(direccion, precio_alquiler)
+            )
+        ''')
+        self.connection.commit()
+        self.sql = f"INSERT OR REPLACE INTO propiedades ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})"
+
+    def process_item(self, item, spider):
+        self.connection.execute(self.sql, tuple(item.get(f) for f in FIELDS))
+        self.connection.commit()
+        return item
+
+    def close_spider(self, spider):
+        self.connection.close()
+
+
+def run(sink, items, spider):
+    start = time.perf_counter()
+    if hasattr(sink, 'open_spider'):
+        sink.open_spider(spider)
+    for item in items:
+        sink.process_item(item, spider)
+    sink.close_spider(spider)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    from scrapy import Spider
+    from scrapy.settings import Settings
+    from mercado_inmobiliario.pipelines import ExportPipeline
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    spider = Spider(name='benchmark')
+    items = list(synthetic_items(args.items))
+    for item in items:
+        item['precio_total'] = (item['precio_alquiler'] or 0) + (item['expensas'] or 0)
+    workdir = tempfile.mkdtemp(prefix='bench_database_')
+
+    sinks = [
+        ('commit por item', lambda path: PerItemCommitSink(path)),
+        (f'lotes de {args.batch_size} (hilo)', lambda path: ExportPipeline(
+            ['sqlite'], Settings({'DATABASE_PATH': path}), flush_items=args.batch_size,
+        )),
+    ]
+    print(f"{args.items} items")
+    for label, factory in sinks:
+        path = os.path.join(workdir, f'{len(os.listdir(workdir))}.db')
+        rate = run(factory(path), items, spider)
+        rows = sqlite3.connect(path).execute('SELECT COUNT(*) FROM propiedades').fetchone()[0]
+        print(f"  {label:<24}{rate:>12.0f} items/seg  ({rows} filas)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: motores del ETL (pandas contra el plan lazy de Polars).
+
+Para cada tamaño se transforma el mismo snapshot sintético (lectura,
+duplicados, columnas derivadas y ESQUEMA, sin escribir salidas) con cada
+motor, en un proceso aparte para medir también el RSS pico. Las salidas se
+comparan con un hash de todas las filas en orden: deben ser idénticas.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import pandas as pd
+
+from benchmarks.fixtures import json_snapshot, parse_size, size_arg
+from etl import backends, snapshots, transform
+
+
+def transformar_snapshot(backend, path, chunk_size):
+    """(filas, hash de las filas, segundos) de transformar `path` con `backend`"""
+    motor = backends.crear_backend(backend, chunk_size)
+    digest = hashlib.blake2b(digest_size=16)
+    filas = 0
+    start = time.perf_counter()
+    for _, derivado in motor.lotes(path, snapshots.snapshot_name(path), '2025-01-01'):
+        df = transform.aplicar_esquema(derivado, Counter())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        filas += len(df)
+    return filas, digest.hexdigest(), time.perf_counter() - start
+
+
+def medir(backend, path, chunk_size):
+    """Corre transformar_snapshot en un proceso hijo y agrega su RSS pico"""
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.bench_etl_backends', '--run', backend, path,
+         '--chunk-size', str(chunk_size)],
+        stdout=subprocess.PIPE,
+    )
+    salida = proc.stdout.read()
+    # wait4 devuelve el uso de recursos sólo de este hijo (RSS pico incluido)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"El motor {backend} falló sobre {path}")
+    resultado = json.loads(salida)
+    resultado['rss_mb'] = rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=size_arg, nargs='+', default=['100k', '1m'],
+                        help='tamaños de snapshot (ej. 20k, 1m)')
+    parser.add_argument('--backends', nargs='+', default=sorted(backends.BACKENDS), choices=sorted(backends.BACKENDS))
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='jsonl', help='formato del snapshot')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--run', nargs=2, metavar=('BACKEND', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        filas, digest, segundos = transformar_snapshot(*args.run, args.chunk_size)
+        print(json.dumps({'filas': filas, 'hash': digest, 'segundos': segundos}))
+        return
+
+    print(f"{'tamaño':>8}{'motor':>9}{'filas/s':>12}{'segundos':>10}{'RSS MB':>9}  salida")
+    for size in args.sizes:
+        path = json_snapshot(size, lines=args.format == 'jsonl')
+        hashes = set()
+        for backend in args.backends:
+            resultado = medir(backend, path, args.chunk_size)
+            hashes.add(resultado['hash'])
+            print(
+                f"{size:>8}{backend:>9}{parse_size(size) / resultado['segundos']:>12,.0f}"
+                f"{resultado['segundos']:>10.2f}{resultado['rss_mb']:>9.0f}  {resultado['hash'][:12]}"
+            )
+        if len(hashes) > 1:
+            print(f"⚠️ {size}: los motores produjeron salidas distintas")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
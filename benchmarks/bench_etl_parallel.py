@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: escalado del ETL con --workers (pool de procesos por snapshot/partición).
+
+Se arma un directorio con --snapshots snapshots JSON Lines sintéticos de
+--size propiedades (uno por día) y se corre etl_propiedades.py completo
+(sin Excel ni gráficos) con cada cantidad de workers. Las salidas tienen que
+ser idénticas en todas las corridas. El merge y la escritura de las salidas
+corren en el proceso principal, así que acotan el speedup alcanzable.
+"""
+
+import argparse
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fixtures import ROOT_DIR, json_snapshot, parse_size, size_arg
+
+ETL_SCRIPT = os.path.join(ROOT_DIR, 'etl', 'etl_propiedades.py')
+
+
+def preparar(base_dir, snapshots, size):
+    """output/ con un snapshot por día (enlaces a los fixtures cacheados)"""
+    output_dir = os.path.join(base_dir, 'output')
+    os.makedirs(output_dir, exist_ok=True)
+    for dia in range(snapshots):
+        destino = os.path.join(output_dir, f'zonaprop_propiedades_202501{dia + 1:02d}_000000.jsonl')
+        os.symlink(json_snapshot(size, seed=dia, lines=True), destino)
+
+
+def digest_csv(path):
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def correr(base_dir, workers, backend, partition_mb):
+    cmd = [
+        sys.executable, ETL_SCRIPT, '--base-dir', base_dir, '--full', '--no-excel', '--no-charts',
+        '--workers', str(workers), '--backend', backend, '--partition-mb', str(partition_mb),
+    ]
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, env=dict(os.environ, MPLBACKEND='Agg'))
+    return time.perf_counter() - start
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--snapshots', type=int, default=8)
+    parser.add_argument('--size', type=size_arg, default='100k', help='propiedades por snapshot')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, cpus} & set(range(1, cpus + 1))) or [1])
+    parser.add_argument('--backend', default='pandas')
+    parser.add_argument('--partition-mb', type=int, default=256)
+    args = parser.parse_args()
+
+    base_dir = tempfile.mkdtemp(prefix='bench_etl_parallel_')
+    preparar(base_dir, args.snapshots, args.size)
+    filas = args.snapshots * parse_size(args.size)
+    csv_path = os.path.join(base_dir, 'data', 'propiedades_transformadas.csv')
+    print(f"{args.snapshots} snapshots de {args.size} ({filas:,} filas), motor {args.backend}, {cpus} CPUs")
+    print(f"{'workers':>8}{'segundos':>10}{'filas/s':>10}{'speedup':>9}{'eficiencia':>12}  salida")
+
+    base = None
+    hashes = set()
+    for workers in args.workers:
+        elapsed = correr(base_dir, workers, args.backend, args.partition_mb)
+        base = base or elapsed
+        hashes.add(digest_csv(csv_path))
+        print(
+            f"{workers:>8}{elapsed:>10.2f}{filas / elapsed:>10,.0f}{base / elapsed:>8.2f}x"
+            f"{base / elapsed / workers:>12.0%}  {digest_csv(csv_path)}"
+        )
+    if len(hashes) > 1:
+        print("⚠️ las salidas difieren entre corridas")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
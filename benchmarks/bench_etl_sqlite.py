@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: upsert incremental del ETL en SQLite a medida que crece la tabla.
+
+Cada "día" es un snapshot sintético de --rows avisos (los mismos IDs con otra
+fecha de snapshot), cargado con etl.outputs.SqliteOutput: upsert por chunks,
+índices y ANALYZE acotado. Al final se compara con la carga anterior
+(``to_sql(if_exists='replace')`` de toda la tabla en cada corrida).
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from benchmarks.fixtures import synthetic_items
+from etl import outputs, transform
+
+
+def snapshot_dia(rows, dia):
+    fecha = date(2025, 1, 1) + timedelta(days=dia)
+    crudo = pd.DataFrame.from_records(list(synthetic_items(rows, seed=dia)))
+    return transform.transformar(crudo, f'zonaprop_propiedades_{fecha:%Y%m%d}_000000.jsonl', fecha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000, help='avisos por snapshot')
+    parser.add_argument('--days', type=int, default=12, help='snapshots a cargar')
+    parser.add_argument('--skip-replace', action='store_true', help='no medir la carga con to_sql replace')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_etl_sqlite_')
+    path = os.path.join(workdir, 'propiedades.db')
+    print(f"{args.days} snapshots de {args.rows} filas en {path}")
+    print(f"{'día':>4}{'filas en tabla':>16}{'upsert s':>10}{'filas/s':>10}{'índices s':>11}{'ANALYZE s':>11}")
+
+    cargados = []
+    for dia in range(args.days):
+        df = snapshot_dia(args.rows, dia)
+        if not args.skip_replace:
+            cargados.append(df)
+        salida = outputs.SqliteOutput(path)
+        salida.append(df)
+        salida.finalize()
+        total, = salida.connection.execute('SELECT COUNT(*) FROM propiedades').fetchone()
+        tiempos = salida.tiempos
+        print(
+            f"{dia + 1:>4}{total:>16,}{tiempos['upsert']:>10.2f}{len(df) / tiempos['upsert']:>10,.0f}"
+            f"{tiempos['indices']:>11.2f}{tiempos['analyze']:>11.2f}"
+        )
+        salida.close()
+
+    if not args.skip_replace:
+        from sqlalchemy import create_engine
+
+        todo = pd.concat(cargados, ignore_index=True)
+        del cargados
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'replace.db')}")
+        start = time.perf_counter()
+        todo.to_sql('propiedades', engine, if_exists='replace', index=False)
+        elapsed = time.perf_counter() - start
+        print(f"Carga anterior (to_sql replace de {len(todo):,} filas): {elapsed:.2f} s por corrida")
+
+
+if __name__ == '__main__':
+    main()
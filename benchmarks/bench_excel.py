@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: exportación del Excel del ETL.
+
+Compara ``pd.read_csv(...).to_excel(...)`` (el libro completo en memoria)
+con outputs.write_excel (openpyxl write-only, leyendo el CSV por chunks)
+sobre un CSV consolidado sintético. Cada variante corre en un proceso aparte
+para medir su RSS pico.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.fixtures import parse_size, size_arg, synthetic_items
+from etl import outputs, transform
+
+VARIANTES = ('to_excel', 'streaming', 'streaming-200', 'streaming-sin-texto')
+
+
+def preparar_csv(path, n, chunk=50000):
+    """CSV consolidado de `n` filas, generado por chunks con el mismo transform del ETL"""
+    items = synthetic_items(n)
+    header = True
+    for inicio in range(0, n, chunk):
+        crudo = pd.DataFrame.from_records([next(items) for _ in range(min(chunk, n - inicio))])
+        df = transform.transformar(crudo, 'zonaprop_propiedades_20250101_000000.jsonl', '2025-01-01')
+        df.to_csv(path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+
+def exportar(variante, csv_path, excel_path):
+    if variante == 'to_excel':
+        df = pd.read_csv(csv_path, dtype=transform.dtypes_lectura(), parse_dates=['scraped_at'])
+        df.to_excel(excel_path, index=False)
+    elif variante == 'streaming':
+        outputs.write_excel(csv_path, excel_path)
+    elif variante == 'streaming-200':
+        outputs.write_excel(csv_path, excel_path, texto_max=200)
+    else:
+        outputs.write_excel(csv_path, excel_path, omitir_texto=True)
+
+
+def medir(variante, csv_path, excel_path):
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_excel', '--run', variante, csv_path, excel_path])
+    # wait4 devuelve el uso de recursos sólo de este hijo (RSS pico incluido)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"La variante {variante} falló")
+    return elapsed, rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=size_arg, default='100k', help='filas del CSV consolidado')
+    parser.add_argument('--variantes', nargs='+', choices=VARIANTES, default=list(VARIANTES))
+    parser.add_argument('--run', nargs=3, metavar=('VARIANTE', 'CSV', 'XLSX'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        exportar(*args.run)
+        return
+
+    n = parse_size(args.size)
+    workdir = tempfile.mkdtemp(prefix='bench_excel_')
+    csv_path = os.path.join(workdir, 'propiedades_transformadas.csv')
+    preparar_csv(csv_path, n)
+    print(f"CSV consolidado de {n:,} filas ({os.path.getsize(csv_path) / 1e6:.0f} MB)")
+    print(f"{'variante':<22}{'segundos':>10}{'filas/s':>10}{'RSS MB':>9}{'xlsx MB':>9}")
+    for variante in args.variantes:
+        excel_path = os.path.join(workdir, f'{variante}.xlsx')
+        elapsed, rss_mb = medir(variante, csv_path, excel_path)
+        print(f"{variante:<22}{elapsed:>10.2f}{n / elapsed:>10,.0f}{rss_mb:>9.0f}{os.path.getsize(excel_path) / 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ExportPipeline (fila canónica única repartida a jsonl, csv,
+parquet y sqlite) contra la configuración previa: FEEDS json + csv de Scrapy
+más un pipeline por formato (cada uno con su propia fila y su propio buffer,
+reproducido con un ExportPipeline de un solo sink).
+
+Los items se normalizan antes (NormalizationPipeline) y se mide el tiempo
+total hasta cerrar todas las salidas, en un directorio temporal.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import synthetic_items
+
+
+class FeedExport:
+    """Un feed de Scrapy (exportador sobre un archivo) como etapa de pipeline"""
+
+    def __init__(self, exporter_cls, path, **kwargs):
+        self.path = path
+        self.exporter_cls = exporter_cls
+        self.kwargs = kwargs
+
+    def open_spider(self, spider):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'wb')
+        self.exporter = self.exporter_cls(self.file, **self.kwargs)
+        self.exporter.start_exporting()
+
+    def process_item(self, item, spider):
+        self.exporter.export_item(item)
+        return item
+
+    def close_spider(self, spider):
+        self.exporter.finish_exporting()
+        self.file.close()
+
+
+def previous_stages():
+    from scrapy.exporters import CsvItemExporter, JsonItemExporter
+    from mercado_inmobiliario.pipelines import ExportPipeline
+
+    return [
+        FeedExport(JsonItemExporter, 'output/propiedades_feed.json', encoding='utf8', indent=2),
+        FeedExport(CsvItemExporter, 'output/propiedades_feed.csv', encoding='utf8'),
+        *(ExportPipeline([sink]) for sink in ('jsonl', 'csv', 'parquet', 'sqlite')),
+    ]
+
+
+def export_stage():
+    from mercado_inmobiliario.pipelines import ExportPipeline
+
+    return [ExportPipeline(['jsonl', 'csv', 'parquet', 'sqlite'])]
+
+
+def bench(factory, items, spider):
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix='bench_export_'))
+    try:
+        stages = factory()
+        start = time.perf_counter()
+        for stage in stages:
+            stage.open_spider(spider)
+        for item in items:
+            for stage in stages:
+                item = stage.process_item(item, spider)
+        for stage in stages:
+            stage.close_spider(spider)
+        return len(items) / (time.perf_counter() - start)
+    finally:
+        os.chdir(cwd)
+
+
+def main():
+    from scrapy import Spider
+    from mercado_inmobiliario.pipelines import NormalizationPipeline
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=50000)
+    args = parser.parse_args()
+
+    spider = Spider(name='benchmark')
+    normalizer = NormalizationPipeline()
+    items = [normalizer.process_item(item, spider) for item in synthetic_items(args.items)]
+    print(f"{args.items} items")
+    for label, factory in (('FEEDS + 4 pipelines', previous_stages), ('ExportPipeline (4 sinks)', export_stage)):
+        rate = bench(factory, items, spider)
+        print(f"  {label:<28}{rate:>12.0f} items/seg")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del motor de extracción (mercado_inmobiliario.extraction).
+
+Mide cards/seg sobre la página guardada en .scrapy/httpcache y sobre páginas
+sintéticas con la estructura de tarjetas de ZonaProp, y compara contra la
+extracción con selectores parsel que usaba el spider.
+"""
+
+import argparse
+import time
+
+from benchmarks.fixtures import BASE_URL, cached_pages, synthetic_listing_page
+
+
+def run(fn, body, url, repeat, rounds=3):
+    """Mejor de `rounds` corridas de `repeat` extracciones"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        n_cards = 0
+        for _ in range(repeat):
+            n_cards += len(fn(body, url))
+        best = min(best, time.perf_counter() - start)
+    return n_cards, best
+
+
+def extract_compiled(body, url):
+    from mercado_inmobiliario import extraction
+    return extraction.extract_listings(body, url)
+
+
+def extract_parsel(body, url):
+    """Cadena de selectores CSS por tarjeta, como hacía el spider original"""
+    import re
+    from parsel import Selector
+
+    sel = Selector(body=body, type='html')
+    items = []
+    for card in sel.css('div.postingCard') or sel.css('div[data-qa="posting PROPERTY"]'):
+        item = {}
+        price = card.css('div.postingCard-module__price-container div:first-child::text').get()
+        item['precio_alquiler'] = re.sub(r'[^\d]', '', price) if price else None
+        exp = card.css('div.postingCard-module__price-container div:nth-child(2)::text').get()
+        item['expensas'] = re.sub(r'[^\d]', '', exp) if exp else None
+        item['direccion'] = (
+            card.css('div.postingCard-module__posting-container div.postingCard-module__posting-top '
+                     'div:nth-child(1) div:nth-child(2) div div::text').get()
+            or card.css('div.postingCard-module__location::text').get()
+        )
+        for feature in card.css('div.postingCard-module__posting-container div.postingCard-module__posting-top '
+                                'div.postingCard-module__posting-card-row h3 span::text').getall():
+            re.search(r'(\d+)', feature)
+        item['descripcion'] = (
+            card.css('div.postingCard-module__posting-container div.postingCard-module__posting-top h3 a::text').get()
+            or card.css('h3 a::text').get()
+        )
+        item['url'] = (
+            card.css('div.postingCard-module__posting-container div.postingCard-module__posting-top h3 a::attr(href)').get()
+            or card.css('h3 a::attr(href)').get()
+        )
+        items.append(item)
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cards', type=int, default=30, help='tarjetas por página sintética')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    fixtures = [(f'cache {url}', url, body) for url, body in cached_pages()]
+    fixtures.append((f'sintética x{args.cards}', BASE_URL, synthetic_listing_page(args.cards)))
+
+    for name, url, body in fixtures:
+        print(name)
+        for label, fn in (('compilado/lxml', extract_compiled), ('parsel (previo)', extract_parsel)):
+            n_cards, elapsed = run(fn, body, url, args.repeat)
+            print(f"  {label:<18}{args.repeat / elapsed:>10.0f} páginas/seg{n_cards / elapsed:>12.0f} cards/seg")
+        if not extract_compiled(body, url):
+            print("  (la página no contiene tarjetas: respuesta de challenge/403)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: generación de los gráficos del ETL.
+
+Compara los gráficos originales (un punto por fila, en serie, sin cerrar las
+figuras) con etl/graficos.py: agregados (histogramas) en serie, en un
+pool de procesos y sin cambios en los datos (todo desde el caché). Cada
+variante corre en un proceso aparte sobre el mismo CSV consolidado sintético
+para medir su RSS pico.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_excel import preparar_csv
+from benchmarks.fixtures import parse_size, size_arg
+from etl import graficos, reporte
+
+VARIANTES = ('original', 'agregado', 'agregado-paralelo', 'cache')
+
+
+def graficos_originales(df, output_dir):
+    """Los gráficos como se generaban antes de etl/graficos.py"""
+    import matplotlib
+
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(12, 6))
+    sns.boxplot(x='moneda_original', y='precio_alquiler_original', data=df)
+    plt.yscale('log')
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'precios_por_moneda.png'))
+
+    plt.figure(figsize=(14, 8))
+    for moneda, marker in zip(['ARS', 'USD'], ['o', 'x']):
+        subset = df[df['moneda_original'] == moneda]
+        plt.scatter(subset['superficie'], subset['precio_alquiler'], alpha=0.6, marker=marker)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'superficie_vs_precio_por_moneda.png'))
+
+    plt.figure(figsize=(10, 6))
+    sns.scatterplot(x='superficie', y='precio_alquiler', hue='ambientes', data=df)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'superficie_vs_precio.png'))
+
+
+def generar(variante, csv_path, output_dir, workers):
+    df = reporte.cargar_dataset(csv_path)
+    if variante == 'original':
+        graficos_originales(df, output_dir)
+        return
+    if variante != 'cache':
+        # Sin caché: se dibujan los tres gráficos
+        cache = os.path.join(output_dir, graficos.CACHE)
+        if os.path.exists(cache):
+            os.remove(cache)
+    graficos.generar_graficos(df, output_dir, workers if variante == 'agregado-paralelo' else 1)
+
+
+def medir(variante, csv_path, output_dir, workers):
+    start = time.perf_counter()
+    proc = subprocess.Popen([
+        sys.executable, '-m', 'benchmarks.bench_graficos', '--run', variante, csv_path, output_dir,
+        '--workers', str(workers),
+    ])
+    # wait4 devuelve el uso de recursos sólo de este hijo (RSS pico incluido)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"La variante {variante} falló")
+    return elapsed, rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=size_arg, default='100k', help='filas del CSV consolidado')
+    parser.add_argument('--variantes', nargs='+', choices=VARIANTES, default=list(VARIANTES))
+    parser.add_argument('--workers', type=int, default=len(graficos.GRAFICOS))
+    parser.add_argument('--run', nargs=3, metavar=('VARIANTE', 'CSV', 'DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        generar(*args.run, args.workers)
+        return
+
+    n = parse_size(args.size)
+    workdir = tempfile.mkdtemp(prefix='bench_graficos_')
+    csv_path = os.path.join(workdir, 'propiedades_transformadas.csv')
+    preparar_csv(csv_path, n)
+    print(f"CSV consolidado de {n:,} filas, {os.cpu_count()} CPUs, {args.workers} workers")
+    print(f"{'variante':<20}{'segundos':>10}{'RSS MB':>9}{'PNG KB':>9}")
+    for variante in args.variantes:
+        # 'cache' reutiliza los PNG y el caché de la variante agregada
+        output_dir = os.path.join(workdir, 'agregado' if variante == 'cache' else variante)
+        if variante == 'cache' and not os.path.exists(os.path.join(output_dir, graficos.CACHE)):
+            medir('agregado', csv_path, output_dir, args.workers)
+        os.makedirs(output_dir, exist_ok=True)
+        elapsed, rss_mb = medir(variante, csv_path, output_dir, args.workers)
+        png_kb = sum(os.path.getsize(os.path.join(output_dir, nombre)) for nombre in graficos.GRAFICOS) / 1024
+        print(f"{variante:<20}{elapsed:>10.2f}{rss_mb:>9.0f}{png_kb:>9.0f}")
+    shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
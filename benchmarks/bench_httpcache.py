@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SqliteCacheStorage vs FilesystemCacheStorage de Scrapy.
+
+Guarda N páginas sintéticas en cada backend y mide latencia de lookup
+(retrieve_response con requests al azar), espacio en disco ocupado (bloques
+asignados, no sólo bytes), cantidad de archivos y tiempo de recorrer el cache
+completo como lo hace el replay.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.fixtures import page_url, synthetic_listing_page
+
+BACKENDS = [
+    ('filesystem', {'HTTPCACHE_STORAGE': 'scrapy.extensions.httpcache.FilesystemCacheStorage'}),
+    ('filesystem+gzip', {'HTTPCACHE_STORAGE': 'scrapy.extensions.httpcache.FilesystemCacheStorage',
+                         'HTTPCACHE_GZIP': True}),
+    ('sqlite', {'HTTPCACHE_STORAGE': 'mercado_inmobiliario.httpcache.SqliteCacheStorage'}),
+]
+
+
+def disk_usage(path):
+    """(bytes asignados en disco, cantidad de archivos) bajo `path`"""
+    allocated = files = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            allocated += os.stat(os.path.join(dirpath, name)).st_blocks * 512
+            files += 1
+    return allocated, files
+
+
+def open_storage(backend_settings, cachedir):
+    from scrapy.utils.misc import load_object
+    from scrapy.utils.test import get_crawler
+    from mercado_inmobiliario.spiders.zonaprop_spider import ZonapropSpider
+
+    settings = {'HTTPCACHE_DIR': cachedir, 'HTTPCACHE_EXPIRATION_SECS': 0, **backend_settings}
+    crawler = get_crawler(ZonapropSpider, settings)
+    spider = ZonapropSpider.from_crawler(crawler)
+    storage = load_object(crawler.settings['HTTPCACHE_STORAGE'])(crawler.settings)
+    storage.open_spider(spider)
+    return storage, spider
+
+
+def iterate_all(name, cachedir):
+    from mercado_inmobiliario import httpcache, replay
+
+    if name == 'sqlite':
+        sources = replay.iter_sqlite_cache(httpcache.cache_path(cachedir, 'zonaprop_spider'))
+    else:
+        sources = replay.iter_filesystem_cache(os.path.join(cachedir, 'zonaprop_spider'), name.endswith('gzip'))
+    return sum(len(replay.load_source(source)[3]) for source in sources)
+
+
+def bench_backend(name, backend_settings, pages, lookups, cards):
+    from scrapy.http import HtmlResponse, Request
+
+    cachedir = tempfile.mkdtemp(prefix=f'bench_httpcache_{name}_')
+    storage, spider = open_storage(backend_settings, cachedir)
+    requests = [Request(page_url(p)) for p in range(1, pages + 1)]
+    bodies = [synthetic_listing_page(cards, page=p % 20 + 1, seed=p) for p in range(1, pages + 1)]
+
+    start = time.perf_counter()
+    for request, body in zip(requests, bodies):
+        response = HtmlResponse(url=request.url, body=body, encoding='utf-8',
+                                headers={'Content-Type': 'text/html; charset=utf-8'})
+        storage.store_response(spider, request, response)
+    store_elapsed = time.perf_counter() - start
+
+    rng = random.Random(0)
+    latencies = []
+    for _ in range(lookups):
+        request = rng.choice(requests)
+        start = time.perf_counter()
+        response = storage.retrieve_response(spider, request)
+        latencies.append(time.perf_counter() - start)
+        assert response is not None
+    storage.close_spider(spider)
+
+    start = time.perf_counter()
+    iterate_all(name, cachedir)
+    iter_elapsed = time.perf_counter() - start
+
+    allocated, files = disk_usage(cachedir)
+    latencies.sort()
+    return {
+        'store_ms': store_elapsed / pages * 1000,
+        'lookup_ms': statistics.mean(latencies) * 1000,
+        'lookup_p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'iter_s': iter_elapsed,
+        'disk_mb': allocated / 1024 / 1024,
+        'files': files,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000, help='respuestas guardadas en el cache')
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--cards', type=int, default=30, help='tarjetas por página sintética')
+    args = parser.parse_args()
+
+    print(f"{args.pages} páginas de {args.cards} tarjetas, {args.lookups} lookups al azar")
+    print(f"{'backend':<18}{'store ms':>10}{'lookup ms':>11}{'p95 ms':>9}{'iter s':>9}{'disco MB':>10}{'archivos':>10}")
+    for name, backend_settings in BACKENDS:
+        r = bench_backend(name, backend_settings, args.pages, args.lookups, args.cards)
+        print(f"{name:<18}{r['store_ms']:>10.3f}{r['lookup_ms']:>11.3f}{r['lookup_p95_ms']:>9.3f}"
+              f"{r['iter_s']:>9.2f}{r['disk_mb']:>10.1f}{r['files']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput de ZonapropSpider.parse con distintos delays de pacing.
+
+Antes del PacingMiddleware, parse dormía 0.5-2 s por tarjeta y 5-10 s antes de
+la página siguiente, así que cards/seg dependía de la configuración de delays.
+Ahora el pacing vive en el downloader y el parseo no debería variar.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import synthetic_response
+
+CONFIGS = [
+    ('sin jitter', {'PACING_JITTER': 'none', 'PACING_JITTER_RANGE': [0, 0], 'PACING_PAGE_JITTER_RANGE': [0, 0]}),
+    ('jitter default', {}),
+    ('jitter x10', {'PACING_JITTER_RANGE': [5, 20], 'PACING_PAGE_JITTER_RANGE': [50, 100]}),
+]
+
+
+def make_spider(settings):
+    from scrapy.utils.test import get_crawler
+    from mercado_inmobiliario.spiders.zonaprop_spider import ZonapropSpider
+    from mercado_inmobiliario import settings as project_settings
+
+    base = {k: getattr(project_settings, k) for k in dir(project_settings) if k.isupper()}
+    base.update(settings)
+    base.update({'LOG_FILE': None, 'LOG_LEVEL': 'ERROR'})
+    crawler = get_crawler(ZonapropSpider, base)
+    return ZonapropSpider.from_crawler(crawler)
+
+
+def bench_parse(settings, pages, cards):
+    spider = make_spider(settings)
+    responses = [synthetic_response(cards, page=p) for p in range(1, pages + 1)]
+    start = time.perf_counter()
+    n_items = 0
+    for response in responses:
+        for result in spider.parse(response):
+            if isinstance(result, dict):
+                n_items += 1
+    elapsed = time.perf_counter() - start
+    return n_items, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--cards', type=int, default=30)
+    args = parser.parse_args()
+
+    # parse escribe debug_response.html en el directorio actual
+    os.chdir(tempfile.mkdtemp(prefix='bench_pacing_'))
+
+    print(f"{'config':<16}{'items':>8}{'seg':>10}{'cards/seg':>12}{'sleep previo (seg)':>22}")
+    for name, settings in CONFIGS:
+        n_items, elapsed = bench_parse(settings, args.pages, args.cards)
+        # Tiempo que habría dormido el parse original (valor esperado de los uniform)
+        old_sleep = args.pages * (args.cards * 1.25 + 7.5)
+        print(f"{name:<16}{n_items:>8}{elapsed:>10.3f}{n_items / elapsed:>12.0f}{old_sleep:>22.0f}")
+
+
+if __name__ == '__main__':
+    main()
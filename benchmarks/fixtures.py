@@ -0,0 +1,192 @@
+"""
+Fixtures compartidos por los benchmarks: páginas de listado sintéticas con la
+misma estructura de tarjetas que ZonaProp y acceso a la página cacheada.
+"""
+
+import argparse
+import gzip
+import os
+import random
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRAPERS_DIR = os.path.join(ROOT_DIR, 'scrapers')
+HTTPCACHE_DIR = os.path.join(SCRAPERS_DIR, '.scrapy', 'httpcache', 'zonaprop_spider')
+
+BASE_URL = 'https://www.zonaprop.com.ar/departamentos-alquiler-flores.html'
+
+# Permitir `import mercado_inmobiliario` sin instalar el proyecto Scrapy
+if SCRAPERS_DIR not in sys.path:
+    sys.path.insert(0, SCRAPERS_DIR)
+
+CALLES = ['Rivadavia', 'Boyaca', 'Yerbal', 'Gavilan', 'Nazca', 'Bacacay', 'Avellaneda', 'Trelles']
+
+CARD_TEMPLATE = '''
+<div class="postingCard" data-id="{listing_id}">
+  <div class="postingCard-module__posting-container">
+    <div class="postingCard-module__posting-top">
+      <div>
+        <div class="postingCard-module__price-container"><div>{moneda} {precio}</div><div>$ {expensas} Expensas</div></div>
+        <div><div><div>{direccion}</div></div></div>
+      </div>
+      <div class="postingCard-module__posting-card-row">
+        <h3><span>{superficie} m² tot.</span><span>{ambientes} amb.</span><span>{habitaciones} dorm.</span><span>{banos} baño</span></h3>
+      </div>
+      <h3><a href="/propiedades/clasificado/alclapin-departamento-{ambientes}-ambientes-flores-{listing_id}.html">Departamento {ambientes} ambientes en {calle}</a></h3>
+    </div>
+  </div>
+</div>'''
+
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Departamentos en alquiler en Flores</title></head>
+<body>
+<div class="postings-container">{cards}</div>
+<div class="paging-module__container">{paging}</div>
+</body></html>'''
+
+
+def _fmt_miles(valor):
+    return f"{valor:,}".replace(',', '.')
+
+
+def synthetic_card(rng, listing_id):
+    """HTML de una tarjeta de propiedad con datos aleatorios reproducibles"""
+    ambientes = rng.randint(1, 5)
+    usd = rng.random() < 0.05
+    calle = rng.choice(CALLES)
+    return CARD_TEMPLATE.format(
+        listing_id=listing_id,
+        moneda='USD' if usd else '$',
+        precio=_fmt_miles(rng.randint(300, 2000) if usd else rng.randint(250, 1500) * 1000),
+        expensas=_fmt_miles(rng.randint(20, 250) * 1000),
+        direccion=f"{calle} al {rng.randint(1, 80) * 100}",
+        calle=calle,
+        superficie=rng.randint(20, 160),
+        ambientes=ambientes,
+        habitaciones=max(ambientes - 1, 0),
+        banos=rng.randint(1, 2),
+    )
+
+
+def synthetic_listing_page(n_cards=30, page=1, total_pages=20, seed=0):
+    """Página de listado completa con `n_cards` tarjetas y el paginador"""
+    rng = random.Random(seed + page)
+    first_id = 50000000 + page * 1000
+    cards = ''.join(synthetic_card(rng, first_id + i) for i in range(n_cards))
+    paging = ''.join(
+        f'<a class="paging-module__page-item{" paging-module__page-item-current" if n == page else ""}" '
+        f'href="/departamentos-alquiler-flores-pagina-{n}.html">{n}</a>'
+        for n in range(1, total_pages + 1)
+    )
+    return PAGE_TEMPLATE.format(cards=cards, paging=paging).encode('utf-8')
+
+
+def page_url(page, base_url=BASE_URL):
+    return base_url if page == 1 else base_url.replace('.html', f'-pagina-{page}.html')
+
+
+def synthetic_response(n_cards=30, page=1, **kwargs):
+    """HtmlResponse de Scrapy sobre una página sintética"""
+    from scrapy.http import HtmlResponse, Request
+
+    url = page_url(page)
+    return HtmlResponse(
+        url=url,
+        body=synthetic_listing_page(n_cards, page, **kwargs),
+        encoding='utf-8',
+        request=Request(url),
+    )
+
+
+def cached_pages():
+    """Itera (url, body) de las respuestas guardadas en el HTTP cache de Scrapy"""
+    import ast
+
+    for dirpath, _, filenames in os.walk(HTTPCACHE_DIR):
+        if 'response_body' not in filenames:
+            continue
+        with open(os.path.join(dirpath, 'meta'), encoding='utf-8') as f:
+            meta = ast.literal_eval(f.read())
+        with open(os.path.join(dirpath, 'response_body'), 'rb') as f:
+            body = f.read()
+        if body[:2] == b'\x1f\x8b':
+            body = gzip.decompress(body)
+        yield meta.get('response_url', meta['url']), body
+
+
+# Snapshots JSON escalados (mismo formato que selenium_zonaprop.py)
+SIZE_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+SNAPSHOT_DIR = os.path.join(ROOT_DIR, 'benchmarks', '.fixtures')
+
+
+def parse_size(size):
+    """Cantidad de items: un entero o un número con sufijo k / m ('20k', '2.5m')"""
+    text = str(size).strip().lower().replace('_', '')
+    factor = SIZE_SUFFIXES.get(text[-1:], 1)
+    if factor != 1:
+        text = text[:-1]
+    try:
+        n = float(text) * factor
+    except ValueError:
+        raise ValueError(f"Tamaño inválido: {size!r} (usar un entero o un número con sufijo k/m, ej. 20k, 1.5m)")
+    if n <= 0 or n != int(n):
+        raise ValueError(f"Tamaño inválido: {size!r} (tiene que ser una cantidad entera positiva)")
+    return int(n)
+
+
+def size_arg(value):
+    """type= de argparse: valida el tamaño con parse_size y lo deja como texto (se usa de etiqueta)"""
+    try:
+        parse_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def synthetic_items(n, seed=0):
+    """Items como los emite ZonapropSpider.parse, con valores reproducibles"""
+    rng = random.Random(seed)
+    for i in range(n):
+        ambientes = rng.randint(1, 5)
+        usd = rng.random() < 0.05
+        calle = rng.choice(CALLES)
+        pagina = i // 30 + 1
+        listing_id = 50000000 + i
+        yield {
+            'precio_alquiler': rng.randint(300, 2000) if usd else rng.randint(250, 1500) * 1000,
+            'expensas': rng.randint(20, 250) * 1000 if rng.random() < 0.9 else None,
+            'direccion': f"{calle} al {rng.randint(1, 80) * 100}",
+            'zona': 'Flores' if pagina == 1 else f'Flores-pagina-{pagina}',
+            'superficie': rng.randint(20, 160) if rng.random() < 0.97 else None,
+            'ambientes': ambientes,
+            'habitaciones': max(ambientes - 1, 0),
+            'banos': rng.randint(1, 2),
+            'descripcion': f"Departamento {ambientes} ambientes en {calle}. " * rng.randint(1, 8),
+            'url': f'https://www.zonaprop.com.ar/propiedades/clasificado/alclapin-departamento-flores-{listing_id}.html',
+            'scraped_at': f'2025-05-28T01:{(i // 60) % 60:02d}:{i % 60:02d}.000000',
+            'pagina': pagina,
+        }
+
+
+def json_snapshot(size, seed=0, lines=False):
+    """Ruta a un snapshot JSON (o JSON Lines) de `size` propiedades (se genera una vez y se reutiliza)"""
+    import json
+
+    n = parse_size(size)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = os.path.join(SNAPSHOT_DIR, f"zonaprop_propiedades_{n}_{seed}.{'jsonl' if lines else 'json'}")
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            if not lines:
+                f.write('[\n')
+            for i, item in enumerate(synthetic_items(n, seed)):
+                if i and not lines:
+                    f.write(',\n')
+                f.write(json.dumps(item, ensure_ascii=False))
+                if lines:
+                    f.write('\n')
+            if not lines:
+                f.write('\n]\n')
+        os.replace(tmp, path)
+    return path
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks end-to-end: parseo del spider, item pipelines y ETL.
+
+Cada corrida guarda sus métricas en JSON y puede compararse contra una
+corrida base con umbrales de regresión::
+
+    python -m benchmarks.run --sizes 10k 100k
+    python -m benchmarks.run --sizes 10k --baseline benchmarks/results/base.json --threshold 0.15
+
+Sale con código 1 si alguna métrica empeora más que el umbral.
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.fixtures import (
+    BASE_URL, ROOT_DIR, cached_pages, json_snapshot, parse_size, size_arg, synthetic_items,
+    synthetic_listing_page,
+)
+
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+ETL_SCRIPT = os.path.join(ROOT_DIR, 'etl', 'etl_propiedades.py')
+
+
+def metric(value, unit, higher_is_better=True):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def bench_parse(pages=200, cards=30):
+    """cards/seg de ZonapropSpider.parse sobre la página cacheada y páginas sintéticas"""
+    from scrapy.crawler import Crawler
+    from scrapy.http import HtmlResponse, Request
+    from mercado_inmobiliario.replay import project_settings
+    from mercado_inmobiliario.spiders.zonaprop_spider import ZonapropSpider
+
+    spider = ZonapropSpider.from_crawler(Crawler(ZonapropSpider, project_settings()))
+    spider.save_debug_response = False
+
+    results = {}
+    fixtures = {'synthetic': [(BASE_URL, synthetic_listing_page(cards, page=p % 20 + 1)) for p in range(pages)]}
+    cached = list(cached_pages())
+    if cached:
+        fixtures['cached'] = cached * max(pages // len(cached), 1)
+
+    for name, bodies in fixtures.items():
+        responses = [
+            HtmlResponse(url=url, body=body, encoding='utf-8', request=Request(url))
+            for url, body in bodies
+        ]
+        start = time.perf_counter()
+        n_cards = sum(1 for r in responses for x in spider.parse(r) if not isinstance(x, Request))
+        elapsed = time.perf_counter() - start
+        results[f'parse.{name}.pages_per_sec'] = metric(len(responses) / elapsed, 'pages/s')
+        if n_cards:
+            results[f'parse.{name}.cards_per_sec'] = metric(n_cards / elapsed, 'cards/s')
+    return results
+
+
+def bench_pipelines(size):
+    """items/seg de cada ITEM_PIPELINE, en el orden y con la configuración de settings
+
+    Los pipelines se construyen con ``from_crawler`` sobre las settings del
+    proyecto, así ExportPipeline escribe a los EXPORT_SINKS configurados.
+    """
+    from scrapy import Spider
+    from scrapy.crawler import Crawler
+    from scrapy.exceptions import DropItem
+    from scrapy.utils.misc import load_object
+    from mercado_inmobiliario.replay import load_pipelines, project_settings
+
+    n = parse_size(size)
+    spider = Spider(name='benchmark')
+    items = list(synthetic_items(n))
+    results = {}
+
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix='bench_pipelines_'))
+    try:
+        settings = project_settings()
+        crawler = Crawler(Spider, settings)
+        # El crawl no arranca: los pipelines leen las stats de un collector propio
+        crawler.stats = load_object(settings['STATS_CLASS'])(crawler)
+        for pipeline in load_pipelines(settings, crawler):
+            name = type(pipeline).__name__
+            batch = copy.deepcopy(items)
+            start = time.perf_counter()
+            if hasattr(pipeline, 'open_spider'):
+                pipeline.open_spider(spider)
+            survivors = []
+            for item in batch:
+                try:
+                    survivors.append(pipeline.process_item(item, spider))
+                except DropItem:
+                    pass
+            if hasattr(pipeline, 'close_spider'):
+                pipeline.close_spider(spider)
+            elapsed = time.perf_counter() - start
+            results[f'pipeline.{name}.{size}.items_per_sec'] = metric(len(batch) / elapsed, 'items/s')
+            # La salida de cada etapa alimenta a la siguiente, como en el crawl
+            items = survivors
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def bench_etl(size):
+    """rows/seg y RSS pico de etl_propiedades.py sobre un snapshot sintético"""
+    n = parse_size(size)
+    snapshot = json_snapshot(size)
+    workdir = tempfile.mkdtemp(prefix='bench_etl_')
+    env = dict(os.environ, ETL_BASE_DIR=workdir, ETL_INPUT_JSON=snapshot, MPLBACKEND='Agg')
+
+    stderr_path = os.path.join(workdir, 'stderr.log')
+    start = time.perf_counter()
+    with open(stderr_path, 'wb') as stderr:
+        proc = subprocess.Popen(
+            [sys.executable, ETL_SCRIPT], cwd=workdir, env=env,
+            stdout=subprocess.DEVNULL, stderr=stderr,
+        )
+        # wait4 devuelve el uso de recursos sólo de este hijo (RSS pico incluido)
+        _, status, rusage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        with open(stderr_path, encoding='utf-8', errors='replace') as f:
+            raise RuntimeError(f"El ETL falló sobre {snapshot}: {f.read()[-2000:]}")
+
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    rss_mb = rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return {
+        f'etl.{size}.rows_per_sec': metric(n / elapsed, 'rows/s'),
+        f'etl.{size}.peak_rss_mb': metric(rss_mb, 'MB', higher_is_better=False),
+    }
+
+
+def best_of(rounds, fn, *args):
+    """Mejor valor de cada métrica en `rounds` corridas (reduce el ruido de la máquina)"""
+    best = {}
+    for _ in range(rounds):
+        for name, m in fn(*args).items():
+            prev = best.get(name)
+            if prev is None or (m['value'] > prev['value']) == m['higher_is_better']:
+                best[name] = m
+    return best
+
+
+def run_suite(sizes, only=None, rounds=3):
+    selected = only or ('parse', 'pipelines', 'etl')
+    results = {}
+    if 'parse' in selected:
+        print("▶ parse")
+        results.update(best_of(rounds, bench_parse))
+    for size in sizes:
+        if 'pipelines' in selected:
+            print(f"▶ pipelines ({size})")
+            results.update(best_of(rounds, bench_pipelines, size))
+        if 'etl' in selected:
+            print(f"▶ etl ({size})")
+            results.update(bench_etl(size))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Lista de (métrica, valor, base, cambio) que empeoraron más que `threshold`"""
+    regressions = []
+    for name, current in sorted(results.items()):
+        base = baseline.get(name)
+        if not base or not base['value']:
+            continue
+        change = (current['value'] - base['value']) / base['value']
+        worse = -change if current['higher_is_better'] else change
+        flag = '❌' if worse > threshold else '  '
+        print(f"{flag} {name:<55}{current['value']:>14.1f}{base['value']:>14.1f}{change:>+9.1%}")
+        if worse > threshold:
+            regressions.append((name, current['value'], base['value'], change))
+    return regressions
+
+
+def export_sinks():
+    """EXPORT_SINKS del proyecto (los formatos que mide el benchmark de pipelines)"""
+    from mercado_inmobiliario.replay import project_settings
+
+    return project_settings().getlist('EXPORT_SINKS')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de parseo, pipelines y ETL')
+    parser.add_argument('--sizes', type=size_arg, nargs='+', default=['10k'],
+                        help='cantidades de items: 10k, 250k, 1m o un entero')
+    parser.add_argument('--only', nargs='+', choices=['parse', 'pipelines', 'etl'])
+    parser.add_argument('--rounds', type=int, default=3, help='corridas de parse/pipelines (se toma la mejor)')
+    parser.add_argument('--save', help='archivo JSON de resultados (por defecto benchmarks/results/<fecha>.json)')
+    parser.add_argument('--baseline', help='JSON de una corrida anterior para comparar')
+    parser.add_argument('--threshold', type=float, default=0.15, help='regresión tolerada (0.15 = 15%%)')
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.only, args.rounds)
+
+    report = {
+        'meta': {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'sizes': args.sizes,
+            'export_sinks': export_sinks(),
+        },
+        'results': results,
+    }
+    path = args.save or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for name, m in sorted(results.items()):
+        print(f"  {name:<55}{m['value']:>14.1f} {m['unit']}")
+    print(f"Resultados guardados en {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nComparación contra {args.baseline} (umbral {args.threshold:.0%}):")
+        base_sinks = baseline['meta'].get('export_sinks')
+        if base_sinks != report['meta']['export_sinks']:
+            print(f"⚠️ La base exportaba a {base_sinks} y esta corrida a {report['meta']['export_sinks']}")
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} métricas con regresión")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
+
+
+if __name__ == '__main__':
+    main()
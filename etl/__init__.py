@@ -0,0 +1 @@
+# ETL de propiedades: snapshots del scraper -> dataset limpio, base SQLite y reportes
@@ -0,0 +1,155 @@
+"""
+Motores de ejecución del ETL.
+
+Un motor recibe la ruta de un snapshot (o un rango de bytes de un JSON Lines)
+y produce lotes ``(leidos, derivado)``: ``leidos`` es la cantidad de
+registros crudos consumidos para el lote y ``derivado`` un DataFrame de
+pandas con las COLUMNAS del dataset limpio, ya sin duplicados y todavía sin
+ESQUEMA. El resto del ETL (esquema, salidas,
+reporte de memoria) es común a todos los motores, así que producen
+exactamente las mismas salidas.
+
+- ``pandas``: lee el snapshot por chunks y transforma cada uno con
+  ``transform.derivar`` (memoria acotada por ``chunk_size``).
+- ``polars``: parsea los registros con el lector JSON nativo de Polars y
+  arma, para cada chunk, un plan lazy con todos los pasos (conversión de
+  monedas, barrio, fechas, métricas, categorías) que Polars fusiona y ejecuta
+  en varios hilos (``POLARS_MAX_THREADS``). Los JSON Lines se leen por chunks;
+  las listas JSON se leen completas y se procesan por chunks.
+
+Los duplicados se eliminan en los dos motores con ``transform.Deduplicador``
+(hash por fila, también entre chunks). Los avisos repetidos con filas
+distintas (misma CLAVE) los descarta después ``transform.DeduplicadorClave``,
+común a todos los motores.
+"""
+
+import io
+from itertools import islice
+
+from etl import snapshots, transform
+
+
+class PandasBackend:
+    nombre = 'pandas'
+
+    def __init__(self, chunk_size=50000, tasa_cambio=transform.TASA_CAMBIO):
+        self.chunk_size = chunk_size
+        self.tasa_cambio = tasa_cambio
+
+    def lotes(self, path, snapshot, fecha_snapshot, deduplicar=None, byte_range=None):
+        deduplicar = deduplicar or transform.Deduplicador()
+        for chunk in snapshots.read_chunks(path, self.chunk_size, byte_range):
+            yield len(chunk), transform.derivar(deduplicar(chunk), snapshot, fecha_snapshot, self.tasa_cambio)
+
+
+class PolarsBackend:
+    nombre = 'polars'
+
+    FORMATOS_FECHA = ('%Y-%m-%dT%H:%M:%S%.f', '%Y-%m-%d %H:%M:%S%.f')
+
+    def __init__(self, chunk_size=50000, tasa_cambio=transform.TASA_CAMBIO):
+        import polars
+
+        self.pl = polars
+        self.chunk_size = chunk_size
+        self.tasa_cambio = tasa_cambio
+
+    def crudos(self, path, byte_range=None):
+        """DataFrames de Polars de a lo sumo `chunk_size` registros, leídos con el parser nativo"""
+        pl = self.pl
+        if not path.endswith('.jsonl'):
+            if byte_range is not None:
+                raise ValueError(f'{path}: sólo los JSON Lines se leen por rangos de bytes')
+            yield from pl.read_json(path, infer_schema_length=None).iter_slices(self.chunk_size)
+            return
+        lineas = snapshots.iter_lines(path, *(byte_range or ()))
+        while True:
+            chunk = list(islice(lineas, self.chunk_size))
+            if not chunk:
+                return
+            chunk = [linea for linea in chunk if linea.strip()]
+            if chunk:
+                yield pl.read_ndjson(io.BytesIO(b''.join(chunk)), infer_schema_length=None)
+
+    def hash_filas(self, crudo):
+        """Como transform.hash_filas: independiente de los dtypes inferidos en cada chunk"""
+        pl = self.pl
+        columnas = [
+            pl.col(col).cast(pl.Float64 if dtype.is_numeric() or dtype == pl.Null else pl.String)
+            for col, dtype in sorted(crudo.schema.items())
+        ]
+        return crudo.select(pl.struct(columnas).hash(seed=0)).to_series()
+
+    def _categoria_tamano(self, superficie):
+        """Equivalente a pd.cut(superficie, BINS_TAMANO, labels=CATEGORIAS_TAMANO)"""
+        pl = self.pl
+        expr = pl.lit(None, dtype=pl.String)
+        limites = list(zip(transform.BINS_TAMANO, transform.BINS_TAMANO[1:]))
+        for etiqueta, (bajo, alto) in reversed(list(zip(transform.CATEGORIAS_TAMANO, limites))):
+            expr = pl.when((superficie > bajo) & (superficie <= alto)).then(pl.lit(etiqueta)).otherwise(expr)
+        return expr
+
+    def plan(self, crudo, snapshot, fecha_snapshot):
+        """Los pasos de transform.derivar sobre el LazyFrame `crudo`, como un único plan"""
+        pl = self.pl
+        columnas = crudo.collect_schema().names()
+        faltantes = [
+            col for col in transform.COLS_NUMERICAS + ['zona', 'scraped_at', 'url', 'direccion']
+            if col not in columnas
+        ]
+        precio = pl.col('precio_alquiler')
+        superficie = pl.col('superficie')
+        scraped_at = pl.col('scraped_at').cast(pl.String)
+        dolares = precio < transform.UMBRAL_USD
+        return (
+            crudo
+            .with_columns([pl.lit(None).alias(col) for col in faltantes])
+            .with_columns(
+                [pl.col(col).cast(pl.Float64, strict=False) for col in transform.COLS_NUMERICAS]
+                + [pl.col(col).cast(pl.String) for col in ('zona', 'url', 'direccion')]
+            )
+            .with_columns(
+                # 1. Identificar y convertir precios en dólares
+                moneda_original=pl.when(dolares).then(pl.lit('USD')).otherwise(pl.lit('ARS')),
+                precio_alquiler_original=precio,
+                precio_alquiler=pl.when(dolares).then(precio * self.tasa_cambio).otherwise(precio),
+                # 2. Barrio a partir de 'zona'
+                barrio=pl.col('zona').str.replace(f'(?i){transform.ZONA_PAGINA_RE}', ''),
+                # 3. 'scraped_at' como datetime
+                scraped_at=pl.coalesce([
+                    scraped_at.str.to_datetime(formato, strict=False, time_unit='us')
+                    for formato in self.FORMATOS_FECHA
+                ]),
+                # 5. Categorías de tamaño
+                categoria_tamano=self._categoria_tamano(superficie),
+                # 6. Ambientes como entero
+                ambientes=pl.col('ambientes').fill_null(0).cast(pl.Int64, strict=False),
+                # 7. Clave para la base
+                snapshot=pl.lit(snapshot),
+                listing_id=pl.col('url').str.extract(transform.LISTING_ID_RE, 1).cast(pl.Int64, strict=False),
+                fecha_snapshot=pl.lit(str(fecha_snapshot)),
+            )
+            .with_columns(
+                # 4. Métricas derivadas (en pesos)
+                precio_por_m2=pl.col('precio_alquiler') / superficie,
+                costo_total=pl.col('precio_alquiler') + pl.col('expensas').fill_null(0),
+            )
+            .select(transform.COLUMNAS)
+        )
+
+    def lotes(self, path, snapshot, fecha_snapshot, deduplicar=None, byte_range=None):
+        pl = self.pl
+        deduplicar = deduplicar or transform.Deduplicador()
+        for crudo in self.crudos(path, byte_range):
+            nuevos = pl.Series(deduplicar.nuevos(self.hash_filas(crudo).to_list()))
+            derivado = self.plan(crudo.lazy().filter(nuevos), snapshot, fecha_snapshot).collect().to_pandas()
+            derivado['listing_id'] = transform.completar_ids(derivado['listing_id'], derivado['direccion'])
+            yield crudo.height, derivado
+
+
+BACKENDS = {backend.nombre: backend for backend in (PandasBackend, PolarsBackend)}
+
+
+def crear_backend(nombre, chunk_size=50000, tasa_cambio=transform.TASA_CAMBIO):
+    """Instancia el motor `nombre`; ImportError si falta su librería"""
+    return BACKENDS[nombre](chunk_size, tasa_cambio)
@@ -0,0 +1,166 @@
+"""
+Cubo de agregados del dataset consolidado.
+
+Se agrupa una sola vez por barrio × ambientes × moneda × categoría de tamaño ×
+fecha de snapshot y, para cada celda, se calculan cantidad, suma, media,
+mínimo, máximo y cuantiles de cada medida. El reporte y los tableros leen del
+cubo (``data/cubo_propiedades.csv``) en lugar de recalcular sobre las filas.
+
+Las cantidades, sumas, mínimos y máximos se pueden re-agregar a cualquier
+subconjunto de dimensiones con ``agregar`` (la media sale de suma / cantidad);
+los cuantiles no. Por eso ``combinar`` actualiza el cubo guardado reemplazando
+sólo las celdas de las fechas que cambiaron, y la fila ``nivel='total'`` se
+re-agrega desde las celdas: de sus cuantiles se calculan sólo los que usa el
+reporte (CUANTILES_TOTAL), exactos, a partir de conteos por fecha y valor
+(``conteos``) que se combinan igual que las celdas.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONES = ['barrio', 'ambientes', 'moneda_original', 'categoria_tamano', 'fecha_snapshot']
+MEDIDAS = ['precio_alquiler', 'precio_alquiler_original', 'precio_por_m2', 'costo_total', 'superficie']
+CUANTILES = {'p25': 0.25, 'mediana': 0.5, 'p75': 0.75, 'p90': 0.9}
+ADITIVAS = {'n': 'sum', 'suma': 'sum', 'min': 'min', 'max': 'max'}
+ESTADISTICAS = ['n', 'suma', 'media', 'min', *CUANTILES, 'max']
+COLUMNAS = ['nivel', *DIMENSIONES, 'propiedades'] + [
+    f'{medida}_{estadistica}' for medida in MEDIDAS for estadistica in ESTADISTICAS
+]
+# Cuantiles de la fila total que usa el reporte
+CUANTILES_TOTAL = {'precio_alquiler': ['mediana']}
+COLUMNAS_CONTEOS = ['medida', 'fecha_snapshot', 'valor', 'propiedades']
+# Las dimensiones como se leen del CSV del cubo
+DTYPES_DIMENSIONES = {
+    'barrio': 'str', 'ambientes': 'Int8', 'moneda_original': 'str', 'categoria_tamano': 'str',
+    'fecha_snapshot': 'str',
+}
+
+
+def _estadisticas(agregados, cuantiles):
+    """Columnas `{medida}_{estadística}` en orden de MEDIDAS"""
+    cuantiles = cuantiles.rename(columns={q: nombre for nombre, q in CUANTILES.items()}, level=1)
+    agregados = agregados.rename(columns={'count': 'n', 'sum': 'suma', 'mean': 'media'}, level=1)
+    tabla = pd.concat([agregados, cuantiles], axis=1)
+    tabla = tabla[[(medida, estadistica) for medida in MEDIDAS for estadistica in ESTADISTICAS]]
+    tabla.columns = [f'{medida}_{estadistica}' for medida, estadistica in tabla.columns]
+    return tabla.astype({f'{medida}_n': 'int64' for medida in MEDIDAS})
+
+
+def _datos(df):
+    return df[DIMENSIONES].assign(**{medida: df[medida].astype('float64') for medida in MEDIDAS})
+
+
+def celdas(df):
+    """Filas ``nivel='celda'`` del cubo de `df` (necesita DIMENSIONES y MEDIDAS)"""
+    grupos = _datos(df).groupby(DIMENSIONES, observed=True, dropna=False)
+    tabla = _estadisticas(
+        grupos[MEDIDAS].agg(['count', 'sum', 'mean', 'min', 'max']),
+        grupos[MEDIDAS].quantile(list(CUANTILES.values())).unstack(),
+    )
+    tabla.insert(0, 'propiedades', grupos.size())
+    tabla = tabla.reset_index()
+    tabla.insert(0, 'nivel', 'celda')
+    return tabla
+
+
+def calcular(df):
+    """Cubo de `df`: una fila por celda más la fila total (con todos los cuantiles exactos)"""
+    valores = _datos(df)[MEDIDAS]
+    total = _estadisticas(
+        valores.agg(['count', 'sum', 'mean', 'min', 'max']).unstack().to_frame().T,
+        valores.quantile(list(CUANTILES.values())).unstack().to_frame().T,
+    )
+    total.insert(0, 'propiedades', len(df))
+    total.insert(0, 'nivel', 'total')
+    return pd.concat([celdas(df), total], ignore_index=True)
+
+
+def conteos(df):
+    """Propiedades por fecha y valor de las medidas de CUANTILES_TOTAL"""
+    partes = []
+    for medida in CUANTILES_TOTAL:
+        parte = df.groupby(['fecha_snapshot', medida], observed=True).size().rename('propiedades').reset_index()
+        partes.append(parte.rename(columns={medida: 'valor'}).assign(medida=medida))
+    tabla = pd.concat(partes, ignore_index=True)[COLUMNAS_CONTEOS]
+    return tabla.astype({'fecha_snapshot': 'str', 'valor': 'float64', 'propiedades': 'int64'})
+
+
+def _cuantil(conteos, q):
+    """Cuantil `q` de los valores con sus cantidades (interpolación lineal, como pandas)"""
+    por_valor = conteos.groupby('valor')['propiedades'].sum()
+    if por_valor.empty:
+        return np.nan
+    acumulado = por_valor.to_numpy().cumsum()
+    posicion = (acumulado[-1] - 1) * q
+    bajo, alto = np.searchsorted(acumulado, [np.floor(posicion), np.ceil(posicion)], side='right')
+    valores = por_valor.index.to_numpy()
+    return valores[bajo] + (posicion - np.floor(posicion)) * (valores[alto] - valores[bajo])
+
+
+def _total(celdas, conteos):
+    """Fila total re-agregada desde las celdas, con los cuantiles de CUANTILES_TOTAL"""
+    fila = {'nivel': 'total', 'propiedades': celdas['propiedades'].sum()}
+    for medida in MEDIDAS:
+        for estadistica, funcion in ADITIVAS.items():
+            fila[f'{medida}_{estadistica}'] = celdas[f'{medida}_{estadistica}'].agg(funcion)
+        fila[f'{medida}_media'] = fila[f'{medida}_suma'] / fila[f'{medida}_n'] if fila[f'{medida}_n'] else np.nan
+    for medida, nombres in CUANTILES_TOTAL.items():
+        valores = conteos[conteos['medida'] == medida]
+        for nombre in nombres:
+            fila[f'{medida}_{nombre}'] = _cuantil(valores, CUANTILES[nombre])
+    return pd.DataFrame([fila]).reindex(columns=COLUMNAS).astype(DTYPES_DIMENSIONES)
+
+
+def combinar(cubo, conteos_guardados, df, fechas=None):
+    """Cubo y conteos con las fechas `fechas` recalculadas desde `df` (sus filas)
+
+    Las celdas y los conteos de las demás fechas se conservan; sin `fechas`
+    (o sin cubo guardado) se reemplaza todo. Devuelve (cubo, conteos).
+    """
+    nuevas = celdas(df).astype(DTYPES_DIMENSIONES)
+    nuevos = conteos(df)
+    if cubo is not None and fechas is not None:
+        fechas = [str(fecha) for fecha in fechas]
+        guardadas = cubo[(cubo['nivel'] == 'celda') & ~cubo['fecha_snapshot'].isin(fechas)]
+        nuevas = pd.concat([guardadas, nuevas], ignore_index=True)
+        nuevos = pd.concat(
+            [conteos_guardados[~conteos_guardados['fecha_snapshot'].isin(fechas)], nuevos], ignore_index=True,
+        )
+    nuevas = nuevas.sort_values(DIMENSIONES, kind='stable', ignore_index=True)
+    return pd.concat([nuevas, _total(nuevas, nuevos)], ignore_index=True), nuevos
+
+
+def cargar(path, path_conteos):
+    """Cubo y conteos guardados, o (None, None) si faltan o tienen otras columnas"""
+    if not (os.path.exists(path) and os.path.exists(path_conteos)):
+        return None, None
+    cubo = pd.read_csv(path, dtype={'nivel': 'str', **DTYPES_DIMENSIONES})
+    conteos_guardados = pd.read_csv(path_conteos, dtype={'medida': 'str', 'fecha_snapshot': 'str'})
+    if list(cubo.columns) != COLUMNAS or list(conteos_guardados.columns) != COLUMNAS_CONTEOS:
+        return None, None
+    return cubo, conteos_guardados
+
+
+def agregar(cubo, dimensiones):
+    """Re-agrega las celdas a `dimensiones`: cantidades, sumas, mínimos, máximos y medias"""
+    celdas = cubo[cubo['nivel'] == 'celda']
+    funciones = {'propiedades': 'sum'}
+    for medida in MEDIDAS:
+        funciones.update({f'{medida}_{estadistica}': funcion for estadistica, funcion in ADITIVAS.items()})
+    tabla = celdas.groupby(dimensiones, observed=True)[list(funciones)].agg(funciones)
+    for medida in MEDIDAS:
+        tabla[f'{medida}_media'] = tabla[f'{medida}_suma'] / tabla[f'{medida}_n']
+    return tabla
+
+
+def total(cubo):
+    """Fila del dataset completo"""
+    return cubo[cubo['nivel'] == 'total'].iloc[0]
+
+
+def guardar(cubo, path, conteos_cubo=None, path_conteos=None):
+    cubo.to_csv(path, index=False)
+    if conteos_cubo is not None:
+        conteos_cubo.to_csv(path_conteos, index=False)
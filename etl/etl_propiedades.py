@@ -1,29 +1,50 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
-import sys
+#!/usr/bin/env python3
+"""
+ETL incremental de propiedades.
+
+Descubre los snapshots del scraper en ``output/`` (``zonaprop_propiedades_*.json``
+y ``*.jsonl``), procesa sólo los nuevos o modificados (según el manifiesto de
+hashes ``data/etl_manifest.json``) leyéndolos por chunks, y agrega el resultado
+al CSV y a la base SQLite existentes. Los derivados también se actualizan sólo
+con lo nuevo: un Excel por snapshot cargado, y el cubo y los histogramas de
+los gráficos recalculados para las fechas de esos snapshots y combinados con
+los guardados; el reporte sale del cubo.
+
+    python etl/etl_propiedades.py                 # incremental
+    python etl/etl_propiedades.py --full          # reprocesa todos los snapshots
+    python etl/etl_propiedades.py --input output/zonaprop_propiedades_20250528_024151.json
+    python etl/etl_propiedades.py --backend polars  # transformaciones con Polars
+    python etl/etl_propiedades.py --workers 4       # snapshots repartidos en 4 procesos
+    python etl/etl_propiedades.py --excel-background --excel-text-max 200
+"""
+
+import argparse
+import importlib.util
+import multiprocessing
 import os
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Raíz del proyecto: el directorio que contiene etl/
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if __package__ in (None, ''):
+    # Ejecutado como script: permitir `import etl` desde la raíz del proyecto
+    sys.path.insert(0, RAIZ)
+
+from etl import backends, cubo, graficos, outputs, paralelo, reporte, snapshots, transform
+
+# Directorio base del proyecto (configurable para correr sobre otros datos, p. ej. benchmarks)
+BASE_DIR = os.environ.get('ETL_BASE_DIR', RAIZ)
 
-# Verificar y crear directorios necesarios
-os.makedirs('/home/estefany/cursos/Mercado-inmobiliario-BA/data', exist_ok=True)
-os.makedirs('/home/estefany/cursos/Mercado-inmobiliario-BA/output', exist_ok=True)
 
 # Función para verificar dependencias
 def check_dependencies():
-    missing_deps = []
-    try:
-        import sqlalchemy
-    except ImportError:
-        missing_deps.append("sqlalchemy")
-    
-    # Verificar openpyxl para Excel
-    try:
-        import openpyxl
-    except ImportError:
-        missing_deps.append("openpyxl")
-    
+    # Verificar openpyxl para Excel (sin importarlo)
+    missing_deps = [dep for dep in ("openpyxl",) if importlib.util.find_spec(dep) is None]
+
     if missing_deps:
         print("\n⚠️ ADVERTENCIA: Faltan las siguientes dependencias:")
         for dep in missing_deps:
@@ -33,202 +54,310 @@ def check_dependencies():
         return False
     return True
 
-# Carga de datos desde el archivo JSON
-print("Iniciando proceso ETL...")
-try:
-    ruta_json = '/home/estefany/cursos/Mercado-inmobiliario-BA/output/zonaprop_propiedades_20250528_024151.json'
-    df = pd.read_json(ruta_json)
-except FileNotFoundError:
-    print(f"Error: No se encontró el archivo JSON en la ruta: {ruta_json}")
-    print("Verifique la ubicación del archivo y vuelva a ejecutar el script.")
-    sys.exit(1)
-except Exception as e:
-    print(f"Error al cargar los datos: {str(e)}")
-    sys.exit(1)
-
-# Visualizar las primeras filas para entender la estructura de datos
-print("Número de registros cargados:", len(df))
-print("\nPrimeras filas del DataFrame:")
-print(df.head())
-
-# Información básica del DataFrame
-print("\nInformación del DataFrame:")
-print(df.info())
-
-# Estadísticas descriptivas
-print("\nEstadísticas descriptivas:")
-print(df.describe())
-
-# Limpieza y transformación de los datos
-
-# 1. Eliminar registros duplicados
-df_limpio = df.drop_duplicates().reset_index(drop=True)
-print(f"Registros después de eliminar duplicados: {len(df_limpio)}")
-
-# 2. Identificar y marcar precios en dólares
-# Asumimos que los precios menores a 5000 son en dólares mientras que los mayores son en pesos
-df_limpio['moneda_original'] = 'ARS'
-mascara_dolares = df_limpio['precio_alquiler'] < 5000
-df_limpio.loc[mascara_dolares, 'moneda_original'] = 'USD'
-
-# Convertir precios en dólares a pesos (tasa: 1 USD = 1000 ARS)
-tasa_cambio = 1000  # Definir la tasa de cambio USD a ARS
-df_limpio['precio_alquiler_original'] = df_limpio['precio_alquiler']  # Guardar el precio original
-df_limpio.loc[mascara_dolares, 'precio_alquiler'] = df_limpio.loc[mascara_dolares, 'precio_alquiler'] * tasa_cambio
-
-# Mostrar cuántas propiedades tenían precios en USD vs ARS
-conteo_monedas = df_limpio['moneda_original'].value_counts()
-print("\nPropiedades por tipo de moneda:")
-print(conteo_monedas)
-print(f"Se convirtieron {conteo_monedas.get('USD', 0)} precios de USD a ARS (tasa: 1 USD = {tasa_cambio} ARS)")
-
-# 3. Extraer el barrio de la columna 'zona' (eliminando 'pagina-X')
-df_limpio['barrio'] = df_limpio['zona'].str.replace(r'-pagina-\d+$', '', regex=True)
-
-# 4. Convertir 'scraped_at' a datetime si no lo está
-df_limpio['scraped_at'] = pd.to_datetime(df_limpio['scraped_at'])
-
-# Eliminar columnas redundantes
-df_limpio = df_limpio.drop(columns=['zona', 'fecha_scrap'], errors='ignore')
-print("Columnas eliminadas: 'zona' y 'fecha_scrap'")
-
-# 5. Manejar valores nulos en columnas numéricas
-cols_numericas = ['precio_alquiler', 'expensas', 'superficie', 'ambientes', 'habitaciones', 'banos']
-for col in cols_numericas:
-    # Identificar cuántos nulos hay en cada columna
-    nulos = df_limpio[col].isna().sum()
-    print(f"Valores nulos en {col}: {nulos}")
-
-# 6. Calcular precio por m² para análisis de valor (usando el precio en pesos)
-df_limpio['precio_por_m2'] = df_limpio['precio_alquiler'] / df_limpio['superficie']
-
-# 7. Calcular precio total (alquiler + expensas) para tener el costo real en pesos
-df_limpio['costo_total'] = df_limpio['precio_alquiler'] + df_limpio['expensas'].fillna(0)
-
-# 8. Crear categorías de tamaño basadas en superficie
-df_limpio['categoria_tamano'] = pd.cut(
-    df_limpio['superficie'],
-    bins=[0, 30, 50, 80, 150, float('inf')],
-    labels=['Muy pequeño', 'Pequeño', 'Mediano', 'Grande', 'Muy grande']
-)
-
-# 9. Relacionar el número de ambientes con el precio de alquiler
-df_limpio['ambientes'] = df_limpio['ambientes'].fillna(0).astype(int)  # Asegurar que ambientes sea entero
-
-# Ver el resultado de las transformaciones
-print("\nDataFrame después de las transformaciones:")
-print(df_limpio.head())
-print(df_limpio.info())
-
-# Análisis específico de propiedades en USD vs ARS
-print("\nEstadísticas de precios por moneda original:")
-for moneda in df_limpio['moneda_original'].unique():
-    subset = df_limpio[df_limpio['moneda_original'] == moneda]
-    print(f"\nPropiedades en {moneda}:")
-    print(f"Cantidad: {len(subset)}")
-    print(f"Precio original promedio: {subset['precio_alquiler_original'].mean():.2f}")
-    if moneda == 'USD':
-        print(f"Precio en pesos (convertido) promedio: {subset['precio_alquiler'].mean():.2f}")
-    print(f"Rango de precios originales: {subset['precio_alquiler_original'].min()} - {subset['precio_alquiler_original'].max()}")
-
-# Guardar los datos transformados en diferentes formatos
-
-# 1. Guardar en CSV
-ruta_csv_salida = '/home/estefany/cursos/Mercado-inmobiliario-BA/data/propiedades_transformadas.csv'
-df_limpio.to_csv(ruta_csv_salida, index=False)
-print(f"\nDatos guardados en CSV: {ruta_csv_salida}")
-
-# 2. Guardar en formato Excel (útil para análisis posterior) - Con manejo de errores
-ruta_excel = '/home/estefany/cursos/Mercado-inmobiliario-BA/data/propiedades_transformadas.xlsx'
-try:
-    df_limpio.to_excel(ruta_excel, index=False)
-    print(f"Datos guardados en Excel: {ruta_excel}")
-except ImportError:
-    print("\n⚠️ No se pudo guardar en formato Excel porque falta la librería 'openpyxl'")
-    print("Para habilitar esta función, ejecute el siguiente comando:")
-    print("pip install openpyxl")
-
-# 3. Guardar en una base de datos SQL - Con manejo de errores
-try:
-    from sqlalchemy import create_engine
-    engine = create_engine('sqlite:////home/estefany/cursos/Mercado-inmobiliario-BA/data/propiedades.db')
-    df_limpio.to_sql('propiedades', engine, if_exists='replace', index=False)
-    print("Datos guardados en base de datos SQLite")
-except ImportError:
-    print("\n⚠️ No se pudo guardar en la base de datos SQLite porque falta la librería 'sqlalchemy'")
-    print("Para habilitar esta función, ejecute el siguiente comando:")
-    print("pip install sqlalchemy")
-except Exception as e:
-    print(f"\n⚠️ Error al guardar en base de datos: {str(e)}")
-
-# Verificar dependencias antes de continuar con visualizaciones
-if check_dependencies():
-    print("\nProceso ETL completado con éxito!")
 
-    # Opcional: Realizar análisis adicionales específicos por moneda
+def procesar_snapshot(path, salidas, backend, claves, memoria=None):
+    """Transforma un snapshot por lotes con `backend` y agrega las filas a las salidas
+
+    `claves` (un ``transform.DeduplicadorClave``) deja una fila por aviso y
+    fecha antes de escribir, así todas las salidas reciben las mismas filas.
+    """
+    nombre = snapshots.snapshot_name(path)
+    fecha = snapshots.snapshot_date(path)
+    invalidos = Counter()
+    leidos = filas = 0
+    for crudos, derivado in backend.lotes(path, nombre, fecha):
+        leidos += crudos
+        df = transform.aplicar_esquema(derivado, invalidos)
+        if memoria is not None:
+            memoria.agregar(derivado, df)
+        del derivado
+        df = claves(df)
+        filas += len(df)
+        for salida in salidas:
+            salida.append(df)
+    informar(nombre, leidos, filas, invalidos)
+    return filas
+
+
+def informar(nombre, leidos, filas, invalidos):
+    print(f"  {nombre}: {leidos} registros, {filas} después de eliminar duplicados")
+    for col, cantidad in invalidos.items():
+        print(f"  ⚠️ {col}: {cantidad} valores fuera del esquema quedaron nulos")
+
+
+def procesar_en_paralelo(pendientes, salidas, manifest, args, directorio, claves, memoria=None):
+    """Transforma los snapshots en un pool de procesos y combina los parciales en orden
+
+    Devuelve el total de filas agregadas; un error en un worker se propaga al
+    combinar su partición (los snapshots siguientes quedan 'pending').
+    """
+    for ruta, _, digest in pendientes:
+        manifest.mark_pending(ruta, digest)
+    manifest.save()
+
+    pool, por_snapshot = paralelo.lanzar(
+        [ruta for ruta, _, _ in pendientes], args.backend, args.chunk_size, args.workers, directorio,
+        args.partition_mb * 1024 * 1024, medir_memoria=memoria is not None,
+    )
+    total = 0
     try:
-        # Visualizar distribución de precios por moneda original
-        plt.figure(figsize=(12, 6))
-        sns.boxplot(x='moneda_original', y='precio_alquiler_original', data=df_limpio)
-        plt.title('Distribución de precios de alquiler originales por moneda')
-        plt.yscale('log')  # Usar escala logarítmica para mejor visualización
-        plt.tight_layout()
-        plt.savefig('/home/estefany/cursos/Mercado-inmobiliario-BA/output/precios_por_moneda.png')
-        
-        # Visualizar la distribución de precios por barrio, distinguiendo moneda original
-        plt.figure(figsize=(14, 8))
-        for moneda, marker in zip(['ARS', 'USD'], ['o', 'x']):
-            subset = df_limpio[df_limpio['moneda_original'] == moneda]
-            plt.scatter(
-                subset['superficie'], 
-                subset['precio_alquiler'], 
-                alpha=0.6,
-                marker=marker,
-                label=f'Original en {moneda}'
-            )
-        plt.xlabel('Superficie (m²)')
-        plt.ylabel('Precio Alquiler (ARS)')
-        plt.title('Relación entre superficie y precio de alquiler por moneda original')
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig('/home/estefany/cursos/Mercado-inmobiliario-BA/output/superficie_vs_precio_por_moneda.png')
-        
-        # Visualizar la relación entre superficie y precio
-        plt.figure(figsize=(10, 6))
-        sns.scatterplot(x='superficie', y='precio_alquiler', hue='ambientes', data=df_limpio)
-        plt.title('Relación entre superficie y precio de alquiler')
-        plt.tight_layout()
-        plt.savefig('/home/estefany/cursos/Mercado-inmobiliario-BA/output/superficie_vs_precio.png')
-        
-        print("Visualizaciones generadas correctamente.")
-    except Exception as e:
-        print(f"\n⚠️ Error al generar visualizaciones: {str(e)}")
+        for ruta, futuros in por_snapshot:
+            deduplicar = transform.Deduplicador()
+            invalidos = Counter()
+            leidos = filas = 0
+            for futuro in futuros:
+                try:
+                    parcial = futuro.result()
+                except Exception as e:
+                    raise RuntimeError(f"{ruta}: {e}") from e
+                leidos += parcial.leidos
+                invalidos.update(parcial.invalidos)
+                if memoria is not None:
+                    memoria.sumar(parcial.memoria)
+                for df in paralelo.combinar(parcial, deduplicar, claves):
+                    filas += len(df)
+                    for salida in salidas:
+                        salida.append(df)
+            informar(snapshots.snapshot_name(ruta), leidos, filas, invalidos)
+            manifest.mark_done(ruta, filas)
+            manifest.save()
+            total += filas
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return total
+
 
-    # Generar un informe con las principales estadísticas, incluyendo información sobre monedas
+def informar_excel(exportar):
+    """Corre `exportar` (devuelve las rutas escritas) e informa el resultado"""
     try:
-        reporte = {
-            'fecha_generacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'total_propiedades': len(df_limpio),
-            'propiedades_por_moneda_original': df_limpio['moneda_original'].value_counts().to_dict(),
-            'precio_promedio_ars': float(df_limpio[df_limpio['moneda_original'] == 'ARS']['precio_alquiler_original'].mean()),
-            'precio_promedio_usd': float(df_limpio[df_limpio['moneda_original'] == 'USD']['precio_alquiler_original'].mean()),
-            'precio_promedio_total_ars': float(df_limpio['precio_alquiler'].mean()),
-            'precio_mediano_total_ars': float(df_limpio['precio_alquiler'].median()),
-            'superficie_promedio': float(df_limpio['superficie'].mean()),
-            'distribucion_ambientes': {str(k): int(v) for k, v in df_limpio['ambientes'].value_counts().to_dict().items()},
-            'propiedades_por_barrio': {str(k): int(v) for k, v in df_limpio['barrio'].value_counts().to_dict().items()},
-            'tasa_conversion_usd_ars': tasa_cambio
-        }
-
-        import json
-        with open('/home/estefany/cursos/Mercado-inmobiliario-BA/output/reporte_propiedades.json', 'w') as f:
-            json.dump(reporte, f, indent=4)
+        rutas = exportar()
+        print(f"Datos guardados en Excel: {', '.join(rutas)}")
+    except ImportError:
+        print("\n⚠️ No se pudo guardar en formato Excel porque falta la librería 'openpyxl'")
+        print("Para habilitar esta función, ejecute el siguiente comando:")
+        print("pip install openpyxl")
+
+
+def exportar_excel(args, ruta_base, nombres, excel_dir):
+    """Exporta un Excel por snapshot de `nombres`
 
+    Con --excel-background lo escribe otro proceso y devuelve (pool, futuro).
+    """
+    opciones = {
+        'texto_max': args.excel_text_max or None,
+        'omitir_texto': args.excel_no_text,
+        'por_archivo': args.excel_split == 'files',
+    }
+    # Sin openpyxl no tiene sentido lanzar el proceso: el error se informa acá
+    if args.excel_background and importlib.util.find_spec('openpyxl'):
+        pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        print("Exportando el Excel en segundo plano...")
+        return pool, pool.submit(outputs.write_excel_snapshots, ruta_base, nombres, excel_dir, **opciones)
+    informar_excel(lambda: outputs.write_excel_snapshots(ruta_base, nombres, excel_dir, **opciones))
+    return None
+
+
+def generar_derivados(args, base, nombres, fechas, data_dir, output_dir, dependencias_ok):
+    """Excel, cubo, reporte y gráficos a partir de las filas cargadas en la corrida
+
+    El Excel se escribe sólo para los snapshots `nombres`. El cubo y los
+    histogramas de los gráficos se recalculan para las fechas `fechas` con sus
+    filas de la base y se combinan con los guardados; con `fechas` None (o sin
+    agregados guardados) se calculan sobre toda la base.
+    """
+    excel = None
+    if not args.no_excel:
+        excel = exportar_excel(args, base.path, nombres, os.path.join(data_dir, 'excel'))
+
+    ruta_cubo = os.path.join(data_dir, 'cubo_propiedades.csv')
+    ruta_conteos = os.path.join(data_dir, 'cubo_conteos.csv')
+    ruta_histogramas = os.path.join(data_dir, 'histogramas_graficos.csv')
+    guardado, conteos = cubo.cargar(ruta_cubo, ruta_conteos)
+    hist = graficos.cargar_histogramas(ruta_histogramas)
+    if guardado is None or hist is None:
+        fechas = None
+    df = base.leer(reporte.COLUMNAS_REPORTE, fechas)
+    # Una sola agrupación por fecha: el reporte y los tableros leen del cubo
+    tabla, conteos = cubo.combinar(guardado, conteos, df, fechas)
+    hist = graficos.combinar_histogramas(hist, graficos.histogramas(df), fechas)
+    del df
+    cubo.guardar(tabla, ruta_cubo, conteos, ruta_conteos)
+    hist.to_csv(ruta_histogramas, index=False)
+    alcance = 'toda la base' if fechas is None else f"las fechas {', '.join(sorted(map(str, fechas)))}"
+    print(f"Cubo de agregados guardado: {ruta_cubo} ({len(tabla) - 1} celdas, recalculadas para {alcance})")
+    reporte.resumen_por_moneda(tabla)
+
+    if not dependencias_ok:
+        print("\n⚠️ Proceso ETL completado parcialmente. Por favor instale las dependencias faltantes para funcionalidad completa.")
+        print("Para instalar todas las dependencias necesarias, ejecute:")
+        print("pip install pandas numpy matplotlib seaborn openpyxl")
+        return 0
+
+    if not args.no_charts:
+        try:
+            # Hasta UMBRAL_AGREGACION filas se dibuja un punto por fila; si no, desde los histogramas
+            filas = None
+            if cubo.total(tabla)['propiedades'] <= graficos.UMBRAL_AGREGACION:
+                filas, hist = base.leer(graficos.COLUMNAS), None
+            generados, sin_cambios = graficos.generar_graficos(filas, output_dir, args.chart_workers, hist)
+            print(f"Visualizaciones: {len(generados)} generadas, {len(sin_cambios)} sin cambios en los datos.")
+        except Exception as e:
+            print(f"\n⚠️ Error al generar visualizaciones: {str(e)}")
+
+    try:
+        reporte.generar_reporte(tabla, output_dir)
         print("\nReporte estadístico generado.")
     except Exception as e:
         print(f"\n⚠️ Error al generar el reporte: {str(e)}")
-else:
-    print("\n⚠️ Proceso ETL completado parcialmente. Por favor instale las dependencias faltantes para funcionalidad completa.")
-    print("Para instalar todas las dependencias necesarias, ejecute:")
-    print("pip install pandas numpy matplotlib seaborn sqlalchemy openpyxl")
+
+    if excel is not None:
+        pool, futuro = excel
+        informar_excel(futuro.result)
+        pool.shutdown()
+
+    print("\nProceso ETL completado con éxito!")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='ETL incremental de los snapshots de propiedades')
+    parser.add_argument('--base-dir', default=BASE_DIR, help='raíz del proyecto (con output/ y data/)')
+    parser.add_argument('--input', nargs='+', default=None,
+                        help='snapshots a procesar (por defecto: todos los de output/)')
+    parser.add_argument('--full', action='store_true', help='ignorar el manifiesto y reconstruir las salidas')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='registros por chunk')
+    parser.add_argument('--backend', choices=sorted(backends.BACKENDS), default='pandas',
+                        help='motor de las transformaciones (polars: plan lazy multi-hilo)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='procesos para transformar los snapshots en paralelo (0: uno por CPU)')
+    parser.add_argument('--partition-mb', type=int, default=paralelo.TAMANO_PARTICION // (1024 * 1024),
+                        help='con --workers, los JSON Lines más grandes se parten en rangos de este tamaño')
+    parser.add_argument('--no-excel', action='store_true', help='no regenerar el Excel')
+    parser.add_argument('--excel-text-max', type=int, default=500,
+                        help='caracteres de la descripción en el Excel (0: texto completo)')
+    parser.add_argument('--excel-no-text', action='store_true', help='no exportar la descripción al Excel')
+    parser.add_argument('--excel-split', choices=['sheets', 'files'], default='sheets',
+                        help='pasado el límite de filas de xlsx, seguir en otra hoja o en otro archivo')
+    parser.add_argument('--excel-background', action='store_true',
+                        help='exportar el Excel en otro proceso mientras se generan el reporte y los gráficos')
+    parser.add_argument('--no-charts', action='store_true', help='no generar los gráficos')
+    parser.add_argument('--chart-workers', type=int, default=0,
+                        help='procesos para dibujar los gráficos que cambiaron (0: uno por CPU)')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='mostrar los bytes por columna antes y después de aplicar el esquema')
+    args = parser.parse_args(argv)
+    if args.input is None and os.environ.get('ETL_INPUT_JSON'):
+        args.input = [os.environ['ETL_INPUT_JSON']]
+    if args.workers <= 0:
+        args.workers = os.cpu_count() or 1
+    if args.chart_workers <= 0:
+        args.chart_workers = os.cpu_count() or 1
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    data_dir = os.path.join(args.base_dir, 'data')
+    output_dir = os.path.join(args.base_dir, 'output')
+    # Verificar y crear directorios necesarios
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("Iniciando proceso ETL...")
+    # Antes de procesar nada, para que la advertencia no llegue al final
+    dependencias_ok = check_dependencies()
+    try:
+        backend = backends.crear_backend(args.backend, args.chunk_size)
+    except ImportError:
+        print(f"Error: el motor '{args.backend}' requiere la librería '{args.backend}'")
+        print(f"pip install {args.backend}")
+        return 1
+    ruta_csv_salida = os.path.join(data_dir, 'propiedades_transformadas.csv')
+    base = outputs.SqliteOutput(os.path.join(data_dir, 'propiedades.db'))
+    salidas = [outputs.CsvOutput(ruta_csv_salida), base]
+
+    manifest = snapshots.Manifest(os.path.join(data_dir, 'etl_manifest.json'))
+    reconstruir = args.full or not manifest or not all(salida.compatible() for salida in salidas)
+    if reconstruir:
+        # Sin manifiesto (o salidas con el esquema anterior): reconstruir todo
+        print("Reconstruyendo las salidas desde cero")
+        for salida in salidas:
+            salida.reset()
+        outputs.remove_excel(os.path.join(data_dir, 'excel'))
+        manifest.entries = {}
+
+    rutas = args.input or snapshots.discover_snapshots(output_dir)
+    for ruta in rutas:
+        if not os.path.exists(ruta):
+            print(f"Error: No se encontró el archivo JSON en la ruta: {ruta}")
+            print("Verifique la ubicación del archivo y vuelva a ejecutar el script.")
+            return 1
+
+    pendientes = []
+    for ruta in rutas:
+        estado, digest = manifest.classify(ruta)
+        if estado:
+            pendientes.append((ruta, estado, digest))
+    nuevos = sum(1 for _, estado, _ in pendientes if estado == 'new')
+    modificados = [snapshots.snapshot_name(ruta) for ruta, estado, _ in pendientes if estado == 'changed']
+    print(f"Snapshots: {len(rutas)} encontrados, {nuevos} nuevos, {len(modificados)} modificados")
+    if not pendientes:
+        manifest.save()
+        for salida in salidas:
+            salida.close()
+        print("No hay datos nuevos: las salidas ya están actualizadas.")
+        return 0
+
+    for salida in salidas:
+        salida.remove_snapshots(modificados)
+    # Fechas de los snapshots pendientes: las únicas cuyas filas cambian en la corrida
+    fechas = {snapshots.snapshot_date(ruta) for ruta, _, _ in pendientes}
+    # Una fila por aviso y fecha: gana la primera aparición, también frente a lo ya cargado
+    claves = transform.DeduplicadorClave(base.claves(fechas))
+
+    memoria = transform.ReporteMemoria() if args.memory_report else None
+    total = 0
+    if args.workers > 1:
+        print(f"Procesando en paralelo con {args.workers} workers")
+        try:
+            with tempfile.TemporaryDirectory(prefix='.etl_parciales_', dir=data_dir) as directorio:
+                total = procesar_en_paralelo(pendientes, salidas, manifest, args, directorio, claves, memoria)
+        except Exception as e:
+            # Los snapshots sin combinar quedan 'pending' y se reemplazan en la próxima corrida
+            print(f"Error al procesar en paralelo: {str(e)}")
+            return 1
+    else:
+        for ruta, _, digest in pendientes:
+            manifest.mark_pending(ruta, digest)
+            manifest.save()
+            try:
+                filas = procesar_snapshot(ruta, salidas, backend, claves, memoria)
+            except Exception as e:
+                # Queda 'pending': la próxima corrida reemplaza lo que se haya escrito
+                print(f"Error al procesar {ruta}: {str(e)}")
+                return 1
+            manifest.mark_done(ruta, filas)
+            manifest.save()
+            total += filas
+    print(f"Registros agregados: {total}")
+    if memoria is not None:
+        memoria.imprimir()
+    for salida in salidas:
+        resumen = salida.finalize()
+        if resumen:
+            print(resumen)
+    print(f"Datos guardados en CSV: {ruta_csv_salida}")
+
+    # Derivados: sólo lo que cambió en la corrida (o todo, si se reconstruyó)
+    nombres = [snapshots.snapshot_name(ruta) for ruta, _, _ in pendientes]
+    try:
+        return generar_derivados(
+            args, base, nombres, None if reconstruir else fechas, data_dir, output_dir, dependencias_ok,
+        )
+    finally:
+        for salida in salidas:
+            salida.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+Gráficos del dataset consolidado.
+
+Cada gráfico declara las columnas que usa; antes de dibujarlo se calcula un
+hash de sus datos (más la versión de los gráficos) y, si coincide con el del
+caché ``graficos_cache.json`` y el PNG existe, no se vuelve a generar.
+
+Con hasta ``UMBRAL_AGREGACION`` filas se dibuja un punto por fila. Con más,
+los gráficos salen de histogramas sobre grillas logarítmicas fijas
+(``histogramas``): un mapa de densidad por moneda, otro coloreado por la
+media de ambientes de cada celda y un boxplot con cuartiles aproximados por
+intervalo, sin outliers. Como la grilla no depende de los datos, el ETL
+guarda los histogramas por fecha de snapshot y los combina entre corridas
+(``combinar_histogramas``) igual que el cubo, sin volver a leer el dataset.
+Los gráficos pendientes se dibujan con el backend Agg, en un pool de
+procesos si hay más de un worker, y cada figura se cierra al guardarla.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+VERSION = 2
+UMBRAL_AGREGACION = 50_000
+# Los mapas de densidad cubren este rango de cuantiles: los valores extremos aplastan la grilla
+CUANTILES_EXTENSION = (0.001, 0.999)
+CACHE = 'graficos_cache.json'
+# Bordes de los intervalos de los histogramas (logarítmicos, fijos para poder combinarlos)
+BORDES = {
+    'superficie': np.geomspace(1, 1e5, 201),
+    'precio_alquiler': np.geomspace(1e3, 1e9, 181),
+    'precio_alquiler_original': np.geomspace(1, 1e9, 361),
+}
+COLUMNAS_HISTOGRAMAS = ['grafico', 'fecha_snapshot', 'moneda_original', 'x', 'y', 'propiedades', 'suma']
+# Moneda de los histogramas de gráficos que no la distinguen
+TODAS = 'todas'
+
+
+def _pyplot():
+    import matplotlib
+
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def _centros(columna):
+    bordes = BORDES[columna]
+    return np.sqrt(bordes[:-1] * bordes[1:])
+
+
+def _intervalos(serie, columna):
+    """Intervalo de BORDES[columna] de cada valor (-1 fuera de la grilla)"""
+    bordes = BORDES[columna]
+    indices = np.searchsorted(bordes, serie.to_numpy('float64'), side='right') - 1
+    return np.where((indices >= 0) & (indices < len(bordes) - 1), indices, -1)
+
+
+def _cuantil_intervalos(conteos, q):
+    """Intervalo que contiene el cuantil `q` de un histograma 1D"""
+    acumulado = np.cumsum(conteos)
+    return int(np.searchsorted(acumulado, q * acumulado[-1], side='left'))
+
+
+def _extension(hist, x, y):
+    """Bordes que cubren CUANTILES_EXTENSION de las marginales del histograma 2D"""
+    bajo, alto = CUANTILES_EXTENSION
+    limites = []
+    for eje, columna in (('x', x), ('y', y)):
+        conteos = hist.groupby(eje)['propiedades'].sum().reindex(range(len(BORDES[columna]) - 1), fill_value=0)
+        conteos = conteos.to_numpy()
+        limites += [BORDES[columna][_cuantil_intervalos(conteos, bajo)],
+                    BORDES[columna][_cuantil_intervalos(conteos, alto) + 1]]
+    return limites
+
+
+def _grilla(hist, x, y, valores):
+    """Matriz (y, x) con `valores` en las celdas del histograma 2D (enmascarada en las vacías)"""
+    grilla = np.full((len(BORDES[y]) - 1, len(BORDES[x]) - 1), np.nan)
+    grilla[hist['y'].to_numpy(), hist['x'].to_numpy()] = valores
+    return np.ma.masked_invalid(grilla)
+
+
+def precios_por_moneda(df, path):
+    """Distribución de precios de alquiler originales por moneda"""
+    import seaborn as sns
+
+    plt = _pyplot()
+    df = df.dropna()
+    fig, ax = plt.subplots(figsize=(12, 6))
+    sns.boxplot(x='moneda_original', y='precio_alquiler_original', data=df, ax=ax)
+    ax.set_title('Distribución de precios de alquiler originales por moneda')
+    ax.set_yscale('log')  # Usar escala logarítmica para mejor visualización
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def precios_por_moneda_agregado(hist, path):
+    """Boxplot de precios originales por moneda con cuartiles y bigotes del histograma"""
+    plt = _pyplot()
+    centros = _centros('precio_alquiler_original')
+    estadisticas = []
+    for moneda, grupo in hist.groupby('moneda_original'):
+        conteos = grupo.set_index('x')['propiedades'].reindex(range(len(centros)), fill_value=0).to_numpy()
+        q1, med, q3 = (centros[_cuantil_intervalos(conteos, q)] for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        dentro = centros[(conteos > 0) & (centros >= q1 - 1.5 * iqr) & (centros <= q3 + 1.5 * iqr)]
+        estadisticas.append({
+            'label': moneda, 'q1': q1, 'med': med, 'q3': q3, 'whislo': dentro.min(), 'whishi': dentro.max(),
+        })
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.bxp(estadisticas, showfliers=False)
+    ax.set_xlabel('moneda_original')
+    ax.set_ylabel('precio_alquiler_original')
+    ax.set_title('Distribución de precios de alquiler originales por moneda')
+    ax.set_yscale('log')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def superficie_vs_precio_por_moneda(df, path):
+    """Superficie contra precio, distinguiendo la moneda original"""
+    plt = _pyplot()
+    df = df.dropna()
+    fig, ax = plt.subplots(figsize=(14, 8))
+    for moneda, marker in zip(['ARS', 'USD'], ['o', 'x']):
+        subset = df[df['moneda_original'] == moneda]
+        ax.scatter(
+            subset['superficie'],
+            subset['precio_alquiler'],
+            alpha=0.6,
+            marker=marker,
+            label=f'Original en {moneda}'
+        )
+    ax.set_xlabel('Superficie (m²)')
+    ax.set_ylabel('Precio Alquiler (ARS)')
+    ax.set_title('Relación entre superficie y precio de alquiler por moneda original')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def superficie_vs_precio_por_moneda_agregado(hist, path):
+    """Un mapa de densidad de superficie contra precio por moneda (superpuestos no se distinguen)"""
+    from matplotlib.colors import LogNorm
+
+    plt = _pyplot()
+    monedas = ['ARS', 'USD']
+    x0, x1, y0, y1 = _extension(hist, 'superficie', 'precio_alquiler')
+    fig, ejes = plt.subplots(1, len(monedas), figsize=(14, 8), sharex=True, sharey=True)
+    for ax, moneda in zip(ejes, monedas):
+        subset = hist[hist['moneda_original'] == moneda]
+        malla = ax.pcolormesh(
+            BORDES['superficie'], BORDES['precio_alquiler'],
+            _grilla(subset, 'superficie', 'precio_alquiler', subset['propiedades']), norm=LogNorm(),
+        )
+        fig.colorbar(malla, ax=ax, label='Propiedades')
+        ax.set_title(f'Original en {moneda}')
+        ax.set_xlabel('Superficie (m²)')
+        ax.grid(True, alpha=0.3)
+    ejes[0].set(xscale='log', yscale='log', xlim=(x0, x1), ylim=(y0, y1), ylabel='Precio Alquiler (ARS)')
+    fig.suptitle('Relación entre superficie y precio de alquiler por moneda original')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def superficie_vs_precio(df, path):
+    """Superficie contra precio, coloreado por ambientes"""
+    import seaborn as sns
+
+    plt = _pyplot()
+    df = df.dropna()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.scatterplot(x='superficie', y='precio_alquiler', hue='ambientes', data=df, ax=ax)
+    ax.set_title('Relación entre superficie y precio de alquiler')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def superficie_vs_precio_agregado(hist, path):
+    """Superficie contra precio; el color es la media de ambientes de cada celda"""
+    plt = _pyplot()
+    x0, x1, y0, y1 = _extension(hist, 'superficie', 'precio_alquiler')
+    fig, ax = plt.subplots(figsize=(10, 6))
+    malla = ax.pcolormesh(
+        BORDES['superficie'], BORDES['precio_alquiler'],
+        _grilla(hist, 'superficie', 'precio_alquiler', hist['suma'] / hist['propiedades']),
+    )
+    fig.colorbar(malla, ax=ax, label='ambientes (media)')
+    ax.set(xscale='log', yscale='log', xlim=(x0, x1), ylim=(y0, y1), xlabel='superficie', ylabel='precio_alquiler')
+    ax.set_title('Relación entre superficie y precio de alquiler')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+# Archivo: (función que lo dibuja desde las filas, función desde el histograma, columnas que usa)
+GRAFICOS = {
+    'precios_por_moneda.png': (
+        precios_por_moneda, precios_por_moneda_agregado, ['moneda_original', 'precio_alquiler_original'],
+    ),
+    'superficie_vs_precio_por_moneda.png': (
+        superficie_vs_precio_por_moneda, superficie_vs_precio_por_moneda_agregado,
+        ['moneda_original', 'superficie', 'precio_alquiler'],
+    ),
+    'superficie_vs_precio.png': (
+        superficie_vs_precio, superficie_vs_precio_agregado, ['superficie', 'precio_alquiler', 'ambientes'],
+    ),
+}
+COLUMNAS = list(dict.fromkeys(columna for *_, columnas in GRAFICOS.values() for columna in columnas))
+# Archivo: (columna del eje x, del eje y, sumada para el color) de su histograma
+EJES = {
+    'precios_por_moneda.png': ('precio_alquiler_original', None, None),
+    'superficie_vs_precio_por_moneda.png': ('superficie', 'precio_alquiler', None),
+    'superficie_vs_precio.png': ('superficie', 'precio_alquiler', 'ambientes'),
+}
+
+
+def histogramas(df):
+    """Histogramas de los gráficos por fecha de snapshot (y moneda, si el gráfico la usa)"""
+    partes = []
+    for nombre, (_, _, columnas) in GRAFICOS.items():
+        x, y, color = EJES[nombre]
+        datos = df[['fecha_snapshot', *columnas]].dropna()
+        celdas = pd.DataFrame({
+            'fecha_snapshot': datos['fecha_snapshot'].astype('str'),
+            'moneda_original': datos['moneda_original'].astype('str') if 'moneda_original' in columnas else TODAS,
+            'x': _intervalos(datos[x], x),
+            'y': _intervalos(datos[y], y) if y else 0,
+            'suma': datos[color].astype('float64') if color else 0.0,
+        })
+        celdas = celdas[(celdas['x'] >= 0) & (celdas['y'] >= 0)]
+        parte = celdas.groupby(['fecha_snapshot', 'moneda_original', 'x', 'y']).agg(
+            propiedades=('suma', 'size'), suma=('suma', 'sum'),
+        )
+        partes.append(parte.reset_index().assign(grafico=nombre))
+    return pd.concat(partes, ignore_index=True)[COLUMNAS_HISTOGRAMAS]
+
+
+def combinar_histogramas(guardados, nuevos, fechas=None):
+    """Histogramas guardados con las fechas `fechas` reemplazadas por `nuevos` (sin `fechas`, todos)"""
+    if guardados is None or fechas is None:
+        return nuevos
+    fechas = [str(fecha) for fecha in fechas]
+    return pd.concat([guardados[~guardados['fecha_snapshot'].isin(fechas)], nuevos], ignore_index=True)
+
+
+def cargar_histogramas(path):
+    """Histogramas guardados, o None si faltan o tienen otras columnas"""
+    if not os.path.exists(path):
+        return None
+    hist = pd.read_csv(path, dtype={'grafico': 'str', 'fecha_snapshot': 'str', 'moneda_original': 'str'})
+    return hist if list(hist.columns) == COLUMNAS_HISTOGRAMAS else None
+
+
+def _datos(nombre, df, hist):
+    """Filas del gráfico `nombre` o, con `hist`, su histograma sumado sobre las fechas"""
+    if hist is None:
+        return df[GRAFICOS[nombre][2]]
+    hist = hist[hist['grafico'] == nombre]
+    return hist.groupby(['moneda_original', 'x', 'y'], as_index=False)[['propiedades', 'suma']].sum()
+
+
+def hash_datos(datos, nombre):
+    """Hash de los datos del gráfico `nombre` (cambia también con VERSION y UMBRAL_AGREGACION)"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{VERSION}:{UMBRAL_AGREGACION}:{nombre}:{",".join(datos.columns)}'.encode())
+    digest.update(pd.util.hash_pandas_object(datos, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _dibujar(nombre, agregado, datos, path):
+    GRAFICOS[nombre][1 if agregado else 0](datos, path)
+    return nombre
+
+
+def generar_graficos(df, output_dir, workers=1, hist=None):
+    """Dibuja los gráficos cuyos datos cambiaron; devuelve (generados, sin cambios)
+
+    Los dibuja desde las filas `df` o, con más de UMBRAL_AGREGACION filas,
+    desde sus histogramas (`hist`, o calculados de `df` si no se pasan).
+    """
+    if hist is None and len(df) > UMBRAL_AGREGACION:
+        hist = histogramas(df)
+    cache_path = os.path.join(output_dir, CACHE)
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+
+    datos = {nombre: _datos(nombre, df, hist) for nombre in GRAFICOS}
+    pendientes = {}
+    for nombre in GRAFICOS:
+        digest = hash_datos(datos[nombre], nombre)
+        if cache.get(nombre) != digest or not os.path.exists(os.path.join(output_dir, nombre)):
+            pendientes[nombre] = digest
+    sin_cambios = [nombre for nombre in GRAFICOS if nombre not in pendientes]
+
+    tareas = [(nombre, hist is not None, datos[nombre], os.path.join(output_dir, nombre)) for nombre in pendientes]
+    workers = min(workers, len(tareas))
+    generados = []
+    try:
+        if workers > 1:
+            # spawn: el proceso principal puede tener hilos de Polars o de SQLite
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futuros = [pool.submit(_dibujar, *tarea) for tarea in tareas]
+                for futuro in futuros:
+                    generados.append(futuro.result())
+        else:
+            for tarea in tareas:
+                generados.append(_dibujar(*tarea))
+    finally:
+        # Si falla un gráfico, los que ya se generaron quedan en el caché
+        for nombre in generados:
+            cache[nombre] = pendientes[nombre]
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+    return generados, sin_cambios
@@ -0,0 +1,392 @@
+"""
+Salidas incrementales del ETL: CSV consolidado y tabla SQLite.
+
+Las filas de cada snapshot llevan la columna ``snapshot`` con el nombre del
+archivo de origen. Los snapshots nuevos se agregan al final; los modificados
+primero se quitan (``remove_snapshots``) y después se vuelven a agregar. En
+SQLite cada aviso tiene una fila por fecha de snapshot (upsert). El Excel se
+escribe por snapshot, leyendo de SQLite sólo las filas de ese snapshot.
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+
+import pandas as pd
+
+from etl.transform import CLAVE, COLUMNAS, ESQUEMA, dtypes_lectura
+
+
+class CsvOutput:
+    """CSV consolidado con el esquema COLUMNAS
+
+    Si el lote trae sus filas ya renderizadas en ``df.attrs['csv']`` (modo
+    paralelo: las renderiza cada worker), se escriben tal cual.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def compatible(self):
+        """True si el archivo no existe o ya tiene el esquema actual"""
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return True
+        with open(self.path, newline='', encoding='utf-8') as f:
+            return next(csv.reader(f), None) == COLUMNAS
+
+    def reset(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def remove_snapshots(self, names, chunk_size=100000):
+        """Reescribe el CSV sin las filas de los snapshots `names` (por chunks)"""
+        if not names or not os.path.exists(self.path):
+            return
+        tmp_path = f'{self.path}.tmp'
+        header = True
+        for chunk in pd.read_csv(self.path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            chunk = chunk[~chunk['snapshot'].isin(names)]
+            chunk.to_csv(tmp_path, mode='w' if header else 'a', header=header, index=False)
+            header = False
+        if header:
+            # CSV sin filas: conservar sólo el encabezado
+            pd.DataFrame(columns=COLUMNAS).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+
+    def append(self, df):
+        header = not os.path.exists(self.path) or not os.path.getsize(self.path)
+        if 'csv' not in df.attrs:
+            df.to_csv(self.path, mode='a', header=header, index=False)
+            return
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            if header:
+                f.write(','.join(COLUMNAS) + '\n')
+            f.write(df.attrs['csv'])
+
+    def finalize(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class SqliteOutput:
+    """Tabla ``propiedades`` en SQLite con clave (listing_id, fecha_snapshot)
+
+    Cada chunk se inserta con un upsert (``INSERT ... ON CONFLICT DO UPDATE``)
+    en transacciones de a lo sumo ``batch_size`` filas: una corrida cuesta
+    O(filas nuevas · log n) y no reescribe la tabla. Los índices secundarios
+    se crean al final de la carga (una sola vez, después de reconstruir) y
+    ``ANALYZE`` se corre con ``analysis_limit`` para que tampoco dependa del
+    tamaño de la tabla.
+    """
+
+    PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA cache_size=-65536',
+    )
+    INDICES = ('barrio', 'ambientes', 'scraped_at', 'moneda_original', 'snapshot', 'fecha_snapshot')
+    ANALYSIS_LIMIT = 1000
+
+    def __init__(self, path, table='propiedades', batch_size=50000):
+        self.path = path
+        self.table = table
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        for pragma in self.PRAGMAS:
+            self.connection.execute(pragma)
+        self.tiempos = Counter()
+        self.filas = 0
+
+        columnas = ', '.join(COLUMNAS)
+        marcadores = ', '.join('?' * len(COLUMNAS))
+        actualizar = ', '.join(f'{col} = excluded.{col}' for col in COLUMNAS if col not in CLAVE)
+        self.upsert_sql = (
+            f'INSERT INTO {table} ({columnas}) VALUES ({marcadores}) '
+            f'ON CONFLICT ({", ".join(CLAVE)}) DO UPDATE SET {actualizar}'
+        )
+
+    def _columns(self):
+        columns = [row[1] for row in self.connection.execute(f'PRAGMA table_info({self.table})')]
+        return columns or None
+
+    def compatible(self):
+        columns = self._columns()
+        return columns is None or columns == COLUMNAS
+
+    def reset(self):
+        with self.connection:
+            self.connection.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def _crear_tabla(self):
+        definiciones = ',\n    '.join(
+            f'{col} {_tipo_sql(ESQUEMA[col])}{" NOT NULL" if col in CLAVE else ""}' for col in COLUMNAS
+        )
+        self.connection.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.table} (\n    {definiciones},\n'
+            f'    PRIMARY KEY ({", ".join(CLAVE)})\n)'
+        )
+
+    def remove_snapshots(self, names):
+        if not names or self._columns() is None:
+            return
+        with self.connection:
+            self.connection.execute(
+                f'DELETE FROM {self.table} WHERE snapshot IN ({", ".join("?" * len(names))})', list(names),
+            )
+
+    def claves(self, fechas):
+        """Claves (listing_id, fecha_snapshot) ya guardadas para las fechas `fechas`"""
+        fechas = [str(fecha) for fecha in fechas]
+        if not fechas or self._columns() is None:
+            return set()
+        return set(self.connection.execute(
+            f'SELECT {", ".join(CLAVE)} FROM {self.table} WHERE fecha_snapshot IN ({", ".join("?" * len(fechas))})',
+            fechas,
+        ))
+
+    def leer(self, columnas, fechas=None):
+        """Columnas `columnas` de las filas de las fechas `fechas` (o de todas), con los dtypes de ESQUEMA"""
+        if self._columns() is None:
+            return _con_esquema(pd.DataFrame(columns=columnas))
+        consulta = f'SELECT {", ".join(columnas)} FROM {self.table}'
+        params = []
+        if fechas is not None:
+            params = [str(fecha) for fecha in fechas]
+            consulta += f' WHERE fecha_snapshot IN ({", ".join("?" * len(params))})'
+        return _con_esquema(pd.read_sql_query(f'{consulta} ORDER BY rowid', self.connection, params=params))
+
+    def append(self, df):
+        inicio = time.perf_counter()
+        self._crear_tabla()
+        filas = _filas_sql(df)
+        for i in range(0, len(filas), self.batch_size):
+            with self.connection:
+                self.connection.executemany(self.upsert_sql, filas[i:i + self.batch_size])
+        self.filas += len(filas)
+        self.tiempos['upsert'] += time.perf_counter() - inicio
+
+    def finalize(self):
+        """Índices secundarios + ANALYZE acotado; devuelve un resumen con los tiempos"""
+        if self._columns() is None:
+            return None
+        inicio = time.perf_counter()
+        with self.connection:
+            for col in self.INDICES:
+                self.connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS idx_{self.table}_{col} ON {self.table} ({col})'
+                )
+        self.tiempos['indices'] += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        self.connection.execute(f'PRAGMA analysis_limit={self.ANALYSIS_LIMIT}')
+        self.connection.execute('ANALYZE')
+        self.connection.commit()
+        self.tiempos['analyze'] += time.perf_counter() - inicio
+
+        total, = self.connection.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()
+        return (
+            f"SQLite {self.path}: {self.filas} filas en upsert ({self.tiempos['upsert']:.2f} s), "
+            f"índices {self.tiempos['indices']:.2f} s, ANALYZE {self.tiempos['analyze']:.2f} s; "
+            f"{total} filas en la tabla"
+        )
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+
+def _tipo_sql(dtype):
+    dtype = str(dtype)
+    if dtype.startswith(('Int', 'UInt', 'int')):
+        return 'INTEGER'
+    if dtype.startswith('float'):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _filas_sql(df):
+    """Tuplas con tipos nativos de Python (None para los nulos) en el orden de COLUMNAS"""
+    columnas = []
+    for col in COLUMNAS:
+        serie = df[col]
+        valores = serie.dt.strftime('%Y-%m-%d %H:%M:%S') if serie.dtype.kind == 'M' else serie
+        columnas.append(valores.astype(object).where(serie.notna(), None).tolist())
+    return list(zip(*columnas))
+
+
+def _con_esquema(df):
+    """Filas leídas de SQLite con los dtypes de ESQUEMA (scraped_at como datetime)"""
+    df = df.astype(dtypes_lectura(df.columns))
+    if 'scraped_at' in df.columns:
+        df['scraped_at'] = pd.to_datetime(df['scraped_at'], format='ISO8601')
+    return df
+
+
+# Límites de xlsx: filas por hoja (con el encabezado) y caracteres por celda
+EXCEL_MAX_FILAS = 1_048_576
+EXCEL_MAX_TEXTO = 32_767
+TEXTO_LARGO = ['descripcion']
+
+
+class _LibroExcel:
+    """Libros openpyxl write-only: las filas se escriben y se descartan (memoria constante)
+
+    Al llegar a `max_filas` filas se abre otra hoja, o con `por_archivo`
+    otro archivo (``<nombre>_2.xlsx``, ...).
+    """
+
+    def __init__(self, path, columnas, max_filas=EXCEL_MAX_FILAS, por_archivo=False):
+        self.path = path
+        self.columnas = columnas
+        self.max_filas = max_filas
+        self.por_archivo = por_archivo
+        self.rutas = []
+        self.workbook = None
+        self.hoja = None
+        self.filas_hoja = 0
+        self.partes = 0
+
+    def _ruta(self):
+        if not self.por_archivo or not self.partes:
+            return self.path
+        base, ext = os.path.splitext(self.path)
+        return f'{base}_{self.partes + 1}{ext}'
+
+    def _nueva_hoja(self):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        if self.workbook is None or self.por_archivo:
+            self._guardar()
+            self.workbook = Workbook(write_only=True)
+            self.rutas.append(self._ruta())
+        self.partes += 1
+        nombre = 'propiedades' if self.partes == 1 or self.por_archivo else f'propiedades_{self.partes}'
+        self.hoja = self.workbook.create_sheet(nombre)
+        self.hoja.freeze_panes = 'A2'
+        encabezado = []
+        for col in self.columnas:
+            celda = WriteOnlyCell(self.hoja, value=col)
+            celda.font = Font(bold=True)
+            encabezado.append(celda)
+        self.hoja.append(encabezado)
+        self.filas_hoja = 1
+
+    def append(self, filas):
+        for fila in filas:
+            if self.hoja is None or self.filas_hoja >= self.max_filas:
+                self._nueva_hoja()
+            self.hoja.append(fila)
+            self.filas_hoja += 1
+
+    def close(self):
+        if self.hoja is None:
+            # Dataset vacío: sólo el encabezado
+            self._nueva_hoja()
+        self._guardar()
+
+    def _guardar(self):
+        if self.workbook is None:
+            return
+        ruta = self.rutas[-1]
+        tmp_path = f'{ruta}.tmp'
+        self.workbook.save(tmp_path)
+        os.replace(tmp_path, ruta)
+        self.workbook = None
+
+
+def _filas_excel(df, texto_max):
+    """Tuplas con un tipo fijo por columna (int, float, datetime o str; None para los nulos)"""
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    columnas = []
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_string_dtype(serie.dtype) or isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype('str').str.replace(ILLEGAL_CHARACTERS_RE, '', regex=True)
+            limite = min(texto_max or EXCEL_MAX_TEXTO, EXCEL_MAX_TEXTO) if col in TEXTO_LARGO else EXCEL_MAX_TEXTO
+            largos = serie.str.len() > limite
+            if largos.any():
+                serie = serie.where(~largos, serie.str.slice(0, limite - 1) + '…')
+        columnas.append(serie.astype(object).where(df[col].notna(), None).tolist())
+    return zip(*columnas)
+
+
+def _escribir_excel(libro, chunks, columnas, texto_max):
+    for chunk in chunks:
+        libro.append(_filas_excel(chunk[columnas], texto_max))
+    libro.close()
+    return libro.rutas
+
+
+def _columnas_excel(omitir_texto):
+    return [col for col in COLUMNAS if not (omitir_texto and col in TEXTO_LARGO)]
+
+
+def write_excel(csv_path, excel_path, texto_max=None, omitir_texto=False, por_archivo=False,
+                chunk_size=50000, max_filas=EXCEL_MAX_FILAS):
+    """Excel con el dataset consolidado, escrito en streaming; devuelve las rutas escritas
+
+    El CSV se lee por chunks y las filas van a un libro write-only de openpyxl,
+    así que la memoria no depende del tamaño del dataset. Los textos largos
+    (TEXTO_LARGO) se truncan a `texto_max` caracteres o, con `omitir_texto`, no
+    se exportan. Pasado el límite de filas de xlsx se sigue en otra hoja (o en
+    otro archivo, con `por_archivo`).
+    """
+    columnas = _columnas_excel(omitir_texto)
+    chunks = pd.read_csv(csv_path, usecols=columnas, dtype=dtypes_lectura(columnas), chunksize=chunk_size)
+    chunks = (_con_esquema(chunk) for chunk in chunks)
+    return _escribir_excel(_LibroExcel(excel_path, columnas, max_filas, por_archivo), chunks, columnas, texto_max)
+
+
+def excel_snapshot(excel_dir, nombre):
+    """Ruta del Excel del snapshot `nombre` en `excel_dir` (``x.jsonl`` -> ``x_jsonl.xlsx``)"""
+    return os.path.join(excel_dir, f'{nombre.replace(".", "_")}.xlsx')
+
+
+def remove_excel(excel_dir, nombres=None):
+    """Borra los Excel de los snapshots `nombres` (con sus partes ``_2``, ...), o todos"""
+    if not os.path.isdir(excel_dir):
+        return
+    if nombres is None:
+        patrones = [re.compile(r'.*\.xlsx')]
+    else:
+        patrones = [re.compile(re.escape(nombre.replace('.', '_')) + r'(_\d+)?\.xlsx') for nombre in nombres]
+    for archivo in os.listdir(excel_dir):
+        if any(patron.fullmatch(archivo) for patron in patrones):
+            os.remove(os.path.join(excel_dir, archivo))
+
+
+def write_excel_snapshots(db_path, nombres, excel_dir, texto_max=None, omitir_texto=False, por_archivo=False,
+                          chunk_size=50000, max_filas=EXCEL_MAX_FILAS, table='propiedades'):
+    """Un Excel por snapshot de `nombres`, con sus filas de la base SQLite; devuelve las rutas escritas
+
+    Cada corrida escribe sólo los snapshots que cargó: las filas se leen por
+    chunks (índice por ``snapshot``) y van a un libro write-only como en
+    ``write_excel``. Las partes que haya dejado una exportación anterior del
+    mismo snapshot se borran antes.
+    """
+    os.makedirs(excel_dir, exist_ok=True)
+    remove_excel(excel_dir, nombres)
+    columnas = _columnas_excel(omitir_texto)
+    connection = sqlite3.connect(db_path)
+    rutas = []
+    try:
+        for nombre in nombres:
+            chunks = pd.read_sql_query(
+                f'SELECT {", ".join(columnas)} FROM {table} WHERE snapshot = ? ORDER BY rowid',
+                connection, params=[nombre], chunksize=chunk_size,
+            )
+            libro = _LibroExcel(excel_snapshot(excel_dir, nombre), columnas, max_filas, por_archivo)
+            rutas += _escribir_excel(libro, (_con_esquema(chunk) for chunk in chunks), columnas, texto_max)
+    finally:
+        connection.close()
+    return rutas
@@ -0,0 +1,135 @@
+"""
+Modo paralelo del ETL (``--workers N``).
+
+Los snapshots pendientes se reparten en particiones: una por archivo, o
+varios rangos de bytes para los JSON Lines más grandes que
+``tamano_particion``. Cada worker de un pool de procesos limpia y deriva su
+partición con el motor elegido (los mismos pasos que el modo secuencial) y
+la escribe como archivo Arrow IPC, junto con el hash de cada fila cruda. El
+worker también deja renderizado el CSV de cada lote, que es la parte más cara
+de escribir las salidas.
+
+El merge corre en el proceso principal y recorre los parciales en el orden
+de las particiones (no en el que terminan): descarta las filas repetidas
+entre particiones del mismo snapshot y los avisos repetidos (misma CLAVE) y
+entrega los lotes a las salidas (el CSV pre-renderizado va en
+``df.attrs['csv']`` si el lote no perdió filas). El
+resultado es idéntico al del modo secuencial.
+"""
+
+import multiprocessing
+import os
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+import pandas as pd
+import pyarrow as pa
+
+from etl import backends, snapshots, transform
+
+TAMANO_PARTICION = 256 * 1024 * 1024
+
+# Enteros con nulos como enteros nullable (no float64, que pierde precisión en listing_id)
+_ENTEROS = {
+    pa.int8(): pd.Int8Dtype(), pa.int16(): pd.Int16Dtype(), pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype(),
+}
+
+Particion = namedtuple('Particion', 'indice path byte_range')
+Parcial = namedtuple('Parcial', 'particion ruta csv_bytes leidos invalidos memoria')
+
+
+def particionar(rutas, tamano_particion=TAMANO_PARTICION):
+    """Particiones en el orden de `rutas`; los JSON Lines grandes se parten por rangos de bytes"""
+    particiones = []
+    for path in rutas:
+        if path.endswith('.jsonl') and tamano_particion and os.path.getsize(path) > tamano_particion:
+            rangos = snapshots.byte_ranges(path, tamano_particion)
+        else:
+            rangos = [None]
+        for byte_range in rangos:
+            particiones.append(Particion(len(particiones), path, byte_range))
+    return particiones
+
+
+def _lote_arrow(df, hashes):
+    """RecordBatch del lote (categóricas como texto: el esquema no cambia entre lotes) + columna _hash"""
+    df = df.astype({col: transform.TEXTO for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)})
+    lote = pa.RecordBatch.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    return lote.append_column('_hash', pa.array(hashes, type=pa.uint64()))
+
+
+def procesar_particion(particion, backend, chunk_size, directorio, medir_memoria=False):
+    """Worker: limpia y deriva la partición y la escribe en `directorio` como Arrow IPC"""
+    motor = backends.crear_backend(backend, chunk_size)
+    deduplicar = transform.Deduplicador()
+    invalidos = Counter()
+    memoria = transform.ReporteMemoria() if medir_memoria else None
+    ruta = os.path.join(directorio, f'{particion.indice:06d}')
+    nombre = snapshots.snapshot_name(particion.path)
+    fecha = snapshots.snapshot_date(particion.path)
+    leidos = 0
+    csv_bytes = []
+    writer = None
+    with open(f'{ruta}.csv', 'wb') as csv_file:
+        try:
+            for crudos, derivado in motor.lotes(particion.path, nombre, fecha, deduplicar, particion.byte_range):
+                leidos += crudos
+                df = transform.aplicar_esquema(derivado, invalidos)
+                if memoria is not None:
+                    memoria.agregar(derivado, df)
+                lote = _lote_arrow(df, deduplicar.ultimos)
+                if writer is None:
+                    writer = pa.ipc.new_file(f'{ruta}.arrow', lote.schema)
+                writer.write_batch(lote)
+                csv_bytes.append(csv_file.write(df.to_csv(index=False, header=False).encode('utf-8')))
+        finally:
+            if writer is not None:
+                writer.close()
+    return Parcial(particion, ruta if writer is not None else None, csv_bytes, leidos, invalidos, memoria)
+
+
+def combinar(parcial, deduplicar, claves):
+    """Lotes con ESQUEMA del parcial, sin las filas ya vistas en particiones anteriores
+
+    `claves` (un ``transform.DeduplicadorClave``) descarta además los avisos
+    repetidos, como en el modo secuencial.
+    """
+    if parcial.ruta is None:
+        return
+    with pa.memory_map(f'{parcial.ruta}.arrow') as fuente, open(f'{parcial.ruta}.csv', 'rb') as csv_file:
+        reader = pa.ipc.open_file(fuente)
+        for i in range(reader.num_record_batches):
+            lote = reader.get_batch(i)
+            csv = csv_file.read(parcial.csv_bytes[i]).decode('utf-8')
+            nuevos = deduplicar.nuevos(lote.column('_hash').to_pylist())
+            lote = lote.filter(pa.array(nuevos)).select(transform.COLUMNAS)
+            df = transform.aplicar_esquema(lote.to_pandas(types_mapper=_ENTEROS.get))
+            unicos = claves.nuevos(df)
+            if not unicos.all():
+                df = df[unicos]
+            elif nuevos.all():
+                df.attrs['csv'] = csv
+            yield df
+    os.remove(f'{parcial.ruta}.arrow')
+    os.remove(f'{parcial.ruta}.csv')
+
+
+def lanzar(rutas, backend, chunk_size, workers, directorio, tamano_particion=TAMANO_PARTICION, medir_memoria=False):
+    """Envía las particiones al pool y devuelve (pool, [(ruta, [futuros en orden])])
+
+    Los procesos se crean con ``spawn``: Polars y SQLite no son seguros tras un fork.
+    """
+    particiones = particionar(rutas, tamano_particion)
+    pool = ProcessPoolExecutor(
+        max_workers=min(workers, len(particiones)) or 1, mp_context=multiprocessing.get_context('spawn'),
+    )
+    futuros = [
+        pool.submit(procesar_particion, particion, backend, chunk_size, directorio, medir_memoria)
+        for particion in particiones
+    ]
+    por_snapshot = [
+        (path, [futuro for _, futuro in grupo])
+        for path, grupo in groupby(zip(particiones, futuros), key=lambda par: par[0].path)
+    ]
+    return pool, por_snapshot
@@ -0,0 +1,62 @@
+"""
+Reporte estadístico sobre el cubo de agregados del dataset consolidado
+(los gráficos están en etl/graficos.py).
+"""
+
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from etl import cubo, graficos
+from etl.transform import TASA_CAMBIO, dtypes_lectura
+
+# Columnas del cubo y de los gráficos
+COLUMNAS_REPORTE = list(dict.fromkeys(cubo.DIMENSIONES + cubo.MEDIDAS + graficos.COLUMNAS))
+
+
+def cargar_dataset(csv_path):
+    """Columnas del CSV consolidado que usan el cubo y los gráficos"""
+    return pd.read_csv(csv_path, usecols=COLUMNAS_REPORTE, dtype=dtypes_lectura(COLUMNAS_REPORTE))
+
+
+def resumen_por_moneda(tabla):
+    """Estadísticas por moneda original, a partir del cubo"""
+    print("\nEstadísticas de precios por moneda original:")
+    for moneda, fila in cubo.agregar(tabla, ['moneda_original']).iterrows():
+        print(f"\nPropiedades en {moneda}:")
+        print(f"Cantidad: {int(fila['propiedades'])}")
+        print(f"Precio original promedio: {fila['precio_alquiler_original_media']:.2f}")
+        if moneda == 'USD':
+            print(f"Precio en pesos (convertido) promedio: {fila['precio_alquiler_media']:.2f}")
+        print(f"Rango de precios originales: {fila['precio_alquiler_original_min']:.0f} - {fila['precio_alquiler_original_max']:.0f}")
+
+
+def _conteos(tabla, dimension):
+    """Propiedades por valor de `dimension`, de mayor a menor (como value_counts)"""
+    conteos = cubo.agregar(tabla, [dimension])['propiedades'].sort_values(ascending=False, kind='stable')
+    return {str(k): int(v) for k, v in conteos.items()}
+
+
+def generar_reporte(tabla, output_dir, tasa_cambio=TASA_CAMBIO):
+    """Principales estadísticas, incluyendo información sobre monedas, leídas del cubo"""
+    total = cubo.total(tabla)
+    por_moneda = cubo.agregar(tabla, ['moneda_original'])
+    promedio_original = por_moneda['precio_alquiler_original_media']
+    reporte = {
+        'fecha_generacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'total_propiedades': int(total['propiedades']),
+        'propiedades_por_moneda_original': _conteos(tabla, 'moneda_original'),
+        'precio_promedio_ars': float(promedio_original.get('ARS', float('nan'))),
+        'precio_promedio_usd': float(promedio_original.get('USD', float('nan'))),
+        'precio_promedio_total_ars': float(total['precio_alquiler_media']),
+        'precio_mediano_total_ars': float(total['precio_alquiler_mediana']),
+        'superficie_promedio': float(total['superficie_media']),
+        'distribucion_ambientes': _conteos(tabla, 'ambientes'),
+        'propiedades_por_barrio': _conteos(tabla, 'barrio'),
+        'tasa_conversion_usd_ars': tasa_cambio
+    }
+    with open(os.path.join(output_dir, 'reporte_propiedades.json'), 'w') as f:
+        json.dump(reporte, f, indent=4)
+    return reporte
@@ -0,0 +1,211 @@
+"""
+Descubrimiento y lectura incremental de los snapshots del scraper.
+
+Un snapshot es un archivo ``zonaprop_propiedades_*.json`` (lista JSON, como
+los de selenium_zonaprop.py) o ``*.jsonl`` (JSON Lines, como los del spider
+de Scrapy) en el directorio ``output/``. El manifiesto guarda el hash de
+contenido de cada snapshot procesado: en cada corrida sólo se procesan los
+archivos nuevos o modificados.
+
+Los archivos se leen en chunks de a lo sumo ``chunk_size`` registros, sin
+cargar el snapshot completo en memoria.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+import pandas as pd
+
+SNAPSHOT_PATTERNS = ('zonaprop_propiedades_*.json', 'zonaprop_propiedades_*.jsonl')
+MANIFEST_VERSION = 1
+
+_TIMESTAMP_RE = re.compile(r'(\d{8})_(\d{6})')
+
+
+def discover_snapshots(output_dir):
+    """Snapshots de `output_dir`, ordenados por nombre (= por fecha)"""
+    paths = set()
+    for pattern in SNAPSHOT_PATTERNS:
+        paths.update(glob.glob(os.path.join(output_dir, pattern)))
+    return sorted(paths, key=os.path.basename)
+
+
+def snapshot_name(path):
+    return os.path.basename(path)
+
+
+def snapshot_date(path):
+    """Fecha del snapshot: el timestamp del nombre o, si no tiene, la fecha de modificación"""
+    match = _TIMESTAMP_RE.search(os.path.basename(path))
+    if match:
+        try:
+            return datetime.strptime(''.join(match.groups()), '%Y%m%d%H%M%S').date()
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(os.path.getmtime(path)).date()
+
+
+def file_digest(path, block_size=1024 * 1024):
+    """Hash BLAKE2b del contenido del archivo, leído por bloques"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Snapshots ya procesados: {nombre: {hash, size, mtime_ns, rows, processed_at, status}}
+
+    Una entrada con status 'pending' indica que la corrida que la procesaba no
+    terminó: sus filas pueden estar a medias en las salidas y se reemplazan.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data.get('snapshots', {})
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def classify(self, path):
+        """'new', 'changed' o None (sin cambios); devuelve también el hash calculado"""
+        name = snapshot_name(path)
+        stat = os.stat(path)
+        entry = self.entries.get(name)
+        if entry is None:
+            return 'new', file_digest(path)
+        if entry.get('status') == 'pending':
+            return 'changed', file_digest(path)
+        # Mismo tamaño y mtime: no hace falta releer el archivo para hashearlo
+        if entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return None, entry['hash']
+        digest = file_digest(path)
+        if digest == entry['hash']:
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return None, digest
+        return 'changed', digest
+
+    def mark_pending(self, path, digest):
+        stat = os.stat(path)
+        self.entries[snapshot_name(path)] = {
+            'hash': digest,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'rows': None,
+            'processed_at': None,
+            'status': 'pending',
+        }
+
+    def mark_done(self, path, rows):
+        entry = self.entries[snapshot_name(path)]
+        entry.update(rows=rows, processed_at=datetime.now().isoformat(timespec='seconds'), status='done')
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'snapshots': self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def iter_json_array(path, block_size=1024 * 1024):
+    """Objetos de un archivo con una lista JSON, decodificados de a uno sobre un buffer acotado"""
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as f:
+        buffer = f.read(block_size)
+        eof = not buffer
+        pos = 0
+        started = False
+        while True:
+            # Saltar espacios, la apertura de la lista y las comas entre objetos
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,[':
+                if buffer[pos] == '[':
+                    started = True
+                pos += 1
+            if pos >= len(buffer):
+                if eof:
+                    return
+                buffer = f.read(block_size)
+                eof = not buffer
+                pos = 0
+                continue
+            if buffer[pos] == ']' and started:
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Objeto cortado por el borde del bloque: leer más y reintentar
+                more = f.read(block_size)
+                eof = not more
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+            yield record
+            pos = end
+
+
+def byte_ranges(path, size):
+    """Rangos [inicio, fin) de a lo sumo `size` bytes que cubren el archivo"""
+    total = os.path.getsize(path)
+    limites = list(range(0, total, size)) + [total]
+    return list(zip(limites, limites[1:])) or [(0, total)]
+
+
+def iter_lines(path, start=0, end=None):
+    """Líneas (bytes) de un archivo que empiezan en el rango [start, end)
+
+    Cada línea pertenece al rango donde empieza, así que rangos contiguos
+    reparten las líneas sin repetir ni perder ninguna.
+    """
+    with open(path, 'rb') as f:
+        pos = start
+        if start:
+            # Descartar la línea que empezó antes del rango
+            f.seek(start - 1)
+            pos = start - 1 + len(f.readline())
+        for line in f:
+            if end is not None and pos >= end:
+                return
+            pos += len(line)
+            yield line
+
+
+def iter_json_lines(path, start=0, end=None):
+    for line in iter_lines(path, start, end):
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_records(path, byte_range=None):
+    """Registros del snapshot; `byte_range` (sólo JSON Lines) limita la lectura a un rango de bytes"""
+    if path.endswith('.jsonl'):
+        return iter_json_lines(path, *(byte_range or ()))
+    if byte_range is not None:
+        raise ValueError(f'{path}: sólo los JSON Lines se leen por rangos de bytes')
+    return iter_json_array(path)
+
+
+def read_chunks(path, chunk_size=50000, byte_range=None):
+    """DataFrames de a lo sumo `chunk_size` filas con los registros del snapshot"""
+    chunk = []
+    for record in iter_records(path, byte_range):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame.from_records(chunk)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame.from_records(chunk)
@@ -0,0 +1,288 @@
+"""
+Limpieza y transformación de los registros del scraper.
+
+Todas las transformaciones son fila a fila (o por bins fijos), así que se
+aplican igual a un snapshot completo o a cada chunk por separado.
+
+El dataset transformado tiene un esquema explícito (``ESQUEMA``): categóricas
+para las columnas con pocos valores distintos, enteros nullable del menor
+ancho que alcanza, float32 para las métricas derivadas y strings respaldados
+por Arrow para el texto libre.
+"""
+
+import hashlib
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Asumimos que los precios menores a 5000 son en dólares mientras que los mayores son en pesos
+UMBRAL_USD = 5000
+TASA_CAMBIO = 1000  # 1 USD = 1000 ARS
+
+CATEGORIAS_TAMANO = ['Muy pequeño', 'Pequeño', 'Mediano', 'Grande', 'Muy grande']
+BINS_TAMANO = [0, 30, 50, 80, 150, float('inf')]
+
+COLS_NUMERICAS = ['precio_alquiler', 'expensas', 'superficie', 'ambientes', 'habitaciones', 'banos']
+
+# Columnas del dataset transformado, en orden (las salidas incrementales comparten el esquema)
+COLUMNAS = [
+    'precio_alquiler', 'expensas', 'direccion', 'superficie', 'ambientes', 'habitaciones', 'banos',
+    'descripcion', 'url', 'scraped_at', 'pagina', 'moneda_original', 'precio_alquiler_original',
+    'barrio', 'precio_por_m2', 'costo_total', 'categoria_tamano', 'snapshot', 'listing_id', 'fecha_snapshot',
+]
+
+# Clave de cada fila en la base: un aviso por fecha de snapshot
+CLAVE = ['listing_id', 'fecha_snapshot']
+
+LISTING_ID_RE = r'-(\d+)\.html'
+ZONA_PAGINA_RE = r'-pagina-\d+$'
+
+TEXTO = pd.StringDtype('pyarrow')
+
+ESQUEMA = {
+    'precio_alquiler': 'Int32',
+    'expensas': 'Int32',
+    'direccion': TEXTO,
+    'superficie': 'Int32',
+    'ambientes': 'Int8',
+    'habitaciones': 'Int8',
+    'banos': 'Int8',
+    'descripcion': TEXTO,
+    'url': TEXTO,
+    'scraped_at': 'datetime64[us]',
+    'pagina': 'Int16',
+    'moneda_original': pd.CategoricalDtype(['ARS', 'USD']),
+    'precio_alquiler_original': 'Int32',
+    'barrio': 'category',
+    'precio_por_m2': 'float32',
+    'costo_total': 'Int32',
+    'categoria_tamano': pd.CategoricalDtype(CATEGORIAS_TAMANO, ordered=True),
+    'snapshot': 'category',
+    'listing_id': 'Int64',
+    'fecha_snapshot': 'category',
+}
+
+
+def hash_filas(df):
+    """Hash por fila independiente de los dtypes que infirió cada chunk
+
+    Las columnas numéricas (o totalmente nulas) se comparan como float64 y el
+    orden de las columnas no importa.
+    """
+    columnas = {}
+    for col in sorted(df.columns):
+        serie = df[col]
+        if pd.api.types.is_numeric_dtype(serie) or serie.isna().all():
+            serie = pd.to_numeric(serie, errors='coerce').astype('float64')
+        columnas[col] = serie
+    normalizado = pd.DataFrame(columnas, index=df.index)
+    try:
+        return pd.util.hash_pandas_object(normalizado, index=False)
+    except TypeError:
+        # Columnas con valores no hasheables (listas, dicts)
+        return pd.util.hash_pandas_object(normalizado.astype(str), index=False)
+
+
+class Deduplicador:
+    """Elimina filas repetidas dentro de un snapshot, también entre chunks
+
+    ``ultimos`` guarda los hashes de las filas que conservó la última llamada,
+    en orden (el modo paralelo los usa para deduplicar entre particiones).
+    """
+
+    def __init__(self):
+        self.vistos = set()
+        self.ultimos = []
+
+    def nuevos(self, hashes):
+        """Máscara de los hashes que no aparecieron antes (en este lote o en los anteriores)
+
+        Se recorre el lote contra el set en lugar de usar ``isin``, que vuelve a
+        convertir todo el set en cada chunk (costo cuadrático en snapshots grandes).
+        """
+        vistos = self.vistos
+        mascara = np.empty(len(hashes), dtype=bool)
+        for i, h in enumerate(hashes):
+            mascara[i] = h not in vistos
+            vistos.add(h)
+        self.ultimos = [h for h, nuevo in zip(hashes, mascara) if nuevo]
+        return mascara
+
+    def __call__(self, df):
+        return df[self.nuevos(hash_filas(df).tolist())]
+
+
+class DeduplicadorClave:
+    """Deja una sola fila por CLAVE (aviso + fecha de snapshot) en toda la corrida
+
+    ZonaProp repite avisos entre páginas, con filas que difieren (por
+    ``pagina``) y que ``Deduplicador`` no descarta. Se conserva la primera
+    aparición en el orden de procesamiento (snapshots por nombre, filas en el
+    orden del archivo: la página más baja) y las siguientes se descartan antes
+    de llegar a las salidas, así el CSV guarda las mismas filas que la tabla
+    SQLite, que hace upsert por CLAVE. ``vistas`` se puede sembrar con las
+    claves que ya están en las salidas.
+    """
+
+    def __init__(self, vistas=()):
+        self.vistas = set(vistas)
+
+    def nuevos(self, df):
+        """Máscara de las filas de `df` (con ESQUEMA) cuya clave no apareció antes"""
+        vistas = self.vistas
+        claves = zip(df['listing_id'].tolist(), df['fecha_snapshot'].astype(str).tolist())
+        mascara = np.empty(len(df), dtype=bool)
+        for i, clave in enumerate(claves):
+            mascara[i] = clave not in vistas
+            vistas.add(clave)
+        return mascara
+
+    def __call__(self, df):
+        mascara = self.nuevos(df)
+        return df if mascara.all() else df[mascara]
+
+
+def id_respaldo(direccion):
+    """ID negativo y estable para avisos sin ID en la URL (como store.fallback_id del scraper)"""
+    normalizada = ' '.join(str(direccion or '').lower().split())
+    return -int.from_bytes(hashlib.blake2b(normalizada.encode('utf-8'), digest_size=7).digest(), 'big')
+
+
+def listing_ids(df):
+    """ID del aviso (de la URL) o, si no hay, id_respaldo de la dirección"""
+    ids = pd.to_numeric(df['url'].str.extract(LISTING_ID_RE, expand=False), errors='coerce')
+    return completar_ids(ids, df['direccion'])
+
+
+def completar_ids(ids, direcciones):
+    """IDs como Int64, con id_respaldo donde falta el de la URL"""
+    ids = ids.astype('Int64')
+    sin_id = ids.isna()
+    if sin_id.any():
+        ids[sin_id] = pd.array([id_respaldo(d) for d in direcciones[sin_id]], dtype='Int64')
+    return ids
+
+
+def derivar(df, snapshot, fecha_snapshot, tasa_cambio=TASA_CAMBIO):
+    """Columnas del dataset limpio (COLUMNAS), todavía con los dtypes inferidos"""
+    df = df.reset_index(drop=True)
+    for col in COLS_NUMERICAS + ['zona', 'scraped_at', 'url', 'direccion']:
+        if col not in df:
+            df[col] = None
+    for col in COLS_NUMERICAS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # 1. Identificar y convertir precios en dólares
+    mascara_dolares = df['precio_alquiler'] < UMBRAL_USD
+    df['moneda_original'] = 'ARS'
+    df.loc[mascara_dolares, 'moneda_original'] = 'USD'
+    df['precio_alquiler_original'] = df['precio_alquiler']
+    df.loc[mascara_dolares, 'precio_alquiler'] = df.loc[mascara_dolares, 'precio_alquiler'] * tasa_cambio
+
+    # 2. Extraer el barrio de la columna 'zona' (eliminando 'pagina-X')
+    df['barrio'] = df['zona'].str.replace(ZONA_PAGINA_RE, '', regex=True, case=False)
+
+    # 3. Convertir 'scraped_at' a datetime
+    df['scraped_at'] = pd.to_datetime(df['scraped_at'], errors='coerce', format='ISO8601')
+
+    # 4. Métricas derivadas (en pesos)
+    df['precio_por_m2'] = df['precio_alquiler'] / df['superficie']
+    df['costo_total'] = df['precio_alquiler'] + df['expensas'].fillna(0)
+
+    # 5. Categorías de tamaño basadas en superficie
+    df['categoria_tamano'] = pd.cut(df['superficie'], bins=BINS_TAMANO, labels=CATEGORIAS_TAMANO)
+
+    # 6. Ambientes como entero
+    df['ambientes'] = df['ambientes'].fillna(0).astype(int)
+
+    # 7. Clave para la base: aviso + fecha del snapshot
+    df['snapshot'] = snapshot
+    df['listing_id'] = listing_ids(df)
+    df['fecha_snapshot'] = str(fecha_snapshot)
+    return df.reindex(columns=COLUMNAS)
+
+
+def _a_entero(serie, dtype, col, invalidos):
+    """Castea a un entero nullable; lo que no es entero o no entra en el tipo queda NA"""
+    valores = pd.to_numeric(serie, errors='coerce')
+    info = np.iinfo(pd.api.types.pandas_dtype(dtype).numpy_dtype)
+    fuera = valores.notna() & ((valores % 1 != 0) | (valores < info.min) | (valores > info.max))
+    if fuera.any():
+        invalidos[col] += int(fuera.sum())
+        valores = valores.mask(fuera)
+    return valores.astype(dtype)
+
+
+def aplicar_esquema(df, invalidos=None):
+    """Castea `df` a ESQUEMA; los valores que no entran se cuentan en `invalidos`"""
+    if invalidos is None:
+        invalidos = Counter()
+    columnas = {}
+    for col, dtype in ESQUEMA.items():
+        serie = df[col] if col in df else pd.Series(None, index=df.index, dtype='float64')
+        if isinstance(dtype, str) and dtype.startswith(('Int', 'UInt')):
+            columnas[col] = _a_entero(serie, dtype, col, invalidos)
+        elif isinstance(dtype, pd.CategoricalDtype) and dtype.categories is not None:
+            casteada = serie.astype(dtype)
+            fuera = casteada.isna() & serie.notna()
+            if fuera.any():
+                invalidos[col] += int(fuera.sum())
+            columnas[col] = casteada
+        elif dtype == 'float32':
+            columnas[col] = pd.to_numeric(serie, errors='coerce').astype('float32')
+        else:
+            columnas[col] = serie.astype(dtype)
+    return pd.DataFrame(columnas, index=df.index)
+
+
+def transformar(df, snapshot, fecha_snapshot, tasa_cambio=TASA_CAMBIO, invalidos=None):
+    """Dataset limpio con ESQUEMA a partir de los registros crudos de un snapshot"""
+    return aplicar_esquema(derivar(df, snapshot, fecha_snapshot, tasa_cambio), invalidos)
+
+
+def dtypes_lectura(columnas=None):
+    """dtypes de ESQUEMA para leer el CSV consolidado (scraped_at se parsea aparte)"""
+    return {
+        col: dtype for col, dtype in ESQUEMA.items()
+        if (columnas is None or col in columnas) and col != 'scraped_at'
+    }
+
+
+class ReporteMemoria:
+    """Bytes por columna antes y después de aplicar ESQUEMA, acumulados entre chunks"""
+
+    def __init__(self):
+        self.antes = Counter()
+        self.despues = Counter()
+        self.filas = 0
+
+    def agregar(self, antes, despues):
+        self.antes.update(antes.memory_usage(index=False, deep=True).to_dict())
+        self.despues.update(despues.memory_usage(index=False, deep=True).to_dict())
+        self.filas += len(despues)
+
+    def sumar(self, otro):
+        """Acumula el reporte de otro proceso (modo paralelo)"""
+        self.antes.update(otro.antes)
+        self.despues.update(otro.despues)
+        self.filas += otro.filas
+
+    def tabla(self):
+        df = pd.DataFrame({
+            'antes': pd.Series(self.antes, dtype='int64'),
+            'despues': pd.Series(self.despues, dtype='int64'),
+        }).reindex(COLUMNAS)
+        df['ahorro'] = 1 - df['despues'] / df['antes']
+        return df
+
+    def imprimir(self):
+        tabla = self.tabla()
+        print(f"\nMemoria por columna ({self.filas} filas):")
+        print(f"{'columna':<26}{'antes':>14}{'después':>14}{'ahorro':>9}")
+        for col, fila in tabla.iterrows():
+            print(f"{col:<26}{fila['antes']:>14,.0f}{fila['despues']:>14,.0f}{fila['ahorro']:>9.0%}")
+        antes, despues = tabla['antes'].sum(), tabla['despues'].sum()
+        print(f"{'total':<26}{antes:>14,.0f}{despues:>14,.0f}{1 - despues / antes:>9.0%}")
+        if self.filas:
+            print(f"Bytes por fila: {antes / self.filas:,.0f} -> {despues / self.filas:,.0f}")
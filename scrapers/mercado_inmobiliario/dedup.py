@@ -0,0 +1,154 @@
+"""
+Índice persistente de duplicados entre corridas, con memoria acotada.
+
+Un filtro de Bloom en memoria responde "seguro que no lo vi" sin tocar el
+disco; sólo cuando responde "tal vez" se confirma con una búsqueda exacta en
+SQLite. La clave es el ID del aviso (de la URL) o, si no hay ID, la dirección
+normalizada + el precio. El tamaño del filtro sale del presupuesto de memoria
+y la tasa de falsos positivos configurados.
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import struct
+import unicodedata
+
+from mercado_inmobiliario.listing_index import listing_id
+
+_HEADER = struct.Struct('<QQQ')  # bits, hashes, cantidad de claves
+
+
+def normalize_address(direccion):
+    """Dirección en minúsculas, sin tildes ni espacios repetidos"""
+    text = unicodedata.normalize('NFKD', direccion or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.lower().split())
+
+
+def dedup_key(item):
+    """Clave de duplicado: ID del aviso o dirección normalizada + precio"""
+    item_id = listing_id(item.get('url'))
+    if item_id is not None:
+        return f'id:{item_id}'
+    return f"dir:{normalize_address(item.get('direccion'))}|{item.get('precio_alquiler')}"
+
+
+def digest(key):
+    """Hash de 16 bytes de la clave: se guarda en SQLite y alimenta al filtro de Bloom"""
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre un bytearray (doble hashing a partir del digest)"""
+
+    def __init__(self, memory_bytes, false_positive_rate):
+        self.num_bits = max(memory_bytes, 1) * 8
+        self.num_hashes = max(1, round(-math.log2(false_positive_rate)))
+        # Claves que entran manteniendo la tasa de falsos positivos pedida
+        self.capacity = int(-self.num_bits * math.log(2) ** 2 / math.log(false_positive_rate))
+        self.bits = bytearray(self.num_bits // 8)
+        self.count = 0
+
+    def _positions(self, key_digest):
+        h1, h2 = struct.unpack('<QQ', key_digest)
+        h2 |= 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, key_digest):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key_digest))
+
+    def add(self, key_digest):
+        bits = self.bits
+        for p in self._positions(key_digest):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def save(self, path):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(self.num_bits, self.num_hashes, self.count))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Carga el filtro guardado si fue creado con los mismos parámetros"""
+        if not os.path.exists(path):
+            return False
+        with open(path, 'rb') as f:
+            num_bits, num_hashes, count = _HEADER.unpack(f.read(_HEADER.size))
+            if (num_bits, num_hashes) != (self.num_bits, self.num_hashes):
+                return False
+            f.readinto(self.bits)
+        self.count = count
+        return True
+
+
+class DuplicateIndex:
+    """Filtro de Bloom + tabla SQLite ``seen_keys`` con los digests vistos"""
+
+    def __init__(self, path, memory_mb=16, false_positive_rate=0.001, batch_size=1000):
+        self.path = path
+        self.bloom_path = f'{path}.bloom'
+        self.batch_size = batch_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS seen_keys (digest BLOB PRIMARY KEY) WITHOUT ROWID')
+        self.connection.commit()
+
+        self.bloom = BloomFilter(int(memory_mb * 1024 * 1024), false_positive_rate)
+        if not self.bloom.load(self.bloom_path):
+            self._rebuild_bloom()
+        else:
+            # Si la corrida se corta, el filtro guardado quedaría desactualizado
+            # respecto de SQLite: se borra y se vuelve a guardar en close()
+            os.remove(self.bloom_path)
+        # Claves nuevas todavía no escritas en SQLite (a lo sumo batch_size)
+        self.pending = set()
+        self.false_positives = 0
+
+    def _rebuild_bloom(self):
+        for key_digest, in self.connection.execute('SELECT digest FROM seen_keys'):
+            self.bloom.add(key_digest)
+
+    def seen(self, key):
+        """True si la clave ya se vio (en esta u otra corrida); si no, la registra"""
+        key_digest = digest(key)
+        if key_digest in self.bloom:
+            if key_digest in self.pending:
+                return True
+            row = self.connection.execute('SELECT 1 FROM seen_keys WHERE digest = ?', (key_digest,)).fetchone()
+            if row is not None:
+                return True
+            self.false_positives += 1
+        self.bloom.add(key_digest)
+        self.pending.add(key_digest)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return False
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO seen_keys (digest) VALUES (?)', ((d,) for d in self.pending),
+            )
+        self.pending.clear()
+
+    def over_capacity(self):
+        return self.bloom.count > self.bloom.capacity
+
+    def close(self):
+        if self.connection:
+            self.flush()
+            self.bloom.save(self.bloom_path)
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,265 @@
+"""
+Sinks de exportación para ExportPipeline.
+
+Cada item se convierte una sola vez en una fila canónica (dict con
+``ROW_FIELDS`` en orden fijo) que se acumula en un buffer compartido; al
+vaciarse el buffer, cada sink recibe el mismo lote de filas:
+
+- ``jsonl``: ``<EXPORT_DIR>/zonaprop_propiedades_<timestamp>.jsonl``
+- ``csv``: ``<EXPORT_DIR>/zonaprop_propiedades_<timestamp>.csv`` (columnas fijas)
+- ``parquet``: dataset particionado por barrio/fecha (ver parquet.py)
+- ``sqlite``: ``store.PropertyStore`` en un hilo escritor dedicado
+
+Los sinks de archivo escriben en ``<archivo>.part`` y lo renombran al cerrar.
+"""
+
+import abc
+import csv
+import json
+import logging
+import operator
+import os
+import queue
+import threading
+
+from mercado_inmobiliario import store
+from mercado_inmobiliario.items import PROPIEDAD_FIELDS
+
+ROW_FIELDS = PROPIEDAD_FIELDS
+
+CSV_FIELDS = (
+    'precio_alquiler', 'expensas', 'precio_total', 'direccion', 'zona',
+    'superficie', 'ambientes', 'habitaciones', 'banos', 'descripcion',
+    'url', 'scraped_at',
+)
+
+
+def canonical_row(item):
+    """Fila canónica de un item (Propiedad, dict o scrapy.Item)"""
+    get = item.get
+    return {field: get(field) for field in ROW_FIELDS}
+
+
+class FileSink(abc.ABC):
+    """Base de los sinks que escriben un archivo de texto en el directorio de exportación"""
+
+    extension = None
+    keep_empty = True
+
+    def __init__(self, output_dir, timestamp):
+        self.filename = os.path.join(output_dir, f'zonaprop_propiedades_{timestamp}.{self.extension}')
+        self.part_filename = f'{self.filename}.part'
+        self.file = None
+        self.count = 0
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        self.file = open(self.part_filename, 'w', newline='', encoding='utf-8', buffering=1024 * 1024)
+        self.start_exporting()
+
+    def start_exporting(self):
+        pass
+
+    @abc.abstractmethod
+    def write_batch(self, rows):
+        """Escribe el lote `rows` (filas canónicas) y actualiza ``self.count``"""
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        """Cierra el archivo y devuelve un resumen para el log (None si no quedó archivo)"""
+        if self.file is None:
+            return None
+        self.flush()
+        self.file.close()
+        self.file = None
+        if not self.count and not self.keep_empty:
+            os.remove(self.part_filename)
+            return None
+        os.replace(self.part_filename, self.filename)
+        return f"{self.count} items en {self.filename}"
+
+
+class JsonLinesSink(FileSink):
+    """JSON Lines: un objeto por línea"""
+
+    extension = 'jsonl'
+
+    def write_batch(self, rows):
+        dumps = json.dumps
+        self.file.write(''.join(dumps(row, ensure_ascii=False, default=str) + '\n' for row in rows))
+        self.count += len(rows)
+
+
+class CsvSink(FileSink):
+    """CSV con el esquema de columnas fijo CSV_FIELDS"""
+
+    extension = 'csv'
+    keep_empty = False
+
+    def start_exporting(self):
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_FIELDS)
+        self.columns = operator.itemgetter(*CSV_FIELDS)
+
+    def write_batch(self, rows):
+        self.writer.writerows(map(self.columns, rows))
+        self.count += len(rows)
+
+
+class ParquetSink:
+    """Dataset Parquet particionado por barrio y fecha (requiere pyarrow)"""
+
+    def __init__(self, base_dir='output/parquet', row_group_size=10000, compression='zstd',
+                 dictionary_columns=('zona',), timestamp=None):
+        from mercado_inmobiliario.parquet import PartitionedParquetWriter
+
+        self.base_dir = base_dir
+        self.writer = PartitionedParquetWriter(
+            base_dir, row_group_size, compression, dictionary_columns, run_id=timestamp,
+        )
+
+    def open(self):
+        pass
+
+    def write_batch(self, rows):
+        write = self.writer.write
+        for row in rows:
+            write(row)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        paths = self.writer.close()
+        return (
+            f"{self.writer.rows} items en {len(paths)} particiones Parquet "
+            f"({self.writer.row_groups} row groups) bajo {self.base_dir}"
+        )
+
+
+class SqliteSink:
+    """store.PropertyStore; cada lote es una transacción en un hilo escritor
+
+    El reactor sólo encola lotes (se bloquea si hay más de ``queue_size``
+    pendientes). Un lote que falla se registra y se cuenta en ``failed``; si
+    el hilo escritor muere, su excepción queda en ``error`` y se relanza desde
+    ``write_batch`` y ``close`` en lugar de descartar filas o colgar el cierre.
+    """
+
+    _STOP = object()
+    PUT_TIMEOUT = 1.0
+
+    def __init__(self, db_path='data/zonaprop.db', queue_size=20, logger=None):
+        self.db_path = db_path
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.logger = logger or logging.getLogger(__name__)
+        self.thread = None
+        self.error = None
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.history_rows = 0
+
+    def open(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._writer, name='SqliteSink', daemon=True)
+        self.thread.start()
+
+    def _check_writer(self):
+        if self.error is not None:
+            raise RuntimeError(f"El hilo escritor de {self.db_path} falló: {self.error!r}") from self.error
+        if self.thread is None or not self.thread.is_alive():
+            raise RuntimeError(f"El hilo escritor de {self.db_path} no está corriendo")
+
+    def _put(self, item):
+        """Encola `item` sin bloquearse para siempre si el escritor muere con la cola llena"""
+        while True:
+            self._check_writer()
+            try:
+                self.queue.put(item, timeout=self.PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+
+    def write_batch(self, rows):
+        self._put(rows)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.thread is None:
+            return None
+        try:
+            if self.thread.is_alive():
+                self._put(self._STOP)
+        except RuntimeError:
+            pass  # el escritor ya terminó: el error se relanza abajo
+        self.thread.join()
+        self.thread = None
+        if self.error is not None:
+            raise RuntimeError(f"El hilo escritor de {self.db_path} falló: {self.error!r}") from self.error
+        failed = f", {self.failed} items con error" if self.failed else ''
+        return (
+            f"{self.written} items en {self.db_path} "
+            f"({self.batches} transacciones, {self.history_rows} cambios de precio{failed})"
+        )
+
+    def _writer(self):
+        try:
+            self._write_loop()
+        except BaseException as e:
+            # Queda registrado para write_batch/close (el hilo no tiene a quién avisar)
+            self.error = e
+
+    def _write_loop(self):
+        property_store = store.PropertyStore(self.db_path)
+        try:
+            while True:
+                rows = self.queue.get()
+                if rows is self._STOP:
+                    break
+                try:
+                    self.history_rows += property_store.upsert(rows)
+                    self.written += len(rows)
+                    self.batches += 1
+                except Exception as e:
+                    # Un lote malo no detiene al escritor
+                    self.failed += len(rows)
+                    self.logger.error(f"Error guardando {len(rows)} items en base de datos: {e}")
+        finally:
+            property_store.close()
+
+
+def build_sinks(names, settings, timestamp, logger):
+    """Instancia los sinks nombrados en EXPORT_SINKS con la configuración del proyecto"""
+    output_dir = settings.get('EXPORT_DIR', 'output')
+    sinks = {}
+    for name in names:
+        if name == 'jsonl':
+            sinks[name] = JsonLinesSink(output_dir, timestamp)
+        elif name == 'csv':
+            sinks[name] = CsvSink(output_dir, timestamp)
+        elif name == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                logger.warning("Sink parquet omitido: requiere pyarrow (pip install pyarrow)")
+                continue
+            sinks[name] = ParquetSink(
+                settings.get('PARQUET_DIR', 'output/parquet'),
+                settings.getint('PARQUET_ROW_GROUP_SIZE', 10000),
+                settings.get('PARQUET_COMPRESSION', 'zstd'),
+                settings.getlist('PARQUET_DICTIONARY_COLUMNS', ['zona']),
+                timestamp,
+            )
+        elif name == 'sqlite':
+            sinks[name] = SqliteSink(settings.get('DATABASE_PATH', 'data/zonaprop.db'), logger=logger)
+        else:
+            raise ValueError(f"Sink de exportación desconocido: {name!r} (opciones: jsonl, csv, parquet, sqlite)")
+    return sinks
@@ -0,0 +1,315 @@
+"""
+Motor de extracción de tarjetas de propiedades de ZonaProp.
+
+Compartido por ZonapropSpider y selenium_zonaprop.py. Todos los selectores
+CSS se compilan a XPath de lxml y las regex se compilan una sola vez al
+importar el módulo. Cada selector principal se evalúa una sola vez por página
+sobre el árbol lxml (construido desde los bytes HTML crudos) y los resultados
+se reparten entre las tarjetas; los de respaldo sólo corren donde hacen falta.
+"""
+
+import re
+from urllib.parse import urljoin
+
+from cssselect import HTMLTranslator
+from lxml import etree
+
+_translator = HTMLTranslator()
+_parsers = {}
+
+
+def _compile(*selectors, text=False, attr=None):
+    """Compila selectores CSS de respaldo a XPath de lxml (en orden de prioridad)"""
+    compiled = []
+    for selector in selectors:
+        xpath = _translator.css_to_xpath(selector)
+        if text:
+            xpath += '/text()'
+        elif attr:
+            xpath += f'/@{attr}'
+        compiled.append(etree.XPath(xpath))
+    return tuple(compiled)
+
+
+# Contenedores de propiedades (el primero que encuentre resultados gana)
+CARD_SELECTORS = _compile(
+    'div.postingCard',
+    'div[data-qa="posting PROPERTY"]',
+    'div.PostingCard',
+    'article.PostingCard',
+)
+
+PRICE_SELECTORS = _compile(
+    'div.postingCard-module__price-container div:first-child',
+    'div[data-qa="POSTING_CARD_PRICE"]',
+    'div.price-data',
+    'div.postingPrice',
+    text=True,
+)
+
+EXPENSES_SELECTORS = _compile(
+    'div.postingCard-module__price-container div:nth-child(2)',
+    'div[data-qa="expensas"]',
+    'div.expensas',
+    'span.postingCardExpenses',
+    text=True,
+)
+
+ADDRESS_SELECTORS = _compile(
+    'div.postingCard-module__posting-container div.postingCard-module__posting-top '
+    'div:nth-child(1) div:nth-child(2) div div',
+    'div.postingCard-module__location',
+    'div[data-qa="POSTING_CARD_LOCATION"]',
+    text=True,
+)
+
+FEATURE_CONTAINER_SELECTORS = _compile(
+    'div.postingCard-module__posting-container div.postingCard-module__posting-top '
+    'div.postingCard-module__posting-card-row h3',
+    'h3[data-qa="POSTING_CARD_FEATURES"]',
+)
+
+# Método original: spans de cualquier h3, interpretados por posición
+FEATURE_FALLBACK_SELECTOR = _compile('h3 span', text=True)[0]
+
+DESCRIPTION_SELECTORS = _compile(
+    'div.postingCard-module__posting-container div.postingCard-module__posting-top h3 a',
+    'h3[data-qa="POSTING_CARD_TITLE"] a',
+    'h3 a',
+    text=True,
+)
+
+URL_SELECTORS = _compile(
+    'div.postingCard-module__posting-container div.postingCard-module__posting-top h3 a',
+    'h3[data-qa="POSTING_CARD_TITLE"] a',
+    'h3 a',
+    attr='href',
+)
+
+SPAN_TEXT = etree.XPath('.//span/text()')
+
+# Paginador del listado
+PAGE_ITEM_SELECTOR = _compile('a.paging-module__page-item', text=True)[0]
+CURRENT_PAGE_SELECTOR = _compile('a.paging-module__page-item.paging-module__page-item-current', text=True)[0]
+
+NON_DIGITS_RE = re.compile(r'[^\d]')
+NUMBER_RE = re.compile(r'(\d+)')
+# Un solo regex clasifica la característica: 1=superficie, 2=ambientes, 3=habitaciones, 4=baños
+FEATURE_KIND_RE = re.compile(r'(m²)|(amb)|(dorm|hab)|(baño)', re.IGNORECASE)
+FEATURE_FIELDS = (None, 'superficie', 'ambientes', 'habitaciones', 'banos')
+BARRIO_RE = re.compile(r'-alquiler-([^\.]+)\.html')
+
+FIELDS = (
+    'precio_alquiler', 'expensas', 'direccion', 'zona', 'superficie',
+    'ambientes', 'habitaciones', 'banos', 'descripcion', 'url',
+)
+
+
+def parse_html(body, encoding='utf-8'):
+    """Parsea bytes (o str) HTML a un árbol lxml
+
+    Usa el parser de ``lxml.etree`` (no ``lxml.html``) para evitar el lookup de
+    clases de HtmlElement en cada nodo que devuelve un XPath.
+    """
+    if isinstance(body, str):
+        encoding = None
+    if encoding not in _parsers:
+        _parsers[encoding] = etree.HTMLParser(encoding=encoding)
+    return etree.fromstring(body, parser=_parsers[encoding])
+
+
+def find_cards(root):
+    """Devuelve las tarjetas de propiedades con el primer selector que matchee"""
+    for selector in CARD_SELECTORS:
+        cards = selector(root)
+        if cards:
+            return cards
+    return []
+
+
+def _page_numbers(texts):
+    return [int(t) for t in (text.strip() for text in texts) if t.isdigit()]
+
+
+def current_page(root):
+    """Número de la página actual según el paginador, o None"""
+    pages = _page_numbers(CURRENT_PAGE_SELECTOR(root))
+    return pages[0] if pages else None
+
+
+def total_pages(root):
+    """Última página listada en el paginador (paging-module), o None"""
+    pages = _page_numbers(PAGE_ITEM_SELECTOR(root))
+    return max(pages) if pages else None
+
+
+def _first_text(node, selectors, accept=None):
+    """Primer texto no vacío (y aceptado) del primer selector que matchee"""
+    for selector in selectors:
+        for text in selector(node):
+            text = text.strip()
+            if text and (accept is None or accept(text)):
+                return text
+    return None
+
+
+def _owner(node, owners):
+    """Tarjeta a la que pertenece un resultado XPath (elemento o texto)"""
+    if isinstance(node, str):
+        node = node.getparent()
+    while node is not None:
+        if node in owners:
+            return node
+        node = node.getparent()
+    return None
+
+
+def _first_per_card(selectors, context, owners, accept=None, text=True):
+    """Evalúa el selector principal una sola vez para toda la página y
+    agrupa el primer resultado por tarjeta; los selectores de respaldo sólo
+    se evalúan sobre las tarjetas que quedaron sin valor."""
+    found = {}
+    for result in selectors[0](context):
+        card = _owner(result, owners)
+        if card is None or card in found:
+            continue
+        if text:
+            result = result.strip()
+            if not result:
+                continue
+        found[card] = result
+
+    for card in owners:
+        if card in found:
+            continue
+        if text:
+            value = _first_text(card, selectors[1:], accept)
+        else:
+            value = next((r[0] for r in (s(card) for s in selectors[1:]) if r), None)
+        if value is not None:
+            found[card] = value
+    return found
+
+
+def _looks_like_expenses(text):
+    return 'expensa' in text.lower() or '$' in text
+
+
+def _to_int(text):
+    if not text:
+        return None
+    digits = NON_DIGITS_RE.sub('', text)
+    return int(digits) if digits else None
+
+
+def _first_number(text):
+    match = NUMBER_RE.search(text)
+    return int(match.group(1)) if match else None
+
+
+def zona_from_url(page_url):
+    """Extrae el barrio de la URL del listado (por defecto 'Flores')"""
+    match = BARRIO_RE.search(page_url or '')
+    return match.group(1).capitalize() if match else 'Flores'
+
+
+def _extract_features(card, container, item):
+    if container is not None:
+        for feature in SPAN_TEXT(container):
+            match = FEATURE_KIND_RE.search(feature)
+            if not match:
+                continue
+            field = FEATURE_FIELDS[match.lastindex]
+            value = _first_number(feature)
+            item[field] = value
+            # Si ambientes = 1, entonces habitaciones = 0
+            if field == 'ambientes' and value == 1:
+                item['habitaciones'] = 0
+
+    if all(item[f] is None for f in ('superficie', 'ambientes', 'habitaciones', 'banos')):
+        # Fallback: superficie, ambientes, habitaciones y baños en orden
+        for i, feature in enumerate(FEATURE_FALLBACK_SELECTOR(card)[:4]):
+            value = _first_number(feature.strip())
+            if i == 0:
+                item['superficie'] = value
+            elif i == 1:
+                item['ambientes'] = value
+                if value == 1:
+                    item['habitaciones'] = 0
+            elif i == 2:
+                if item['ambientes'] != 1:
+                    item['habitaciones'] = value
+            else:
+                item['banos'] = value
+
+
+def extract_cards(cards, page_url, zona=None, logger=None):
+    """Extrae todos los campos de una lista de tarjetas (elementos lxml).
+
+    Cada selector principal se evalúa una única vez sobre la página en lugar
+    de una vez por tarjeta. Con `logger`, una tarjeta que falla se registra y
+    se omite (el resto de la página sigue); sin él, el error se propaga.
+    """
+    if not len(cards):
+        return []
+    if zona is None:
+        zona = zona_from_url(page_url)
+
+    context = cards[0].getroottree().getroot()
+    owners = dict.fromkeys(cards)
+    prices = _first_per_card(PRICE_SELECTORS, context, owners)
+    expenses = _first_per_card(EXPENSES_SELECTORS, context, owners, _looks_like_expenses)
+    addresses = _first_per_card(ADDRESS_SELECTORS, context, owners)
+    feature_containers = _first_per_card(FEATURE_CONTAINER_SELECTORS, context, owners, text=False)
+    descriptions = _first_per_card(DESCRIPTION_SELECTORS, context, owners)
+    hrefs = _first_per_card(URL_SELECTORS, context, owners)
+
+    items = []
+    for card in cards:
+        try:
+            item = {
+                'precio_alquiler': _to_int(prices.get(card)),
+                'expensas': _to_int(expenses.get(card)),
+                'direccion': addresses.get(card),
+                'zona': zona,
+                'superficie': None,
+                'ambientes': None,
+                'habitaciones': None,
+                'banos': None,
+            }
+            _extract_features(card, feature_containers.get(card), item)
+
+            item['descripcion'] = descriptions.get(card)
+            href = hrefs.get(card)
+            item['url'] = urljoin(page_url, href) if href else None
+        except Exception as e:
+            if logger is None:
+                raise
+            logger.error(f"Error procesando propiedad: {e}")
+            continue
+        items.append(item)
+    return items
+
+
+def extract_card(card, page_url, zona=None):
+    """Extrae todos los campos de una sola tarjeta"""
+    return extract_cards([card], page_url, zona)[0]
+
+
+def extract_card_html(card_html, page_url):
+    """Extrae una tarjeta a partir de su HTML (p. ej. outerHTML de Selenium)"""
+    root = parse_html(card_html)
+    cards = find_cards(root)
+    return extract_card(cards[0] if cards else root, page_url)
+
+
+def extract_listings(body, page_url, encoding='utf-8'):
+    """Extrae todas las tarjetas de una página a partir de los bytes HTML"""
+    return extract_cards(find_cards(parse_html(body, encoding)), page_url)
+
+
+def is_valid_listing(item):
+    """Una propiedad es válida si tiene descripción y precio o dirección"""
+    return bool(item.get('descripcion')) and (
+        item.get('precio_alquiler') is not None or bool(item.get('direccion'))
+    )
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+HTTP cache de un solo archivo SQLite para Scrapy.
+
+Reemplaza al FilesystemCacheStorage (cinco archivos chicos por respuesta en
+un árbol de directorios) por una tabla ``responses`` indexada por el
+fingerprint del request, con los bodies comprimidos con zlib. Incluye:
+
+- ``SqliteCacheStorage``: backend para ``HTTPCACHE_STORAGE``.
+- ``RevalidationPolicy``: respuestas frescas durante ``HTTPCACHE_EXPIRATION_SECS``;
+  pasado ese tiempo se revalidan con ``If-None-Match`` / ``If-Modified-Since``
+  y un 304 reutiliza el body guardado.
+- Iteración masiva para el replay y un comando de compactación::
+
+    python -m mercado_inmobiliario.httpcache stats
+    python -m mercado_inmobiliario.httpcache compact --max-age 604800
+    python -m mercado_inmobiliario.httpcache import .scrapy/httpcache/zonaprop_spider
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import pickle
+import sqlite3
+import time
+import zlib
+
+from scrapy.extensions.httpcache import DummyPolicy
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DB = os.path.join('.scrapy', 'httpcache', 'zonaprop_spider.sqlite')
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS responses (
+        fingerprint BLOB PRIMARY KEY,
+        url TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        headers BLOB NOT NULL,
+        body BLOB NOT NULL,
+        compressed INTEGER NOT NULL,
+        timestamp REAL NOT NULL
+    )
+'''
+
+# Bodies que ya vienen comprimidos por el servidor se guardan tal cual
+_ENCODED = (b'gzip', b'x-gzip', b'deflate', b'br', b'zstd')
+
+
+def cache_path(cachedir, spider_name):
+    return os.path.join(cachedir, f'{spider_name}.sqlite')
+
+
+def connect(path):
+    """Conexión SQLite con WAL: lecturas concurrentes mientras el crawl escribe"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.execute(SCHEMA)
+    connection.commit()
+    return connection
+
+
+def pack_body(body, headers, level=6):
+    """Comprime el body salvo que ya tenga Content-Encoding; devuelve (body, compressed)"""
+    encoding = (headers.get(b'Content-Encoding') or b'').lower()
+    if level <= 0 or encoding in _ENCODED:
+        return body, 0
+    return zlib.compress(body, level), 1
+
+
+def unpack_body(body, compressed):
+    return zlib.decompress(body) if compressed else body
+
+
+def _row_to_entry(row):
+    """(url, status, headers, body) a partir de una fila de ``responses``"""
+    url, status, headers, body, compressed = row
+    return url, status, headers_raw_to_dict(headers), unpack_body(body, compressed)
+
+
+def iter_entries(path, max_age=0):
+    """Recorre todo el cache en un solo scan secuencial: (url, status, headers, body)"""
+    connection = sqlite3.connect(path)
+    try:
+        min_ts = time.time() - max_age if max_age > 0 else 0
+        cursor = connection.execute(
+            'SELECT url, status, headers, body, compressed FROM responses '
+            'WHERE timestamp >= ? ORDER BY rowid',
+            (min_ts,),
+        )
+        for row in cursor:
+            yield _row_to_entry(row)
+    finally:
+        connection.close()
+
+
+def iter_rowids(path, max_age=0):
+    """rowids de las entradas vigentes (para repartir el replay entre procesos)"""
+    connection = sqlite3.connect(path)
+    try:
+        min_ts = time.time() - max_age if max_age > 0 else 0
+        return [rowid for rowid, in connection.execute(
+            'SELECT rowid FROM responses WHERE timestamp >= ? ORDER BY rowid', (min_ts,),
+        )]
+    finally:
+        connection.close()
+
+
+_readers = {}
+
+
+def read_entry(path, rowid):
+    """Lee una entrada por rowid reutilizando una conexión por proceso"""
+    connection = _readers.get(path)
+    if connection is None:
+        connection = _readers[path] = sqlite3.connect(path)
+    row = connection.execute(
+        'SELECT url, status, headers, body, compressed FROM responses WHERE rowid = ?', (rowid,),
+    ).fetchone()
+    if row is None:
+        raise KeyError(f"rowid {rowid} no existe en {path}")
+    return _row_to_entry(row)
+
+
+class SqliteCacheStorage:
+    """Storage de HTTPCACHE en un único archivo ``<HTTPCACHE_DIR>/<spider>.sqlite``
+
+    Las entradas más viejas que ``HTTPCACHE_SQLITE_MAX_AGE`` se ignoran (y la
+    compactación las borra); la frescura dentro de ese plazo la decide la policy.
+    """
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        self.max_age = settings.getint('HTTPCACHE_SQLITE_MAX_AGE', 0)
+        self.compression_level = settings.getint('HTTPCACHE_SQLITE_COMPRESSION', 6)
+        self.connection = None
+
+    def open_spider(self, spider):
+        self.path = cache_path(self.cachedir, spider.name)
+        self.connection = connect(self.path)
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        logger.debug(f"Usando cache SQLite en {self.path}", extra={'spider': spider})
+
+    def close_spider(self, spider):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def retrieve_response(self, spider, request):
+        key = self._fingerprinter.fingerprint(request)
+        row = self.connection.execute(
+            'SELECT url, status, headers, body, compressed, timestamp FROM responses WHERE fingerprint = ?',
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None  # no cacheada
+        url, status, raw_headers, body, compressed, timestamp = row
+        if 0 < self.max_age < time.time() - timestamp:
+            return None  # vencida
+
+        request.meta['cache_timestamp'] = timestamp
+        headers = Headers(headers_raw_to_dict(raw_headers))
+        body = unpack_body(body, compressed)
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        key = self._fingerprinter.fingerprint(request)
+        if request.meta.pop('cache_revalidated', False):
+            # 304: la entrada sigue valiendo; se renuevan timestamp y headers sin reescribir el body
+            with self.connection:
+                updated = self.connection.execute(
+                    'UPDATE responses SET headers = ?, timestamp = ? WHERE fingerprint = ?',
+                    (headers_dict_to_raw(response.headers), time.time(), key),
+                ).rowcount
+            if updated:
+                return
+        body, compressed = pack_body(response.body, response.headers, self.compression_level)
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(fingerprint, url, status, headers, body, compressed, timestamp) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, response.url, response.status, headers_dict_to_raw(response.headers),
+                 body, compressed, time.time()),
+            )
+
+
+class RevalidationPolicy(DummyPolicy):
+    """Frescura por edad + revalidación condicional
+
+    Ignora los Cache-Control del sitio (ZonaProp responde ``no-store``): una
+    respuesta es fresca durante ``HTTPCACHE_EXPIRATION_SECS`` (0 = siempre).
+    Vencida, se vuelve a pedir con los validadores guardados; un 304 (o un
+    error 5xx del servidor) reutiliza la respuesta cacheada. Tras un 304
+    HttpCacheMiddleware vuelve a guardar la respuesta cacheada y el storage
+    sólo renueva su timestamp: queda fresca otro HTTPCACHE_EXPIRATION_SECS.
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        timestamp = request.meta.get('cache_timestamp')
+        if self.expiration_secs <= 0 or timestamp is None:
+            return True
+        if time.time() - timestamp <= self.expiration_secs:
+            return True
+        if b'ETag' in cachedresponse.headers:
+            request.headers[b'If-None-Match'] = cachedresponse.headers[b'ETag']
+        if b'Last-Modified' in cachedresponse.headers:
+            request.headers[b'If-Modified-Since'] = cachedresponse.headers[b'Last-Modified']
+        return False
+
+    def is_cached_response_valid(self, cachedresponse, response, request):
+        if response.status == 304:
+            request.meta['cache_revalidated'] = True
+            return True
+        return response.status >= 500
+
+
+def import_filesystem(cache_dir, path, use_gzip=False, level=6):
+    """Copia un cache de FilesystemCacheStorage al archivo SQLite; devuelve la cantidad"""
+    connection = connect(path)
+    opener = gzip.open if use_gzip else open
+    rows = []
+    for dirpath, _, filenames in os.walk(cache_dir):
+        if 'pickled_meta' not in filenames or 'response_body' not in filenames:
+            continue
+        with opener(os.path.join(dirpath, 'pickled_meta'), 'rb') as f:
+            meta = pickle.load(f)
+        with opener(os.path.join(dirpath, 'response_headers'), 'rb') as f:
+            raw_headers = f.read()
+        with opener(os.path.join(dirpath, 'response_body'), 'rb') as f:
+            body = f.read()
+        body, compressed = pack_body(body, Headers(headers_raw_to_dict(raw_headers)), level)
+        fingerprint = bytes.fromhex(os.path.basename(dirpath))
+        rows.append((fingerprint, meta.get('response_url', meta['url']), meta['status'],
+                     raw_headers, body, compressed, meta['timestamp']))
+    with connection:
+        connection.executemany(
+            'INSERT OR REPLACE INTO responses '
+            '(fingerprint, url, status, headers, body, compressed, timestamp) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            rows,
+        )
+    connection.close()
+    return len(rows)
+
+
+def compact(path, max_age=0):
+    """Borra las entradas vencidas y reescribe el archivo; devuelve (borradas, bytes antes, bytes después)"""
+    before = _disk_size(path)
+    connection = connect(path)
+    deleted = 0
+    if max_age > 0:
+        with connection:
+            deleted = connection.execute(
+                'DELETE FROM responses WHERE timestamp < ?', (time.time() - max_age,),
+            ).rowcount
+    connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    connection.execute('VACUUM')
+    connection.close()
+    return deleted, before, _disk_size(path)
+
+
+def _disk_size(path):
+    return sum(os.path.getsize(p) for p in (path, f'{path}-wal', f'{path}-shm') if os.path.exists(p))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mantenimiento del HTTP cache SQLite')
+    parser.add_argument('--db', default=DEFAULT_CACHE_DB, help='archivo del cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help='cantidad de respuestas y tamaño en disco')
+    compact_cmd = commands.add_parser('compact', help='borra vencidas y ejecuta VACUUM')
+    compact_cmd.add_argument('--max-age', type=int, default=0, help='segundos (0 = no borrar nada)')
+    import_cmd = commands.add_parser('import', help='importa un cache de FilesystemCacheStorage')
+    import_cmd.add_argument('cache_dir')
+    import_cmd.add_argument('--gzip', action='store_true', help='el cache se generó con HTTPCACHE_GZIP')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        connection = connect(args.db)
+        count, raw = connection.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM responses').fetchone()
+        connection.close()
+        print(f"📦 {count} respuestas, {raw / 1024:.1f} KB de bodies, {_disk_size(args.db) / 1024:.1f} KB en disco")
+    elif args.command == 'compact':
+        deleted, before, after = compact(args.db, args.max_age)
+        print(f"🧹 {deleted} respuestas vencidas borradas: {before / 1024:.1f} KB → {after / 1024:.1f} KB")
+    elif args.command == 'import':
+        count = import_filesystem(args.cache_dir, args.db, args.gzip)
+        print(f"✅ {count} respuestas importadas a {args.db}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+"""
+Instrumentación de latencia y throughput por componente.
+
+``InstrumentationExtension`` envuelve, al abrirse el spider, cada método de
+los downloader middlewares, los callbacks ``parse*`` del spider y el
+``process_item`` de cada item pipeline. Registra por componente un histograma
+de latencia, la cantidad de llamadas, items de entrada/salida y los motivos
+de descarte (DropItem). Los resultados se publican en las stats del crawler
+(``instrumentation/...``), se exportan periódicamente a un archivo de texto
+en formato Prometheus (``INSTRUMENTATION_METRICS_FILE``, apto para el
+textfile collector de node_exporter) y al cerrar se loguea un resumen con los
+componentes que más tiempo consumieron.
+
+La latencia de los middlewares async incluye sus esperas (p. ej. el pacing):
+es tiempo de reloj, no de CPU.
+"""
+
+import bisect
+import functools
+import inspect
+import os
+import re
+import time
+
+from scrapy import signals
+from scrapy.exceptions import DropItem, NotConfigured
+
+# Límites superiores de los buckets, en segundos
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+           0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+DOWNLOADER_METHODS = ('process_request', 'process_response', 'process_exception')
+
+_DROP_REASON_RE = re.compile(r'^([^:{\[(]+)')
+
+
+class LatencyHistogram:
+    """Histograma acumulativo con buckets fijos (como los de Prometheus)"""
+
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """Cuantil aproximado: límite superior del bucket que lo contiene"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float('inf')
+
+
+class ComponentMetrics:
+    """Métricas de un método de un componente"""
+
+    __slots__ = ('kind', 'component', 'method', 'latency', 'items_in', 'items_out', 'requests_out', 'drops')
+
+    def __init__(self, kind, component, method):
+        self.kind = kind
+        self.component = component
+        self.method = method
+        self.latency = LatencyHistogram()
+        self.items_in = 0
+        self.items_out = 0
+        self.requests_out = 0
+        self.drops = {}
+
+    @property
+    def key(self):
+        return f'{self.kind}/{self.component}/{self.method}'
+
+
+def drop_reason(exception):
+    """Motivo corto de un DropItem ('Item duplicado: {...}' -> 'Item duplicado')"""
+    match = _DROP_REASON_RE.match(str(exception))
+    return match.group(1).strip() if match else type(exception).__name__
+
+
+class Instrumentation:
+    """Registro de métricas y fábrica de wrappers con medición de tiempo"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def get(self, kind, component, method):
+        key = (kind, component, method)
+        metrics = self.metrics.get(key)
+        if metrics is None:
+            metrics = self.metrics[key] = ComponentMetrics(kind, component, method)
+        return metrics
+
+    def wrap_method(self, method, kind, component, name):
+        """Envuelve un método sync o async midiendo su duración"""
+        metrics = self.get(kind, component, name)
+        clock = time.perf_counter
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def timed(*args, **kwargs):
+                start = clock()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    metrics.latency.observe(clock() - start)
+        else:
+            @functools.wraps(method)
+            def timed(*args, **kwargs):
+                start = clock()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    metrics.latency.observe(clock() - start)
+        return timed
+
+    def wrap_pipeline(self, method, component):
+        """Envuelve process_item contando items de entrada/salida y descartes"""
+        metrics = self.get('pipeline', component, 'process_item')
+        clock = time.perf_counter
+
+        def record(start, exception=None):
+            metrics.latency.observe(clock() - start)
+            if isinstance(exception, DropItem):
+                reason = drop_reason(exception)
+                metrics.drops[reason] = metrics.drops.get(reason, 0) + 1
+            elif exception is None:
+                metrics.items_out += 1
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def timed(*args, **kwargs):
+                metrics.items_in += 1
+                start = clock()
+                try:
+                    result = await method(*args, **kwargs)
+                except Exception as e:
+                    record(start, e)
+                    raise
+                record(start)
+                return result
+        else:
+            @functools.wraps(method)
+            def timed(*args, **kwargs):
+                metrics.items_in += 1
+                start = clock()
+                try:
+                    result = method(*args, **kwargs)
+                except Exception as e:
+                    record(start, e)
+                    raise
+                record(start)
+                return result
+        return timed
+
+    def wrap_callback(self, callback, component):
+        """Envuelve un callback del spider; si devuelve un generador, mide cada
+        paso de la iteración (sin contar el tiempo del consumidor)"""
+        metrics = self.get('callback', component, callback.__name__)
+        clock = time.perf_counter
+
+        def timed_iter(iterator, elapsed):
+            from scrapy import Request
+
+            while True:
+                start = clock()
+                try:
+                    result = next(iterator)
+                except StopIteration:
+                    metrics.latency.observe(elapsed + clock() - start)
+                    break
+                elapsed += clock() - start
+                if isinstance(result, Request):
+                    metrics.requests_out += 1
+                else:
+                    metrics.items_out += 1
+                yield result
+
+        @functools.wraps(callback)
+        def timed(*args, **kwargs):
+            metrics.items_in += 1
+            start = clock()
+            result = callback(*args, **kwargs)
+            elapsed = clock() - start
+            if inspect.isgenerator(result):
+                return timed_iter(result, elapsed)
+            metrics.latency.observe(elapsed)
+            return result
+        return timed
+
+    def stats(self):
+        """Métricas planas para las stats del crawler"""
+        values = {}
+        for m in self.metrics.values():
+            prefix = f'instrumentation/{m.key}'
+            values[f'{prefix}/calls'] = m.latency.count
+            values[f'{prefix}/seconds'] = round(m.latency.sum, 6)
+            values[f'{prefix}/p50_ms'] = m.latency.quantile(0.5) * 1000
+            values[f'{prefix}/p99_ms'] = m.latency.quantile(0.99) * 1000
+            if m.kind in ('pipeline', 'callback'):
+                values[f'{prefix}/items_in'] = m.items_in
+                values[f'{prefix}/items_out'] = m.items_out
+            if m.requests_out:
+                values[f'{prefix}/requests_out'] = m.requests_out
+            for reason, count in m.drops.items():
+                values[f'{prefix}/dropped/{reason}'] = count
+        return values
+
+    def prometheus(self):
+        """Exposición en formato de texto de Prometheus"""
+        lines = [
+            '# HELP scrapy_component_latency_seconds Latencia por componente y método',
+            '# TYPE scrapy_component_latency_seconds histogram',
+        ]
+        for m in self.metrics.values():
+            labels = f'kind="{m.kind}",component="{_escape(m.component)}",method="{m.method}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, m.latency.counts):
+                cumulative += count
+                lines.append(f'scrapy_component_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'scrapy_component_latency_seconds_bucket{{{labels},le="+Inf"}} {m.latency.count}')
+            lines.append(f'scrapy_component_latency_seconds_sum{{{labels}}} {m.latency.sum:.6f}')
+            lines.append(f'scrapy_component_latency_seconds_count{{{labels}}} {m.latency.count}')
+
+        lines += [
+            '# HELP scrapy_component_items_total Items que entran y salen de pipelines y callbacks',
+            '# TYPE scrapy_component_items_total counter',
+        ]
+        for m in self.metrics.values():
+            if m.kind not in ('pipeline', 'callback'):
+                continue
+            labels = f'kind="{m.kind}",component="{_escape(m.component)}"'
+            lines.append(f'scrapy_component_items_total{{{labels},direction="in"}} {m.items_in}')
+            lines.append(f'scrapy_component_items_total{{{labels},direction="out"}} {m.items_out}')
+
+        lines += [
+            '# HELP scrapy_pipeline_dropped_total Items descartados por pipeline y motivo',
+            '# TYPE scrapy_pipeline_dropped_total counter',
+        ]
+        for m in self.metrics.values():
+            for reason, count in m.drops.items():
+                lines.append(
+                    f'scrapy_pipeline_dropped_total{{component="{_escape(m.component)}",'
+                    f'reason="{_escape(reason)}"}} {count}'
+                )
+        return '\n'.join(lines) + '\n'
+
+    def top(self, n=10):
+        """Los `n` componentes con más tiempo acumulado"""
+        return sorted(self.metrics.values(), key=lambda m: m.latency.sum, reverse=True)[:n]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _wrap_manager_methods(manager, names, wrap):
+    """Reemplaza los métodos registrados en un MiddlewareManager por sus wrappers"""
+    requiring_spider = getattr(manager, '_mw_methods_requiring_spider', None)
+    for name in names:
+        methods = manager.methods.get(name)
+        if not methods:
+            continue
+        for i, method in enumerate(methods):
+            if method is None or getattr(method, '__wrapped__', None) is not None:
+                continue
+            wrapped = wrap(method, type(method.__self__).__name__, name)
+            # Scrapy pasa `spider` sólo a los métodos que lo requieren
+            if requiring_spider is not None and method in requiring_spider:
+                requiring_spider.add(wrapped)
+            methods[i] = wrapped
+
+
+class InstrumentationExtension:
+    """Extensión que instala la instrumentación y exporta las métricas"""
+
+    def __init__(self, crawler, metrics_file, export_interval, top_n):
+        self.crawler = crawler
+        self.metrics_file = metrics_file
+        self.export_interval = export_interval
+        self.top_n = top_n
+        self.instrumentation = Instrumentation()
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('INSTRUMENTATION_ENABLED'):
+            raise NotConfigured
+        ext = cls(
+            crawler,
+            settings.get('INSTRUMENTATION_METRICS_FILE', 'logs/metrics.prom'),
+            settings.getfloat('INSTRUMENTATION_EXPORT_INTERVAL', 30.0),
+            settings.getint('INSTRUMENTATION_TOP', 10),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        engine = self.crawler.engine
+        instrumentation = self.instrumentation
+        _wrap_manager_methods(
+            engine.downloader.middleware, DOWNLOADER_METHODS,
+            lambda method, component, name: instrumentation.wrap_method(method, 'downloader', component, name),
+        )
+        _wrap_manager_methods(
+            engine.scraper.itemproc, ('process_item',),
+            lambda method, component, name: instrumentation.wrap_pipeline(method, component),
+        )
+        # Callbacks: atributo de instancia, así self.parse ya devuelve el wrapper
+        for name, member in inspect.getmembers(type(spider), inspect.isfunction):
+            if name.startswith('parse'):
+                setattr(spider, name, instrumentation.wrap_callback(getattr(spider, name), type(spider).__name__))
+
+        if self.export_interval > 0:
+            from twisted.internet import task
+
+            self.task = task.LoopingCall(self.export)
+            self.task.start(self.export_interval, now=False)
+
+    def export(self):
+        for key, value in self.instrumentation.stats().items():
+            self.crawler.stats.set_value(key, value)
+        if not self.metrics_file:
+            return
+        directory = os.path.dirname(self.metrics_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.metrics_file}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.instrumentation.prometheus())
+        os.replace(tmp_path, self.metrics_file)
+
+    def spider_closed(self, spider):
+        if self.task is not None and self.task.running:
+            self.task.stop()
+        self.export()
+
+        top = [m for m in self.instrumentation.top(self.top_n) if m.latency.count]
+        if not top:
+            return
+        total = sum(m.latency.sum for m in self.instrumentation.metrics.values()) or 1.0
+        lines = ["=== COMPONENTES CON MÁS TIEMPO ===",
+                 f"{'componente':<60}{'llamadas':>10}{'total s':>10}{'%':>7}{'p50 ms':>9}{'p99 ms':>9}"]
+        for m in top:
+            lines.append(
+                f"{m.key:<60}{m.latency.count:>10}{m.latency.sum:>10.2f}{m.latency.sum / total:>7.1%}"
+                f"{m.latency.quantile(0.5) * 1000:>9.2f}{m.latency.quantile(0.99) * 1000:>9.2f}"
+            )
+        spider.logger.info('\n'.join(lines))
@@ -3,6 +3,9 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
 
+from dataclasses import dataclass, fields
+from typing import Optional
+
 import scrapy
 
 
@@ -30,3 +33,51 @@ class PropiedadItem(scrapy.Item):
     
     # Metadatos
     scraped_at = scrapy.Field()
+
+
+@dataclass(slots=True)
+class Propiedad:
+    """Registro compacto de una propiedad (lo produce NormalizationPipeline)
+    
+    Con ``__slots__`` cada instancia ocupa una fracción de un dict o de un
+    PropiedadItem. Implementa ``get`` / ``keys`` / ``[]`` para que los
+    pipelines y exportadores lo usen igual que un dict.
+    """
+    
+    precio_alquiler: Optional[int] = None
+    expensas: Optional[int] = None
+    precio_total: Optional[int] = None
+    direccion: Optional[str] = None
+    zona: Optional[str] = None
+    barrio: Optional[str] = None
+    superficie: Optional[int] = None
+    ambientes: Optional[int] = None
+    habitaciones: Optional[int] = None
+    banos: Optional[int] = None
+    descripcion: Optional[str] = None
+    url: Optional[str] = None
+    scraped_at: Optional[str] = None
+    
+    def keys(self):
+        return PROPIEDAD_FIELDS
+    
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+    
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+    
+    def __contains__(self, key):
+        return key in PROPIEDAD_FIELDS
+    
+    def to_dict(self):
+        return {field: getattr(self, field) for field in PROPIEDAD_FIELDS}
+
+
+PROPIEDAD_FIELDS = tuple(field.name for field in fields(Propiedad))
@@ -0,0 +1,123 @@
+"""
+Índice persistente de propiedades ya vistas, para crawls incrementales.
+
+Las URLs de ZonaProp terminan en un ID numérico estable
+(``...-flores-56338981.html``); el índice guarda, por ID, una huella de los
+datos de la propiedad para distinguir avisos nuevos, modificados o conocidos.
+
+Clasificar no escribe en el índice: las huellas quedan pendientes en memoria
+y se registran con ``mark_exported`` cuando ExportPipeline terminó de
+persistir los items. Un aviso descartado por los pipelines, o perdido en una
+corrida que se cortó antes de cerrar las salidas, sigue siendo nuevo en la
+próxima corrida.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+LISTING_ID_RE = re.compile(r'-(\d+)\.html')
+
+# Campos cuyo cambio hace que una propiedad conocida se considere modificada
+FINGERPRINT_FIELDS = (
+    'precio_alquiler', 'expensas', 'superficie', 'ambientes', 'habitaciones', 'banos', 'direccion',
+)
+
+NEW = 'new'
+CHANGED = 'changed'
+KNOWN = 'known'
+
+
+def listing_id(url):
+    """ID numérico del aviso a partir de su URL, o None"""
+    if not url:
+        return None
+    match = LISTING_ID_RE.search(url)
+    return int(match.group(1)) if match else None
+
+
+def fingerprint(item):
+    """Huella corta de los datos relevantes de una propiedad"""
+    raw = '\x1f'.join(str(item.get(field)) for field in FINGERPRINT_FIELDS)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class SeenListingIndex:
+    """Índice SQLite de avisos vistos: listing_id -> huella y fechas"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS seen_listings (
+                listing_id INTEGER PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            )
+        ''')
+        self.connection.commit()
+        # listing_id -> huella de los avisos emitidos en esta corrida y todavía no exportados
+        self.pending = {}
+
+    def classify(self, items):
+        """Clasifica los items de una página en new/changed/known (una sola consulta).
+
+        Los nuevos y modificados quedan pendientes hasta ``mark_exported``; un
+        aviso repetido en otra página de la misma corrida ya cuenta como conocido.
+        """
+        ids = [listing_id(item.get('url')) for item in items]
+        lookup = [i for i in ids if i is not None and i not in self.pending]
+        previous = {}
+        if lookup:
+            placeholders = ','.join('?' * len(lookup))
+            previous = dict(self.connection.execute(
+                f'SELECT listing_id, fingerprint FROM seen_listings WHERE listing_id IN ({placeholders})',
+                lookup,
+            ))
+        previous.update(self.pending)
+
+        statuses = []
+        for item, item_id in zip(items, ids):
+            if item_id is None:
+                statuses.append(NEW)
+                continue
+            current = fingerprint(item)
+            old = previous.get(item_id)
+            status = NEW if old is None else KNOWN if old == current else CHANGED
+            if status != KNOWN:
+                self.pending[item_id] = previous[item_id] = current
+            statuses.append(status)
+        return statuses
+
+    def mark_exported(self, urls):
+        """Registra los avisos pendientes de `urls` (ya persistidos); una transacción"""
+        now = datetime.now().isoformat()
+        rows = []
+        for url in urls:
+            item_id = listing_id(url)
+            current = self.pending.pop(item_id, None)
+            if current is not None:
+                rows.append((item_id, current, now, now))
+        with self.connection:
+            self.connection.executemany('''
+                INSERT INTO seen_listings (listing_id, fingerprint, first_seen, last_seen)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(listing_id) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    last_seen = excluded.last_seen
+            ''', rows)
+        return len(rows)
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM seen_listings').fetchone()[0]
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
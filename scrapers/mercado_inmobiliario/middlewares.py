@@ -2,9 +2,11 @@ import random
 import time
 from scrapy import signals
 from scrapy.http import HtmlResponse
-from scrapy.downloadermiddlewares.retry import RetryMiddleware
+from scrapy.downloadermiddlewares.retry import RetryMiddleware, get_retry_request
 from scrapy.utils.response import response_status_message
 
+from .pacing import wait
+
 
 class ZonapropSpiderMiddleware:
     """Spider middleware para ZonaProp"""
@@ -112,44 +114,98 @@ class RotateUserAgentMiddleware:
 
 
 class DelayMiddleware:
-    """Middleware para agregar delays adicionales"""
+    """Middleware que demora los reintentos sin bloquear el reactor
+
+    Respeta ``meta['not_before']`` (timestamp epoch): las requests
+    reprogramadas por RetryWithBackoffMiddleware esperan hasta ese momento
+    mientras el resto del crawl sigue avanzando. El ritmo normal entre
+    requests lo fija sólo PacingMiddleware.
+    """
     
-    def __init__(self):
-        self.delays = [1, 2, 3, 4, 5]
+    def __init__(self, stats=None):
+        self.stats = stats
     
-    def process_request(self, request, spider):
-        delay = random.choice(self.delays)
-        time.sleep(delay)
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.stats)
+    
+    async def process_request(self, request, spider):
+        not_before = request.meta.get('not_before')
+        if not not_before:
+            return None
+        delay = not_before - time.time()
+        if delay <= 0:
+            return None
+        
+        if self.stats is not None:
+            self.stats.inc_value('delay/requests')
+            self.stats.inc_value('delay/seconds', delay)
+            self.stats.inc_value('delay/waiting')
+        try:
+            await wait(delay)
+        finally:
+            if self.stats is not None:
+                self.stats.inc_value('delay/waiting', -1)
         return None
 
 
 class RetryWithBackoffMiddleware(RetryMiddleware):
-    """Middleware personalizado de reintentos con backoff exponencial"""
+    """Middleware personalizado de reintentos con backoff exponencial
     
-    def __init__(self, settings):
+    No duerme: el reintento sale con ``meta['not_before']`` y es
+    DelayMiddleware quien lo demora con un Deferred.
+    """
+    
+    def __init__(self, settings, stats=None):
         super().__init__(settings)
         self.max_retry_times = settings.getint('RETRY_TIMES')
         self.retry_http_codes = set(int(x) for x in settings.getlist('RETRY_HTTP_CODES'))
         self.priority_adjust = settings.getint('RETRY_PRIORITY_ADJUST')
+        self.backoff_base = settings.getfloat('RETRY_BACKOFF_BASE', 2.0)
+        self.backoff_max = settings.getfloat('RETRY_BACKOFF_MAX', 60.0)
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler.settings, crawler.stats)
+        mw.crawler = crawler
+        return mw
+
+    def _retry(self, request, reason, spider=None):
+        # Punto de entrada de RetryMiddleware (la firma cambia entre versiones de Scrapy)
+        return self.retry(request, reason, spider or self.crawler.spider)
 
     def retry(self, request, reason, spider):
-        retry_times = request.meta.get('retry_times', 0) + 1
+        retry_req = get_retry_request(
+            request,
+            spider=spider,
+            reason=reason,
+            max_retry_times=request.meta.get('max_retry_times', self.max_retry_times),
+            priority_adjust=request.meta.get('priority_adjust', self.priority_adjust),
+        )
         
-        if retry_times <= self.max_retry_times:
-            spider.logger.debug(f"Retrying {request.url} (failed {retry_times} times): {reason}")
-            
-            # Backoff exponencial
-            delay = 2 ** retry_times
-            time.sleep(delay)
-            
-            retry_req = request.copy()
-            retry_req.meta['retry_times'] = retry_times
-            retry_req.dont_filter = True
-            retry_req.priority = request.priority + self.priority_adjust
-            
-            return retry_req
-        else:
-            spider.logger.debug(f"Gave up retrying {request.url} (failed {retry_times} times): {reason}")
+        if retry_req is None:
+            spider.logger.debug(f"Gave up retrying {request.url}: {reason}")
+            if self.stats is not None:
+                self.stats.inc_value('retry_backoff/gave_up')
+            return None
+        
+        retry_times = retry_req.meta['retry_times']
+        
+        # Backoff exponencial: se reprograma la request en vez de dormir
+        delay = min(self.backoff_base ** retry_times, self.backoff_max)
+        retry_req.meta['backoff_delay'] = delay
+        retry_req.meta['not_before'] = time.time() + delay
+        spider.logger.debug(f"Retrying {request.url} (failed {retry_times} times) en {delay:.1f}s: {reason}")
+        
+        if self.stats is not None:
+            self.stats.inc_value('retry_backoff/scheduled')
+            self.stats.inc_value(f'retry_backoff/attempt/{retry_times}')
+            self.stats.inc_value('retry_backoff/delay_seconds', delay)
+            self.stats.max_value('retry_backoff/max_delay', delay)
+            self.stats.max_value('retry_backoff/max_retry_times', retry_times)
+        
+        return retry_req
 
 
 class JavaScriptMiddleware:
@@ -0,0 +1,167 @@
+"""
+Capa de pacing no bloqueante para ZonaProp.
+
+Reemplaza los ``time.sleep`` dentro del spider: en lugar de frenar el
+reactor de Twisted, cada request espera su turno con un Deferred y el
+parseo corre a máxima velocidad.
+"""
+
+import random
+import time
+from urllib.parse import urlparse
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.task import deferLater
+
+
+def deferred_delay(seconds, result=None):
+    """Devuelve un Deferred que se dispara luego de `seconds` sin bloquear el reactor"""
+    # Import tardío: no instalar el reactor por defecto antes que Scrapy
+    from twisted.internet import reactor
+    return deferLater(reactor, max(seconds, 0), lambda: result)
+
+
+async def wait(seconds):
+    """Espera `seconds` desde un callable async de Scrapy (cualquier reactor)"""
+    if seconds > 0:
+        await maybe_deferred_to_future(deferred_delay(seconds))
+
+
+class JitterPolicy:
+    """Política de jitter configurable para los delays entre requests"""
+
+    MODES = ('none', 'uniform', 'exponential')
+
+    def __init__(self, mode='uniform', low=0.0, high=0.0, rng=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Modo de jitter inválido: {mode} (opciones: {', '.join(self.MODES)})")
+        self.mode = mode
+        self.low = float(low)
+        self.high = float(high)
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def from_settings(cls, settings):
+        low, high = settings.getlist('PACING_JITTER_RANGE', [0.0, 0.0])
+        return cls(settings.get('PACING_JITTER', 'uniform'), float(low), float(high))
+
+    def sample(self, low=None, high=None):
+        low = self.low if low is None else low
+        high = self.high if high is None else high
+
+        if self.mode == 'none' or high <= 0:
+            return 0.0
+        if self.mode == 'exponential':
+            # Media en el centro del rango, recortada al máximo
+            return min(low + self.rng.expovariate(2.0 / max(high - low, 1e-9)), high)
+        return self.rng.uniform(low, high)
+
+
+class TokenBucket:
+    """Token bucket con reservas: devuelve cuánto esperar en vez de dormir"""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("El rate del token bucket debe ser mayor a 0")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def reserve(self, tokens=1, extra=0.0):
+        """Reserva `tokens` y devuelve los segundos a esperar hasta poder usarlos
+
+        `extra` son segundos adicionales (el jitter) que también corren la
+        próxima reserva: las esperas se acumulan en vez de superponerse.
+        """
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= tokens + extra * self.rate
+
+        if self.tokens >= 0:
+            return 0.0
+        # Saldo negativo: la reserva queda pendiente hasta recuperar los tokens
+        return -self.tokens / self.rate
+
+
+class DomainPacer:
+    """Mantiene un token bucket por dominio y combina su espera con el jitter"""
+
+    def __init__(self, rate, capacity=1, jitter=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.jitter = jitter or JitterPolicy('none')
+        self.clock = clock
+        self.buckets = {}
+
+    def bucket_for(self, domain):
+        if domain not in self.buckets:
+            self.buckets[domain] = TokenBucket(self.rate, self.capacity, clock=self.clock)
+        return self.buckets[domain]
+
+    def delay_for(self, url, jitter_range=None):
+        """Segundos que debe esperar una request a `url` antes de descargarse"""
+        domain = urlparse(url).netloc
+        if jitter_range:
+            low, high = jitter_range
+            jitter = self.jitter.sample(float(low), float(high))
+        else:
+            jitter = self.jitter.sample()
+        # El jitter se reserva en el bucket: dos requests seguidas quedan separadas por ambos
+        return self.bucket_for(domain).reserve(extra=jitter)
+
+
+class PacingMiddleware:
+    """Downloader middleware que aplica el pacing por dominio con Deferreds
+
+    Las requests pueden pedir un rango de jitter propio con
+    ``meta['pacing_jitter'] = (min, max)`` o saltear el pacing con
+    ``meta['dont_pace'] = True``.
+
+    Es la única capa de delays del proyecto y va después de
+    HttpCacheMiddleware: las respuestas servidas desde el cache no
+    consumen tokens ni pagan el jitter.
+    """
+
+    def __init__(self, pacer, stats=None):
+        self.pacer = pacer
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('PACING_ENABLED'):
+            raise NotConfigured
+
+        pacer = DomainPacer(
+            rate=settings.getfloat('PACING_DOMAIN_RATE', 0.2),
+            capacity=settings.getint('PACING_DOMAIN_BURST', 1),
+            jitter=JitterPolicy.from_settings(settings),
+        )
+        mw = cls(pacer, crawler.stats)
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        return mw
+
+    def spider_opened(self, spider):
+        spider.logger.info(
+            f"Pacing activo: {self.pacer.rate} req/s por dominio, "
+            f"burst {self.pacer.capacity}, jitter {self.pacer.jitter.mode}"
+        )
+
+    async def process_request(self, request, spider):
+        if request.meta.get('dont_pace'):
+            return None
+
+        delay = self.pacer.delay_for(request.url, request.meta.get('pacing_jitter'))
+        if self.stats is not None:
+            self.stats.inc_value('pacing/requests')
+            if delay > 0:
+                self.stats.inc_value('pacing/delayed_requests')
+                self.stats.inc_value('pacing/delay_seconds', delay)
+
+        await wait(delay)
+        return None
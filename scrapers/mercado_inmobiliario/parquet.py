@@ -0,0 +1,127 @@
+"""
+Dataset Parquet de propiedades particionado por barrio y fecha de scraping.
+
+Estructura (particiones estilo Hive, legibles con ``pandas.read_parquet``,
+``pyarrow.dataset``, DuckDB o Polars con pushdown de filtros)::
+
+    output/parquet/barrio=Flores/fecha=2025-05-28/part-20250528_024151.parquet
+
+Cada partición acumula filas hasta ``row_group_size`` y las escribe como un
+row group (record batch tipado de Arrow); las columnas de texto con pocos
+valores distintos usan dictionary encoding. Requiere ``pyarrow``.
+"""
+
+import os
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from mercado_inmobiliario.store import barrio_from_zona
+
+SCHEMA = pa.schema([
+    ('precio_alquiler', pa.int64()),
+    ('expensas', pa.int64()),
+    ('precio_total', pa.int64()),
+    ('direccion', pa.string()),
+    ('zona', pa.string()),
+    ('superficie', pa.int32()),
+    ('ambientes', pa.int16()),
+    ('habitaciones', pa.int16()),
+    ('banos', pa.int16()),
+    ('descripcion', pa.string()),
+    ('url', pa.string()),
+    ('scraped_at', pa.timestamp('us')),
+])
+
+DEFAULT_DICTIONARY_COLUMNS = ('zona',)
+
+# Valor de partición para barrio/fecha vacíos (convención de Hive)
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+def _partition_value(value):
+    if not value:
+        return NULL_PARTITION
+    return str(value).replace(os.sep, '_').replace('=', '_')
+
+
+def partition_of(row):
+    """(barrio, fecha) de una fila; la fecha sale de scraped_at (ISO)"""
+    scraped_at = row.get('scraped_at')
+    fecha = scraped_at[:10] if isinstance(scraped_at, str) else None
+    return _partition_value(barrio_from_zona(row.get('zona'))), _partition_value(fecha)
+
+
+def _to_timestamp(value):
+    if not value or isinstance(value, datetime):
+        return value or None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class PartitionedParquetWriter:
+    """Escritor incremental de un dataset Parquet particionado por barrio/fecha
+
+    Mantiene un ParquetWriter abierto por partición (un archivo por partición
+    y corrida) y un buffer de a lo sumo ``row_group_size`` filas por partición.
+    Los archivos se escriben como ``.tmp`` y se renombran al cerrar.
+    """
+
+    def __init__(self, base_dir, row_group_size=10000, compression='zstd',
+                 dictionary_columns=DEFAULT_DICTIONARY_COLUMNS, run_id=None):
+        self.base_dir = base_dir
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.dictionary_columns = list(dictionary_columns)
+        self.run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.buffers = {}
+        self.writers = {}
+        self.rows = 0
+        self.row_groups = 0
+
+    def write(self, row):
+        partition = partition_of(row)
+        buffer = self.buffers.get(partition)
+        if buffer is None:
+            buffer = self.buffers[partition] = {name: [] for name in SCHEMA.names}
+        for name, values in buffer.items():
+            values.append(row.get(name))
+        self.rows += 1
+        if len(buffer['url']) >= self.row_group_size:
+            self._flush_partition(partition)
+
+    def _flush_partition(self, partition):
+        buffer = self.buffers.pop(partition, None)
+        if not buffer or not buffer['url']:
+            return
+        buffer['scraped_at'] = [_to_timestamp(value) for value in buffer['scraped_at']]
+        batch = pa.RecordBatch.from_pydict(buffer, schema=SCHEMA)
+
+        if partition not in self.writers:
+            barrio, fecha = partition
+            directory = os.path.join(self.base_dir, f'barrio={barrio}', f'fecha={fecha}')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'part-{self.run_id}.parquet')
+            writer = pq.ParquetWriter(
+                f'{path}.tmp', SCHEMA,
+                compression=self.compression,
+                use_dictionary=self.dictionary_columns,
+            )
+            self.writers[partition] = (writer, path)
+        writer, _ = self.writers[partition]
+        writer.write_batch(batch, row_group_size=self.row_group_size)
+        self.row_groups += 1
+
+    def close(self):
+        """Escribe los buffers pendientes y renombra los archivos terminados"""
+        for partition in list(self.buffers):
+            self._flush_partition(partition)
+        for writer, path in self.writers.values():
+            writer.close()
+            os.replace(f'{path}.tmp', path)
+        paths = [path for _, path in self.writers.values()]
+        self.writers = {}
+        return paths
@@ -1,253 +1,363 @@
 import json
-import csv
 import os
+import sys
+import time
 from datetime import datetime
-from scrapy.exceptions import DropItem
-import logging
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.settings import Settings
 
+from mercado_inmobiliario import dedup, exporters, sketches, store
+from mercado_inmobiliario.items import Propiedad
 
-class ValidationPipeline:
-    """Pipeline para validar los items extraídos"""
+
+class NormalizationPipeline:
+    """Validación + limpieza en una sola pasada
+    
+    Convierte cada item en un ``items.Propiedad`` con slots: valida, convierte
+    los campos numéricos, normaliza espacios, deriva ``precio_total`` y el
+    barrio, e interna los strings de zona/barrio (un único objeto por valor).
+    El timestamp se recalcula a lo sumo una vez por segundo.
+    """
+    
+    numeric_fields = ('precio_alquiler', 'expensas', 'superficie', 'ambientes', 'habitaciones', 'banos')
+    
+    def __init__(self):
+        # zona cruda -> (zona normalizada, barrio), ambos internados
+        self.zonas = {}
+        self._stamp_second = None
+        self._stamp = None
+    
+    def _now(self):
+        second = int(time.time())
+        if second != self._stamp_second:
+            self._stamp_second = second
+            self._stamp = datetime.fromtimestamp(second).isoformat()
+        return self._stamp
+    
+    def _zona(self, raw):
+        cached = self.zonas.get(raw)
+        if cached is None:
+            zona = ' '.join(raw.split()).title() if raw else raw
+            barrio = store.barrio_from_zona(zona)
+            cached = self.zonas[raw] = (
+                sys.intern(zona) if zona else zona,
+                sys.intern(barrio) if barrio else barrio,
+            )
+        return cached
+    
+    def _to_int(self, field, value, spider):
+        try:
+            return int(value) if value != '' else None
+        except (ValueError, TypeError):
+            spider.logger.warning(f"Valor inválido en {field}: {value}")
+            return None
     
     def process_item(self, item, spider):
+        get = item.get
         # Validar que tenga al menos precio o dirección
-        if not item.get('precio_alquiler') and not item.get('direccion'):
+        if not get('precio_alquiler') and not get('direccion'):
             raise DropItem(f"Item sin precio ni dirección: {item}")
         
-        # Validar tipos de datos
-        numeric_fields = ['precio_alquiler', 'expensas', 'superficie', 'ambientes', 'habitaciones', 'banos']
-        for field in numeric_fields:
-            if item.get(field) is not None:
-                try:
-                    item[field] = int(item[field]) if item[field] != '' else None
-                except (ValueError, TypeError):
-                    spider.logger.warning(f"Valor inválido en {field}: {item.get(field)}")
-                    item[field] = None
-        
-        return item
-
-
-class CleaningPipeline:
-    """Pipeline para limpiar y normalizar los datos"""
-    
-    def process_item(self, item, spider):
-        # Limpiar strings
-        string_fields = ['direccion', 'zona', 'descripcion']
-        for field in string_fields:
-            if item.get(field):
-                # Remover espacios extra y caracteres especiales
-                item[field] = ' '.join(item[field].split())
-                item[field] = item[field].strip()
-        
-        # Normalizar zona
-        if item.get('zona'):
-            item['zona'] = item['zona'].title()
-        
-        # Agregar timestamp
-        item['scraped_at'] = datetime.now().isoformat()
-        
-        # Calcular precio total (alquiler + expensas)
-        if item.get('precio_alquiler') and item.get('expensas'):
-            item['precio_total'] = item['precio_alquiler'] + item['expensas']
-        elif item.get('precio_alquiler'):
-            item['precio_total'] = item['precio_alquiler']
-        else:
-            item['precio_total'] = None
-        
-        # Agregar URL limpia si existe
-        if item.get('url'):
-            item['url'] = item['url'].split('?')[0]  # Remover parámetros de query
+        precio, expensas, superficie, ambientes, habitaciones, banos = [
+            value if value is None or type(value) is int else self._to_int(field, value, spider)
+            for field, value in zip(self.numeric_fields, map(get, self.numeric_fields))
+        ]
+        direccion = get('direccion')
+        descripcion = get('descripcion')
+        url = get('url')
+        zona, barrio = self._zona(get('zona'))
         
-        return item
+        # Orden posicional de items.Propiedad
+        return Propiedad(
+            precio,
+            expensas,
+            (precio + expensas if expensas else precio) if precio else None,
+            ' '.join(direccion.split()) if direccion else direccion,
+            zona,
+            barrio,
+            superficie,
+            ambientes,
+            habitaciones,
+            banos,
+            ' '.join(descripcion.split()) if descripcion else descripcion,
+            url.split('?')[0] if url else url,
+            self._now(),
+        )
 
 
 class DuplicatesPipeline:
-    """Pipeline para filtrar items duplicados"""
+    """Pipeline para filtrar items duplicados, también entre corridas
     
-    def __init__(self):
-        self.seen = set()
+    La clave es el ID del aviso (o dirección normalizada + precio) y se
+    consulta en un filtro de Bloom con memoria acotada (DEDUP_MEMORY_MB,
+    DEDUP_FALSE_POSITIVE_RATE) respaldado por un índice exacto en SQLite
+    (DEDUP_PATH). Ver dedup.py.
+    """
     
-    def process_item(self, item, spider):
-        # Crear un identificador único basado en dirección y precio
-        identifier = f"{item.get('direccion', '')}_{item.get('precio_alquiler', '')}"
-        
-        if identifier in self.seen:
-            raise DropItem(f"Item duplicado: {item}")
-        else:
-            self.seen.add(identifier)
-            return item
-
-
-class JsonPipeline:
-    """Pipeline para guardar en formato JSON"""
+    def __init__(self, path='data/dedup.db', memory_mb=16, false_positive_rate=0.001, stats=None, crawler=None):
+        self.path = path
+        self.memory_mb = memory_mb
+        self.false_positive_rate = false_positive_rate
+        self.stats = stats
+        # Las stats del crawler recién existen al empezar el crawl: se leen en open_spider
+        self.crawler = crawler
+        self.index = None
     
-    def __init__(self):
-        self.items = []
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            settings.get('DEDUP_PATH', 'data/dedup.db'),
+            settings.getfloat('DEDUP_MEMORY_MB', 16),
+            settings.getfloat('DEDUP_FALSE_POSITIVE_RATE', 0.001),
+            crawler=crawler,
+        )
+    
+    def open_spider(self, spider):
+        if self.crawler is not None:
+            self.stats = self.crawler.stats
+        self.index = dedup.DuplicateIndex(self.path, self.memory_mb, self.false_positive_rate)
+        bloom = self.index.bloom
+        spider.logger.info(
+            f"Índice de duplicados {self.path}: {bloom.count} claves conocidas, "
+            f"capacidad {bloom.capacity} con {bloom.num_bits // 8 // 1024} KB"
+        )
     
     def process_item(self, item, spider):
-        self.items.append(dict(item))
+        if self.index.seen(dedup.dedup_key(item)):
+            if self.stats is not None:
+                self.stats.inc_value('dedup/duplicates')
+            raise DropItem(f"Item duplicado: {item}")
         return item
     
     def close_spider(self, spider):
-        # Crear directorio si no existe
-        os.makedirs('output', exist_ok=True)
-        
-        # Nombre de archivo con timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'output/zonaprop_propiedades_{timestamp}.json'
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.items, f, ensure_ascii=False, indent=2)
-        
-        spider.logger.info(f"Guardados {len(self.items)} items en {filename}")
+        if self.index is None:
+            return
+        if self.index.over_capacity():
+            spider.logger.warning(
+                f"El índice de duplicados superó su capacidad ({self.index.bloom.capacity} claves): "
+                f"aumentar DEDUP_MEMORY_MB para mantener la tasa de falsos positivos"
+            )
+        if self.stats is not None:
+            self.stats.set_value('dedup/keys', self.index.bloom.count)
+            self.stats.set_value('dedup/bloom_false_positives', self.index.false_positives)
+        self.index.close()
+        self.index = None
 
 
-class CsvPipeline:
-    """Pipeline para guardar en formato CSV"""
+class ExportPipeline:
+    """Exportación única a todos los formatos de EXPORT_SINKS (ver exporters.py)
     
-    def __init__(self):
-        self.items = []
-        self.fieldnames = [
-            'precio_alquiler', 'expensas', 'precio_total', 'direccion', 'zona',
-            'superficie', 'ambientes', 'habitaciones', 'banos', 'descripcion',
-            'url', 'scraped_at'
-        ]
+    Cada item se convierte una vez en una fila canónica que se acumula en un
+    buffer; cada EXPORT_FLUSH_ITEMS items o EXPORT_FLUSH_SECS segundos el lote
+    se entrega a todos los sinks (jsonl, csv, parquet, sqlite) y se hace flush
+    + fsync de los archivos. El flush por tiempo lo dispara un LoopingCall del
+    reactor, así el buffer llega a disco aunque no lleguen items (esperas de
+    paginación, backoff de reintentos). Reemplaza a FEEDS y a los pipelines de un solo
+    formato (json, csv, parquet y base de datos) habilitados por separado.
+    
+    En el crawl incremental, los avisos exportados se registran en el índice
+    del spider (``seen_index.mark_exported``) recién cuando se cerraron
+    todos los sinks.
+    """
+    
+    def __init__(self, sinks=('jsonl', 'csv'), settings=None, flush_items=500, flush_secs=30.0, stats=None,
+                 crawler=None):
+        self.sink_names = list(sinks)
+        self.settings = settings if settings is not None else Settings()
+        self.flush_items = flush_items
+        self.flush_secs = flush_secs
+        self.stats = stats
+        self.crawler = crawler
+        self.sinks = {}
+        self.flush_task = None
+        self.buffer = []
+        self.count = 0
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        sinks = settings.getlist('EXPORT_SINKS', ['jsonl', 'csv'])
+        if not sinks:
+            raise NotConfigured("EXPORT_SINKS vacío")
+        return cls(
+            sinks,
+            settings,
+            settings.getint('EXPORT_FLUSH_ITEMS', 500),
+            settings.getfloat('EXPORT_FLUSH_SECS', 30.0),
+            crawler=crawler,
+        )
+    
+    def open_spider(self, spider):
+        if self.crawler is not None:
+            self.stats = self.crawler.stats
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.sinks = exporters.build_sinks(self.sink_names, self.settings, timestamp, spider.logger)
+        for sink in self.sinks.values():
+            sink.open()
+        self.buffer = []
+        self.count = 0
+        self.seen_index = getattr(spider, 'seen_index', None)
+        self.exported_urls = []
+        self.logger = spider.logger
+        self.flush_task = None
+        if self.flush_secs > 0:
+            # Import tardío: en un crawl el reactor ya está instalado
+            from twisted.internet import task
+            
+            self.flush_task = task.LoopingCall(self.flush_pending)
+            self.flush_task.start(self.flush_secs, now=False)
     
     def process_item(self, item, spider):
-        self.items.append(dict(item))
+        self.buffer.append(exporters.canonical_row(item))
+        if len(self.buffer) >= self.flush_items:
+            self.flush()
         return item
     
+    def flush_pending(self):
+        """Flush por tiempo (cada EXPORT_FLUSH_SECS): ninguna fila espera más que eso en memoria"""
+        if not self.buffer:
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            # Un error no detiene al LoopingCall; el sink que falló vuelve a avisar al cerrar
+            self.logger.error(str(e))
+    
+    def flush(self):
+        rows = self.buffer
+        self.buffer = []
+        errors = []
+        if rows:
+            # Un sink que falla no le quita el lote a los demás
+            for name, sink in self.sinks.items():
+                try:
+                    sink.write_batch(rows)
+                except Exception as e:
+                    errors.append((name, e))
+            self.count += len(rows)
+            if self.seen_index is not None and not errors:
+                self.exported_urls.extend(row['url'] for row in rows)
+        for sink in self.sinks.values():
+            sink.flush()
+        if errors:
+            name, error = errors[0]
+            raise RuntimeError(f"Error exportando {len(rows)} items al sink {name}: {error}") from error
+    
     def close_spider(self, spider):
-        if not self.items:
+        if self.flush_task is not None and self.flush_task.running:
+            self.flush_task.stop()
+        self.flush_task = None
+        if not self.sinks:
             return
-        
-        # Crear directorio si no existe
-        os.makedirs('output', exist_ok=True)
-        
-        # Nombre de archivo con timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'output/zonaprop_propiedades_{timestamp}.csv'
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=self.fieldnames)
-            writer.writeheader()
-            
-            for item in self.items:
-                # Asegurar que todos los campos existan
-                row = {field: item.get(field, '') for field in self.fieldnames}
-                writer.writerow(row)
-        
-        spider.logger.info(f"Guardados {len(self.items)} items en {filename}")
+        failed = []
+        try:
+            self.flush()
+        except RuntimeError as e:
+            # El sink que falló vuelve a fallar (y se registra) al cerrarlo
+            spider.logger.error(str(e))
+        for name, sink in self.sinks.items():
+            # Cada sink se cierra aunque otro haya fallado
+            try:
+                summary = sink.close()
+            except Exception as e:
+                spider.logger.error(f"Error cerrando el sink {name}: {e}")
+                failed.append(name)
+                continue
+            if summary:
+                spider.logger.info(f"Exportados {summary}")
+            if getattr(sink, 'failed', 0):
+                failed.append(name)
+        if failed:
+            # Sin todas las salidas completas, los avisos no cuentan como vistos
+            spider.logger.error(f"Sinks con error: {', '.join(failed)}; el índice incremental no se actualiza")
+        elif self.seen_index is not None:
+            # Las salidas ya están cerradas: recién ahora los avisos cuentan como vistos
+            registered = self.seen_index.mark_exported(self.exported_urls)
+            spider.logger.info(f"Índice incremental: {registered} avisos registrados")
+            self.exported_urls = []
+        if self.stats is not None:
+            self.stats.set_value('export/items', self.count)
+            self.stats.set_value('export/sinks', len(self.sinks))
+        self.sinks = {}
 
 
 class StatsPipeline:
-    """Pipeline para generar estadísticas"""
+    """Pipeline para generar estadísticas
     
-    def __init__(self):
-        self.items_count = 0
-        self.price_stats = []
-        self.zona_stats = {}
+    Momentos y sketches de cuantiles en streaming (ver sketches.py): la
+    memoria no depende de la cantidad de items. El resumen se publica en las
+    stats del crawler cada STATS_PUBLISH_EVERY items y al cerrar se guarda en
+    ``output/estadisticas_<timestamp>.json`` junto con el estado serializado,
+    que permite combinar crawls en paralelo.
+    """
+    
+    def __init__(self, output_dir='output', sketch_k=200, publish_every=500, stats=None, crawler=None):
+        self.output_dir = output_dir
+        self.publish_every = publish_every
+        self.stats = stats
+        self.crawler = crawler
+        self.property_stats = sketches.PropertyStats(sketch_k)
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            settings.get('EXPORT_DIR', 'output'),
+            settings.getint('STATS_SKETCH_K', 200),
+            settings.getint('STATS_PUBLISH_EVERY', 500),
+            crawler=crawler,
+        )
+    
+    def open_spider(self, spider):
+        if self.crawler is not None:
+            self.stats = self.crawler.stats
+    
+    @property
+    def items_count(self):
+        return self.property_stats.items
     
     def process_item(self, item, spider):
-        self.items_count += 1
-        
-        # Estadísticas de precios
-        if item.get('precio_alquiler'):
-            self.price_stats.append(item['precio_alquiler'])
-        
-        # Estadísticas por zona
-        zona = item.get('zona', 'Sin zona')
-        self.zona_stats[zona] = self.zona_stats.get(zona, 0) + 1
-        
+        self.property_stats.update(item)
+        if self.stats is not None and self.items_count % self.publish_every == 0:
+            self.publish()
         return item
     
+    def publish(self):
+        """Vuelca el resumen a las stats del crawler (propiedades/<corte>/<métrica>/<estadístico>)"""
+        summary = self.property_stats.summary()
+        self.stats.set_value('propiedades/items', summary['items'])
+        groups = [('total', summary['total'])]
+        for section in ('por_zona', 'por_ambientes'):
+            groups += [(f'{section}/{key}', metrics) for key, metrics in summary[section].items()]
+        for prefix, metrics in groups:
+            for metric, values in metrics.items():
+                for name, value in values.items():
+                    self.stats.set_value(f'propiedades/{prefix}/{metric}/{name}', value)
+    
     def close_spider(self, spider):
+        if self.stats is not None:
+            self.publish()
+        summary = self.property_stats.summary()
         spider.logger.info(f"=== ESTADÍSTICAS DEL SCRAPING ===")
         spider.logger.info(f"Total de propiedades: {self.items_count}")
         
-        if self.price_stats:
-            spider.logger.info(f"Precio promedio: ${sum(self.price_stats) / len(self.price_stats):,.0f}")
-            spider.logger.info(f"Precio mínimo: ${min(self.price_stats):,.0f}")
-            spider.logger.info(f"Precio máximo: ${max(self.price_stats):,.0f}")
+        precios = summary['total'].get('precio_alquiler')
+        if precios:
+            spider.logger.info(f"Precio promedio: ${precios['mean']:,.0f}")
+            spider.logger.info(f"Precio mediano: ${precios['p50']:,.0f}")
+            spider.logger.info(f"Precio mínimo: ${precios['min']:,.0f}")
+            spider.logger.info(f"Precio máximo: ${precios['max']:,.0f}")
         
         spider.logger.info(f"Propiedades por zona:")
-        for zona, count in self.zona_stats.items():
-            spider.logger.info(f"  {zona}: {count}")
-
-
-class DatabasePipeline:
-    """Pipeline para guardar en base de datos (SQLite como ejemplo)"""
-    
-    def __init__(self):
-        self.connection = None
-        self.cursor = None
-    
-    def open_spider(self, spider):
-        try:
-            import sqlite3
-            
-            # Crear directorio para la base de datos
-            os.makedirs('data', exist_ok=True)
-            
-            self.connection = sqlite3.connect('data/zonaprop.db')
-            self.cursor = self.connection.cursor()
-            
-            # Crear tabla si no existe
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS propiedades (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    precio_alquiler INTEGER,
-                    expensas INTEGER,
-                    precio_total INTEGER,
-                    direccion TEXT,
-                    zona TEXT,
-                    superficie INTEGER,
-                    ambientes INTEGER,
-                    habitaciones INTEGER,
-                    banos INTEGER,
-                    descripcion TEXT,
-                    url TEXT,
-                    scraped_at TEXT,
-                    UNIQUE(direccion, precio_alquiler)
-                )
-            ''')
-            self.connection.commit()
-            
-        except ImportError:
-            spider.logger.warning("SQLite no disponible. Pipeline de base de datos deshabilitado.")
-            self.connection = None
-    
-    def process_item(self, item, spider):
-        if not self.connection:
-            return item
-        
-        try:
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO propiedades 
-                (precio_alquiler, expensas, precio_total, direccion, zona, superficie, 
-                 ambientes, habitaciones, banos, descripcion, url, scraped_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                item.get('precio_alquiler'),
-                item.get('expensas'),
-                item.get('precio_total'),
-                item.get('direccion'),
-                item.get('zona'),
-                item.get('superficie'),
-                item.get('ambientes'),
-                item.get('habitaciones'),
-                item.get('banos'),
-                item.get('descripcion'),
-                item.get('url'),
-                item.get('scraped_at')
-            ))
-            self.connection.commit()
-            
-        except Exception as e:
-            spider.logger.error(f"Error guardando en base de datos: {e}")
+        for zona, group in self.property_stats.breakdowns['zona'].items():
+            spider.logger.info(f"  {zona}: {group.items}")
         
-        return item
-    
-    def close_spider(self, spider):
-        if self.connection:
-            self.connection.close()
\ No newline at end of file
+        if not self.items_count:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = os.path.join(self.output_dir, f'estadisticas_{timestamp}.json')
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.property_stats.to_dict(), f, ensure_ascii=False)
+        spider.logger.info(f"Estadísticas guardadas en {filename}")
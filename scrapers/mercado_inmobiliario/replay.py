@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Modo replay: re-extrae items desde el HTTP cache sin acceder a la red.
+
+Recorre las respuestas guardadas en el HTTP cache (el archivo SQLite
+``.scrapy/httpcache/zonaprop_spider.sqlite`` o el directorio del
+FilesystemCacheStorage ``.scrapy/httpcache/zonaprop_spider/``) y los volcados ``debug_response.html`` / ``error_page_*.html``, las pasa por
+``ZonapropSpider.parse`` en un pool de procesos y envía los items resultantes
+por los ITEM_PIPELINES configurados (en el proceso principal y en orden).
+
+Uso (desde el directorio ``scrapers/``)::
+
+    python -m mercado_inmobiliario.replay --workers 8
+"""
+
+import argparse
+import glob
+import gzip
+import os
+import pickle
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy.exceptions import DropItem
+from scrapy.http import HtmlResponse, Request
+from scrapy.settings import Settings
+from scrapy.utils.misc import load_object
+from w3lib.http import headers_raw_to_dict
+
+from mercado_inmobiliario import httpcache
+
+DEFAULT_CACHE_DIR = os.path.join('.scrapy', 'httpcache', 'zonaprop_spider')
+DUMP_PATTERNS = ('debug_response.html', 'error_page_*.html', 'debug_page.html')
+
+_spider = None
+
+
+def project_settings(overrides=None):
+    """Settings del proyecto sin depender de scrapy.cfg ni del directorio actual"""
+    settings = Settings()
+    settings.setmodule('mercado_inmobiliario.settings', priority='project')
+    if overrides:
+        settings.setdict(overrides, priority='cmdline')
+    return settings
+
+
+def iter_filesystem_cache(cache_dir, use_gzip=False):
+    """Fuentes de replay del FilesystemCacheStorage de Scrapy (un directorio por request)"""
+    for dirpath, _, filenames in os.walk(cache_dir):
+        if 'pickled_meta' in filenames and 'response_body' in filenames:
+            yield ('filesystem', dirpath, use_gzip)
+
+
+def iter_sqlite_cache(path, max_age=0):
+    """Fuentes de replay del SqliteCacheStorage (una por fila, leídas en los workers)"""
+    for rowid in httpcache.iter_rowids(path, max_age):
+        yield ('sqlite', path, rowid)
+
+
+def iter_dumps(dump_dir, default_url):
+    """Fuentes de replay de los HTML volcados por el spider y el scraper de Selenium"""
+    for pattern in DUMP_PATTERNS:
+        for path in sorted(glob.glob(os.path.join(dump_dir, pattern))):
+            yield ('dump', path, default_url)
+
+
+def _decode_body(body, headers):
+    encoding = headers.get(b'Content-Encoding', [b''])[-1].lower()
+    if encoding in (b'gzip', b'x-gzip'):
+        return gzip.decompress(body)
+    if encoding == b'deflate':
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    if encoding == b'br':
+        import brotli
+        return brotli.decompress(body)
+    return body
+
+
+def load_source(source):
+    """Convierte una fuente de replay en (url, status, headers, body)"""
+    kind = source[0]
+    if kind == 'filesystem':
+        _, path, use_gzip = source
+        opener = gzip.open if use_gzip else open
+        with opener(os.path.join(path, 'pickled_meta'), 'rb') as f:
+            meta = pickle.load(f)
+        with opener(os.path.join(path, 'response_headers'), 'rb') as f:
+            headers = headers_raw_to_dict(f.read())
+        with opener(os.path.join(path, 'response_body'), 'rb') as f:
+            body = _decode_body(f.read(), headers)
+        headers.pop(b'Content-Encoding', None)
+        return meta.get('response_url', meta['url']), meta['status'], headers, body
+    if kind == 'sqlite':
+        _, path, rowid = source
+        url, status, headers, body = httpcache.read_entry(path, rowid)
+        body = _decode_body(body, headers)
+        headers.pop(b'Content-Encoding', None)
+        return url, status, headers, body
+    if kind == 'dump':
+        _, path, url = source
+        with open(path, 'rb') as f:
+            return url, 200, {}, f.read()
+    raise ValueError(f"Tipo de fuente de replay desconocido: {kind}")
+
+
+def _init_worker(overrides):
+    global _spider
+    from scrapy.crawler import Crawler
+    from mercado_inmobiliario.spiders.zonaprop_spider import ZonapropSpider
+
+    crawler = Crawler(ZonapropSpider, project_settings(overrides))
+    _spider = ZonapropSpider.from_crawler(crawler)
+    # En replay no se sobrescriben los volcados de debug
+    _spider.save_debug_response = False
+
+
+def extract_source(source):
+    """Ejecuta ZonapropSpider.parse sobre una fuente y devuelve los items"""
+    url, status, headers, body = load_source(source)
+    response = HtmlResponse(
+        url=url, status=status, headers=headers, body=body,
+        encoding='utf-8', request=Request(url),
+    )
+    return [dict(result) for result in _spider.parse(response) if not isinstance(result, Request)]
+
+
+def load_pipelines(settings, crawler=None):
+    """Instancia los ITEM_PIPELINES en orden de prioridad"""
+    pipelines = []
+    for path, order in sorted(settings.getdict('ITEM_PIPELINES').items(), key=lambda kv: kv[1]):
+        if order is None:
+            continue
+        cls = load_object(path)
+        if crawler is not None and hasattr(cls, 'from_crawler'):
+            pipelines.append(cls.from_crawler(crawler))
+        else:
+            pipelines.append(cls())
+    return pipelines
+
+
+def replay(sources, workers=None, overrides=None, run_pipelines=True, chunksize=16):
+    """Re-extrae los items de `sources` en paralelo y los pasa por los pipelines"""
+    from scrapy.crawler import Crawler
+    from mercado_inmobiliario.spiders.zonaprop_spider import ZonapropSpider
+
+    settings = project_settings(overrides)
+    crawler = Crawler(ZonapropSpider, settings)
+    # El crawl nunca arranca: los pipelines y el spider usan un collector de stats propio
+    crawler.stats = load_object(settings['STATS_CLASS'])(crawler)
+    spider = ZonapropSpider.from_crawler(crawler)
+    pipelines = load_pipelines(settings, crawler) if run_pipelines else []
+
+    for pipeline in pipelines:
+        if hasattr(pipeline, 'open_spider'):
+            pipeline.open_spider(spider)
+
+    stats = {'pages': 0, 'items': 0, 'dropped': 0}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(overrides,)) as pool:
+        for items in pool.map(extract_source, sources, chunksize=chunksize):
+            stats['pages'] += 1
+            for item in items:
+                stats['items'] += 1
+                try:
+                    for pipeline in pipelines:
+                        item = pipeline.process_item(item, spider)
+                except DropItem as e:
+                    stats['dropped'] += 1
+                    spider.logger.debug(f"Item descartado en replay: {e}")
+
+    for pipeline in pipelines:
+        if hasattr(pipeline, 'close_spider'):
+            pipeline.close_spider(spider)
+
+    stats['elapsed'] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-extrae items desde el HTTP cache sin red')
+    parser.add_argument('--cache-db', default=httpcache.DEFAULT_CACHE_DB, help='archivo del cache SQLite')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='directorio del cache en filesystem')
+    parser.add_argument('--dumps-dir', default='.', help='directorio con debug_response.html / error_page_*.html')
+    parser.add_argument('--workers', type=int, default=None, help='procesos del pool (por defecto: CPUs)')
+    parser.add_argument('--no-pipelines', action='store_true', help='sólo extraer, sin ITEM_PIPELINES')
+    args = parser.parse_args()
+
+    settings = project_settings()
+    from mercado_inmobiliario.spiders.zonaprop_spider import ZonapropSpider
+    sources = []
+    if os.path.exists(args.cache_db):
+        sources += iter_sqlite_cache(args.cache_db)
+    sources += iter_filesystem_cache(args.cache_dir, settings.getbool('HTTPCACHE_GZIP'))
+    sources += list(iter_dumps(args.dumps_dir, ZonapropSpider.start_urls[0]))
+
+    print(f"🔁 Replay de {len(sources)} respuestas guardadas")
+    stats = replay(sources, workers=args.workers, run_pipelines=not args.no_pipelines)
+    print(f"✅ {stats['pages']} páginas, {stats['items']} items ({stats['dropped']} descartados) "
+          f"en {stats['elapsed']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,20 +12,36 @@ ROBOTSTXT_OBEY = False
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 
 # Configure delays
-DOWNLOAD_DELAY = 5  # Aumentado de 3 a 5
-RANDOMIZE_DOWNLOAD_DELAY = True
+# El ritmo lo fija sólo PacingMiddleware (PACING_*): sin DOWNLOAD_DELAY ni AutoThrottle,
+# que se sumarían al token bucket
+DOWNLOAD_DELAY = 0
+RANDOMIZE_DOWNLOAD_DELAY = False
 
 # The download delay setting will honor only one of:
 CONCURRENT_REQUESTS = 16
 CONCURRENT_REQUESTS_PER_DOMAIN = 1
 
 # Configure AutoThrottle
-AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_ENABLED = False
 AUTOTHROTTLE_START_DELAY = 1
 AUTOTHROTTLE_MAX_DELAY = 10
 AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
 AUTOTHROTTLE_DEBUG = False
 
+# Pacing no bloqueante por dominio (ver mercado_inmobiliario/pacing.py): la única capa
+# de delays. Corre después de HttpCacheMiddleware, así que lo servido desde el cache no espera
+PACING_ENABLED = True
+PACING_DOMAIN_RATE = 0.2  # Requests por segundo por dominio (token bucket)
+PACING_DOMAIN_BURST = 1
+PACING_JITTER = 'uniform'  # 'none', 'uniform' o 'exponential'
+PACING_JITTER_RANGE = [0.5, 2.0]
+PACING_PAGE_JITTER_RANGE = [5.0, 10.0]  # Jitter extra antes de cada página siguiente
+
+# Crawl incremental: corta la paginación tras N páginas sólo con avisos ya conocidos
+INCREMENTAL_ENABLED = False  # Activar con: scrapy crawl zonaprop_spider -s INCREMENTAL_ENABLED=True
+INCREMENTAL_INDEX_PATH = 'data/listings_index.db'
+INCREMENTAL_STOP_PAGES = 2
+
 # Enable or disable spider middlewares
 SPIDER_MIDDLEWARES = {
     'mercado_inmobiliario.middlewares.ZonapropSpiderMiddleware': 543,
@@ -36,44 +52,74 @@ DOWNLOADER_MIDDLEWARES = {
     'mercado_inmobiliario.middlewares.ZonapropDownloaderMiddleware': 543,
     'scrapy.downloadermiddlewares.useragent.UserAgentMiddleware': None,
     'mercado_inmobiliario.middlewares.RotateUserAgentMiddleware': 400,
-    'scrapy.downloadermiddlewares.retry.RetryMiddleware': 550,
+    'scrapy.downloadermiddlewares.retry.RetryMiddleware': None,
+    'mercado_inmobiliario.middlewares.RetryWithBackoffMiddleware': 550,
     'scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware': 900,
-    'mercado_inmobiliario.middlewares.DelayMiddleware': 351,
+    'mercado_inmobiliario.middlewares.DelayMiddleware': 351,  # sólo el backoff de los reintentos
+    'mercado_inmobiliario.pacing.PacingMiddleware': 950,
     'scrapy.downloadermiddlewares.cookies.CookiesMiddleware': 700,
 }
 
+# Enable or disable extensions
+EXTENSIONS = {
+    'mercado_inmobiliario.instrumentation.InstrumentationExtension': 500,
+}
+
+# Instrumentación: latencia por middleware/callback/pipeline (ver instrumentation.py)
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_METRICS_FILE = 'logs/metrics.prom'  # formato de texto de Prometheus
+INSTRUMENTATION_EXPORT_INTERVAL = 30  # segundos entre exportaciones (0 = sólo al cerrar)
+INSTRUMENTATION_TOP = 10  # componentes en el resumen final
+
 # Configure item pipelines
 ITEM_PIPELINES = {
-    'mercado_inmobiliario.pipelines.ValidationPipeline': 300,
-    'mercado_inmobiliario.pipelines.CleaningPipeline': 400,
-    'mercado_inmobiliario.pipelines.JsonPipeline': 500,
-    'mercado_inmobiliario.pipelines.CsvPipeline': 600,
+    # Validación + limpieza en una sola pasada
+    'mercado_inmobiliario.pipelines.NormalizationPipeline': 300,
+    # Serializa cada item una vez y lo reparte a EXPORT_SINKS (reemplaza a FEEDS)
+    'mercado_inmobiliario.pipelines.ExportPipeline': 500,
 }
 
-# Configure output
-FEEDS = {
-    'output/propiedades_%(time)s.json': {
-        'format': 'json',
-        'encoding': 'utf8',
-        'store_empty': False,
-        'indent': 2,
-    },
-    'output/propiedades_%(time)s.csv': {
-        'format': 'csv',
-        'encoding': 'utf8',
-        'store_empty': False,
-    },
-}
+# StatsPipeline (no habilitado por defecto): cuantiles en streaming
+STATS_SKETCH_K = 200  # tamaño de cada sketch KLL (error de rango ~1.7/k)
+STATS_PUBLISH_EVERY = 500  # items entre actualizaciones de las stats del crawler
+
+# DuplicatesPipeline (no habilitado por defecto): duplicados entre corridas
+DEDUP_PATH = 'data/dedup.db'
+DEDUP_MEMORY_MB = 16  # memoria del filtro de Bloom (~9M claves con 0.1% de falsos positivos)
+DEDUP_FALSE_POSITIVE_RATE = 0.001
+
+# ExportPipeline: formatos de salida (jsonl, csv, parquet, sqlite) alimentados desde
+# un único buffer de filas
+EXPORT_SINKS = ['jsonl', 'csv', 'parquet', 'sqlite']
+EXPORT_DIR = 'output'
+EXPORT_FLUSH_ITEMS = 500  # lote entregado a los sinks + fsync cada N items...
+EXPORT_FLUSH_SECS = 30  # ...o cada N segundos, lo que ocurra primero
+
+# Sink parquet: output/parquet/barrio=<barrio>/fecha=<YYYY-MM-DD>/part-<timestamp>.parquet
+PARQUET_DIR = 'output/parquet'
+PARQUET_ROW_GROUP_SIZE = 10000  # filas por row group (y máximo en buffer por partición)
+PARQUET_COMPRESSION = 'zstd'
+PARQUET_DICTIONARY_COLUMNS = ['zona']  # texto con pocos valores distintos
+
+# Sink sqlite (un lote de ExportPipeline por transacción, en un hilo dedicado)
+DATABASE_PATH = 'data/zonaprop.db'
 
 # Cache settings
 HTTPCACHE_ENABLED = True
 HTTPCACHE_EXPIRATION_SECS = 3600
 HTTPCACHE_DIR = 'httpcache'
+# Cache en un único archivo SQLite con bodies comprimidos (ver httpcache.py)
+HTTPCACHE_STORAGE = 'mercado_inmobiliario.httpcache.SqliteCacheStorage'
+HTTPCACHE_POLICY = 'mercado_inmobiliario.httpcache.RevalidationPolicy'
+HTTPCACHE_SQLITE_MAX_AGE = 7 * 24 * 3600  # Más viejas no se usan ni para revalidar
+HTTPCACHE_SQLITE_COMPRESSION = 6  # Nivel de zlib (0 = sin comprimir)
 
 # Retry settings - Incluye código 403 para reintentar
 RETRY_ENABLED = True
 RETRY_TIMES = 5  # Aumentado de 3 a 5
 RETRY_HTTP_CODES = [403, 429, 500, 502, 503, 504, 408]  # Agregado 403
+RETRY_BACKOFF_BASE = 2  # Delay del reintento n: base ** n segundos (sin bloquear el reactor)
+RETRY_BACKOFF_MAX = 60
 
 # Log settings
 LOG_LEVEL = 'DEBUG'
@@ -106,8 +152,8 @@ DUPEFILTER_DEBUG = True
 # Configuraciones específicas para el spider ZonaProp
 # (trasladadas desde custom_settings del spider)
 ZONAPROP_SPIDER_SETTINGS = {
-    'DOWNLOAD_DELAY': 7,
-    'RANDOMIZE_DOWNLOAD_DELAY': True,
+    'DOWNLOAD_DELAY': 0,  # el pacing lo aplica PacingMiddleware
+    'RANDOMIZE_DOWNLOAD_DELAY': False,
     'CONCURRENT_REQUESTS': 1,
     'CONCURRENT_REQUESTS_PER_DOMAIN': 1,
     'HTTPCACHE_ENABLED': False,
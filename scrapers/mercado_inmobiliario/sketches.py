@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Estadísticas en streaming con memoria constante para StatsPipeline.
+
+- ``RunningMoments``: cantidad, media, varianza (Welford), mínimo y máximo.
+- ``KLLSketch``: sketch de cuantiles KLL; ocupa O(k) valores sin importar
+  cuántos se agreguen y dos sketches se pueden combinar con ``merge``.
+- ``PropertyStats``: las métricas de las propiedades (precio, expensas,
+  superficie, precio por m²) con cortes por zona y por ambientes.
+
+Los reportes JSON de crawls en paralelo se combinan con::
+
+    python -m mercado_inmobiliario.sketches merge output/estadisticas_*.json -o total.json
+"""
+
+import argparse
+import json
+import math
+import random
+
+from mercado_inmobiliario.store import barrio_from_zona
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+METRICS = ('precio_alquiler', 'expensas', 'superficie', 'precio_m2')
+
+
+class RunningMoments:
+    """Media y varianza incrementales (Welford), combinables (Chan et al.)"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+
+    def merge(self, other):
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2, self.min, self.max = (
+                other.count, other.mean, other.m2, other.min, other.max)
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        moments = cls()
+        moments.count, moments.mean, moments.m2 = data['count'], data['mean'], data['m2']
+        moments.min, moments.max = data['min'], data['max']
+        return moments
+
+
+class KLLSketch:
+    """Sketch de cuantiles KLL (Karnin, Lang, Liberty 2016)
+
+    Cada nivel h guarda valores con peso 2**h; cuando un nivel se llena se
+    ordena y la mitad de sus valores (pares o impares, al azar) sube al
+    siguiente. La capacidad decrece geométricamente hacia los niveles bajos.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = []
+        self.size = 0
+        self.max_size = 0
+        self._rng = random.Random(seed)
+        self._grow()
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _grow(self):
+        self.levels.append([])
+        self.max_size = sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def update(self, value):
+        self.levels[0].append(value)
+        self.n += 1
+        self.size += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def _compress(self):
+        for h in range(len(self.levels)):
+            level = self.levels[h]
+            if len(level) < self._capacity(h):
+                continue
+            if h + 1 >= len(self.levels):
+                self._grow()
+            level.sort()
+            # Si el largo es impar, el último valor se queda en este nivel
+            keep = level.pop() if len(level) % 2 else None
+            self.levels[h + 1].extend(level[self._rng.random() < 0.5::2])
+            level.clear()
+            if keep is not None:
+                level.append(keep)
+            self.size = sum(len(values) for values in self.levels)
+            if self.size < self.max_size:
+                break
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for h, values in enumerate(other.levels):
+            self.levels[h].extend(values)
+        self.n += other.n
+        self.size = sum(len(values) for values in self.levels)
+        while self.size >= self.max_size:
+            self._compress()
+
+    def quantiles(self, qs=QUANTILES):
+        """Cuantiles aproximados {q: valor} (vacío si no hay datos)"""
+        weighted = sorted((value, 1 << h) for h, values in enumerate(self.levels) for value in values)
+        if not weighted:
+            return {}
+        total = sum(weight for _, weight in weighted)
+        result = {}
+        cumulative = 0
+        i = 0
+        for q in sorted(qs):
+            target = q * total
+            while i < len(weighted) - 1 and cumulative + weighted[i][1] <= target:
+                cumulative += weighted[i][1]
+                i += 1
+            result[q] = weighted[i][0]
+        return result
+
+    def to_dict(self):
+        return {'k': self.k, 'n': self.n, 'levels': self.levels}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'])
+        sketch.n = data['n']
+        sketch.levels = [list(values) for values in data['levels']]
+        sketch.max_size = sum(sketch._capacity(h) for h in range(len(sketch.levels)))
+        sketch.size = sum(len(values) for values in sketch.levels)
+        return sketch
+
+
+class MetricSet:
+    """Momentos + sketch de cuantiles para cada métrica de METRICS
+
+    ``items`` cuenta todos los items del grupo, tengan o no cada métrica.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.items = 0
+        self.moments = {metric: RunningMoments() for metric in METRICS}
+        self.sketches = {metric: KLLSketch(k) for metric in METRICS}
+
+    def update(self, values):
+        self.items += 1
+        for metric, value in values.items():
+            self.moments[metric].update(value)
+            self.sketches[metric].update(value)
+
+    def merge(self, other):
+        self.items += other.items
+        for metric in METRICS:
+            self.moments[metric].merge(other.moments[metric])
+            self.sketches[metric].merge(other.sketches[metric])
+
+    def summary(self):
+        result = {}
+        for metric in METRICS:
+            moments = self.moments[metric]
+            if not moments.count:
+                continue
+            result[metric] = {
+                'count': moments.count,
+                'mean': moments.mean,
+                'std': moments.std,
+                'min': moments.min,
+                'max': moments.max,
+                **{f'p{round(q * 100)}': v for q, v in self.sketches[metric].quantiles().items()},
+            }
+        return result
+
+    def to_dict(self):
+        return {
+            'items': self.items,
+            'moments': {m: self.moments[m].to_dict() for m in METRICS},
+            'sketches': {m: self.sketches[m].to_dict() for m in METRICS},
+        }
+
+    @classmethod
+    def from_dict(cls, data, k=200):
+        metric_set = cls(k)
+        metric_set.moments = {m: RunningMoments.from_dict(data['moments'][m]) for m in METRICS}
+        metric_set.sketches = {m: KLLSketch.from_dict(data['sketches'][m]) for m in METRICS}
+        # Estados guardados antes de contar items: la métrica con más valores es la mejor cota
+        metric_set.items = data.get('items', max(moments.count for moments in metric_set.moments.values()))
+        return metric_set
+
+
+def item_metrics(item):
+    """Valores numéricos de una propiedad para METRICS (sólo los presentes)"""
+    values = {}
+    for field in ('precio_alquiler', 'expensas', 'superficie'):
+        value = item.get(field)
+        if value:
+            values[field] = value
+    if values.get('precio_alquiler') and values.get('superficie'):
+        values['precio_m2'] = values['precio_alquiler'] / values['superficie']
+    return values
+
+
+class PropertyStats:
+    """Estadísticas globales y por zona (barrio) / ambientes, con memoria constante"""
+
+    def __init__(self, k=200):
+        self.k = k
+        self.items = 0
+        self.total = MetricSet(k)
+        self.breakdowns = {'zona': {}, 'ambientes': {}}
+
+    def update(self, item):
+        self.items += 1
+        values = item_metrics(item)
+        self.total.update(values)
+        for field, groups in self.breakdowns.items():
+            value = item.get(field)
+            if field == 'zona':
+                # 'Flores-pagina-2' -> 'Flores': los cortes no crecen con las páginas
+                value = barrio_from_zona(value)
+            key = str(value or f'Sin {field}')
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = MetricSet(self.k)
+            group.update(values)
+
+    def merge(self, other):
+        self.items += other.items
+        self.total.merge(other.total)
+        for field, groups in other.breakdowns.items():
+            for key, group in groups.items():
+                mine = self.breakdowns[field].setdefault(key, MetricSet(self.k))
+                mine.merge(group)
+
+    def summary(self):
+        return {
+            'items': self.items,
+            'total': self.total.summary(),
+            **{
+                f'por_{field}': {key: group.summary() for key, group in sorted(groups.items())}
+                for field, groups in self.breakdowns.items()
+            },
+        }
+
+    def to_dict(self):
+        """Resumen legible + estado serializado (para combinar crawls)"""
+        return {
+            'summary': self.summary(),
+            'state': {
+                'k': self.k,
+                'items': self.items,
+                'total': self.total.to_dict(),
+                'breakdowns': {
+                    field: {key: group.to_dict() for key, group in groups.items()}
+                    for field, groups in self.breakdowns.items()
+                },
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = data['state']
+        stats = cls(state['k'])
+        stats.items = state['items']
+        stats.total = MetricSet.from_dict(state['total'], stats.k)
+        stats.breakdowns = {
+            field: {key: MetricSet.from_dict(group, stats.k) for key, group in groups.items()}
+            for field, groups in state['breakdowns'].items()
+        }
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Combina reportes de estadísticas de varios crawls')
+    commands = parser.add_subparsers(dest='command', required=True)
+    merge_cmd = commands.add_parser('merge')
+    merge_cmd.add_argument('reports', nargs='+')
+    merge_cmd.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+
+    merged = None
+    for path in args.reports:
+        with open(path, encoding='utf-8') as f:
+            stats = PropertyStats.from_dict(json.load(f))
+        if merged is None:
+            merged = stats
+        else:
+            merged.merge(stats)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(merged.to_dict(), f, ensure_ascii=False, indent=2)
+    print(f"✅ {len(args.reports)} reportes combinados ({merged.items} propiedades) en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Almacenamiento normalizado de propiedades en SQLite, indexado por ID de aviso.
+
+- ``propiedades``: estado actual de cada aviso (una fila por listing_id).
+- ``historial_precios``: historial append-only de precio/expensas con rangos
+  ``valid_from`` / ``valid_to`` (``valid_to`` NULL = valor vigente). Sólo se
+  agrega una fila cuando el precio o las expensas cambian.
+
+Los índices cubren las consultas habituales: por barrio, por ambientes, por
+fecha y la evolución de precios de un aviso.
+"""
+
+import hashlib
+import re
+import sqlite3
+from datetime import datetime
+
+from mercado_inmobiliario.listing_index import listing_id
+
+FIELDS = (
+    'precio_alquiler', 'expensas', 'precio_total', 'direccion', 'zona', 'superficie',
+    'ambientes', 'habitaciones', 'banos', 'descripcion', 'url', 'scraped_at',
+)
+
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-20000',
+    'PRAGMA busy_timeout=5000',
+)
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS propiedades (
+        listing_id INTEGER PRIMARY KEY,
+        precio_alquiler INTEGER,
+        expensas INTEGER,
+        precio_total INTEGER,
+        direccion TEXT,
+        zona TEXT,
+        barrio TEXT,
+        superficie INTEGER,
+        ambientes INTEGER,
+        habitaciones INTEGER,
+        banos INTEGER,
+        descripcion TEXT,
+        url TEXT,
+        first_seen TEXT NOT NULL,
+        scraped_at TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS historial_precios (
+        listing_id INTEGER NOT NULL,
+        precio_alquiler INTEGER,
+        expensas INTEGER,
+        valid_from TEXT NOT NULL,
+        valid_to TEXT,
+        PRIMARY KEY (listing_id, valid_from)
+    ) WITHOUT ROWID
+    ''',
+    # Índices cubrientes: mediana por barrio/ambientes sin leer la tabla
+    'CREATE INDEX IF NOT EXISTS idx_propiedades_barrio ON propiedades (barrio, precio_alquiler)',
+    'CREATE INDEX IF NOT EXISTS idx_propiedades_ambientes ON propiedades (ambientes, precio_alquiler)',
+    'CREATE INDEX IF NOT EXISTS idx_propiedades_scraped_at ON propiedades (scraped_at)',
+)
+
+PAGINA_SUFFIX_RE = re.compile(r'-pagina-\d+$', re.IGNORECASE)
+
+# Máximo de parámetros por consulta IN (...)
+_CHUNK = 500
+
+
+def barrio_from_zona(zona):
+    """Barrio a partir de la zona del spider ('Flores-Pagina-2' -> 'Flores')"""
+    return PAGINA_SUFFIX_RE.sub('', zona) if zona else None
+
+
+def fallback_id(direccion):
+    """ID negativo y estable para avisos sin ID en la URL (no choca con los de ZonaProp)"""
+    normalized = ' '.join((direccion or '').lower().split())
+    return -int.from_bytes(hashlib.blake2b(normalized.encode('utf-8'), digest_size=7).digest(), 'big')
+
+
+def listing_key(row):
+    """listing_id de una fila (dict con url y direccion)"""
+    return listing_id(row.get('url')) or fallback_id(row.get('direccion'))
+
+
+class PropertyStore:
+    """Propiedades actuales + historial de precios en una base SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        for pragma in PRAGMAS:
+            self.connection.execute(pragma)
+        self._migrate_legacy()
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+    def _migrate_legacy(self):
+        """Renombra la tabla previa (única por dirección + precio) a propiedades_legacy"""
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(propiedades)')]
+        if columns and 'listing_id' not in columns:
+            self.connection.execute('ALTER TABLE propiedades RENAME TO propiedades_legacy')
+
+    def upsert(self, rows):
+        """Inserta/actualiza un lote de filas (dicts con FIELDS) en una transacción.
+
+        Devuelve la cantidad de filas de historial agregadas.
+        """
+        latest = {}
+        for row in rows:
+            # Dentro del lote gana la última versión de cada aviso
+            latest[listing_key(row)] = row
+        if not latest:
+            return 0
+
+        ids = list(latest)
+        previous = {}
+        for i in range(0, len(ids), _CHUNK):
+            chunk = ids[i:i + _CHUNK]
+            previous.update(
+                (row[0], row[1:]) for row in self.connection.execute(
+                    f'SELECT listing_id, precio_alquiler, expensas FROM propiedades '
+                    f'WHERE listing_id IN ({",".join("?" * len(chunk))})',
+                    chunk,
+                )
+            )
+
+        now = datetime.now().isoformat()
+        current_rows = []
+        closed = []
+        opened = []
+        for key, row in latest.items():
+            scraped_at = row.get('scraped_at') or now
+            current_rows.append((
+                key, row['precio_alquiler'], row['expensas'], row['precio_total'], row['direccion'],
+                row['zona'], barrio_from_zona(row['zona']), row['superficie'], row['ambientes'],
+                row['habitaciones'], row['banos'], row['descripcion'], row['url'], scraped_at, scraped_at,
+            ))
+            prices = (row['precio_alquiler'], row['expensas'])
+            old = previous.get(key)
+            if old == prices:
+                continue
+            if old is not None:
+                closed.append((scraped_at, key))
+            opened.append((key, *prices, scraped_at))
+
+        with self.connection:
+            self.connection.executemany(
+                'UPDATE historial_precios SET valid_to = ? WHERE listing_id = ? AND valid_to IS NULL',
+                closed,
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO historial_precios (listing_id, precio_alquiler, expensas, valid_from) '
+                'VALUES (?, ?, ?, ?)',
+                opened,
+            )
+            self.connection.executemany('''
+                INSERT INTO propiedades (
+                    listing_id, precio_alquiler, expensas, precio_total, direccion, zona, barrio,
+                    superficie, ambientes, habitaciones, banos, descripcion, url, first_seen, scraped_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(listing_id) DO UPDATE SET
+                    precio_alquiler = excluded.precio_alquiler,
+                    expensas = excluded.expensas,
+                    precio_total = excluded.precio_total,
+                    direccion = excluded.direccion,
+                    zona = excluded.zona,
+                    barrio = excluded.barrio,
+                    superficie = excluded.superficie,
+                    ambientes = excluded.ambientes,
+                    habitaciones = excluded.habitaciones,
+                    banos = excluded.banos,
+                    descripcion = excluded.descripcion,
+                    url = excluded.url,
+                    scraped_at = excluded.scraped_at
+            ''', current_rows)
+        return len(opened)
+
+    def price_history(self, listing_id):
+        """Evolución de precio/expensas de un aviso (búsqueda por clave primaria)"""
+        return self.connection.execute(
+            'SELECT precio_alquiler, expensas, valid_from, valid_to FROM historial_precios '
+            'WHERE listing_id = ? ORDER BY valid_from',
+            (listing_id,),
+        ).fetchall()
+
+    def median_by(self, column):
+        """Mediana actual de precio_alquiler por barrio o ambientes, usando su índice"""
+        if column not in ('barrio', 'ambientes'):
+            raise ValueError(f"Sin índice para la mediana por {column}")
+        counts = self.connection.execute(
+            f'SELECT {column}, COUNT(precio_alquiler) FROM propiedades '
+            f'WHERE precio_alquiler IS NOT NULL GROUP BY {column}'
+        ).fetchall()
+        medians = {}
+        for value, count in counts:
+            # Uno o dos saltos por OFFSET sobre el índice (valor, precio_alquiler)
+            middle = self.connection.execute(
+                f'SELECT precio_alquiler FROM propiedades WHERE {column} IS ? AND precio_alquiler IS NOT NULL '
+                f'ORDER BY precio_alquiler LIMIT ? OFFSET ?',
+                (value, 2 - count % 2, (count - 1) // 2),
+            ).fetchall()
+            medians[value] = sum(price for price, in middle) / len(middle)
+        return medians
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
@@ -4,20 +4,23 @@ Script para extraer datos de ZonaProp usando Selenium con configuración avanzad
 """
 
 import os
+import sys
 import time
 import random
-import re
 import json
 import csv
 from datetime import datetime
-from urllib.parse import urljoin
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from selenium.common.exceptions import WebDriverException
+
+# Motor de extracción compartido con el spider de Scrapy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scrapers'))
+from mercado_inmobiliario import extraction
 
 def create_directories():
     """Crear directorios necesarios"""
@@ -84,162 +87,10 @@ def scrape_property(property_element, driver):
         driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", property_element)
         time.sleep(random.uniform(0.5, 1.0))
         
-        # Precio de alquiler - usando los mismos selectores del spider
-        price_selectors = [
-            'div.postingCard-module__price-container div:first-child',
-            'div[data-qa="POSTING_CARD_PRICE"]',
-            'div.price-data',
-            'div.postingPrice'
-        ]
-        
-        price_element = None
-        for selector in price_selectors:
-            try:
-                price_element = property_element.find_element(By.CSS_SELECTOR, selector).text
-                if price_element:
-                    break
-            except NoSuchElementException:
-                continue
-        
-        if price_element:
-            # Limpia el precio (remueve $ y puntos)
-            price_clean = re.sub(r'[^\d]', '', price_element)
-            item['precio_alquiler'] = int(price_clean) if price_clean else None
-        else:
-            item['precio_alquiler'] = None
-            
-        # Expensas - usando los mismos selectores del spider
-        expense_selectors = [
-            'div.postingCard-module__price-container div:nth-child(2)',
-            'div[data-qa="expensas"]',
-            'div.expensas',
-            'span.postingCardExpenses'
-        ]
-        
-        expenses_element = None
-        for selector in expense_selectors:
-            try:
-                expenses_element = property_element.find_element(By.CSS_SELECTOR, selector).text
-                if expenses_element and ('expensa' in expenses_element.lower() or '$' in expenses_element):
-                    break
-            except NoSuchElementException:
-                continue
-                
-        if expenses_element:
-            expenses_clean = re.sub(r'[^\d]', '', expenses_element)
-            item['expensas'] = int(expenses_clean) if expenses_clean else None
-        else:
-            item['expensas'] = None
-        
-        # Dirección - usando los mismos selectores del spider
-        address_selectors = [
-            'div.postingCard-module__posting-container div.postingCard-module__posting-top div:nth-child(1) div:nth-child(2) div div',
-            'div.postingCard-module__location',
-            'div[data-qa="POSTING_CARD_LOCATION"]'
-        ]
-        
-        address_element = None
-        for selector in address_selectors:
-            try:
-                address_element = property_element.find_element(By.CSS_SELECTOR, selector).text
-                if address_element:
-                    break
-            except NoSuchElementException:
-                continue
-        
-        item['direccion'] = address_element.strip() if address_element else None
-        
-        # Extracción de barrio/zona de la URL actual o de la dirección
-        current_url = driver.current_url
-        barrio_match = re.search(r'-alquiler-([^\.]+)\.html', current_url)
-        item['zona'] = barrio_match.group(1).capitalize() if barrio_match else 'Flores'
-        
-        # Características de la propiedad (superficie, ambientes, habitaciones, baños)
-        # Usando la misma lógica mejorada del spider
-        feature_container_selectors = [
-            'div.postingCard-module__posting-container div.postingCard-module__posting-top div.postingCard-module__posting-card-row h3',
-            'h3[data-qa="POSTING_CARD_FEATURES"]'
-        ]
-        
-        feature_container = None
-        for selector in feature_container_selectors:
-            try:
-                feature_container = property_element.find_element(By.CSS_SELECTOR, selector)
-                if feature_container:
-                    break
-            except NoSuchElementException:
-                continue
-        
-        # Inicializar valores por defecto
-        item['superficie'] = None
-        item['ambientes'] = None
-        item['habitaciones'] = None
-        item['banos'] = None
-        
-        # Si encontramos el contenedor, extraemos los spans
-        if feature_container:
-            # Extraer todos los spans dentro del h3
-            feature_spans = feature_container.find_elements(By.CSS_SELECTOR, 'span')
-            feature_texts = [span.text.strip() for span in feature_spans if span.text.strip()]
-            
-            # Procesar cada característica encontrada
-            for feature in feature_texts:
-                feature_clean = feature.strip()
-                
-                # Superficie (m²)
-                if 'm²' in feature_clean:
-                    surface_match = re.search(r'(\d+)', feature_clean)
-                    item['superficie'] = int(surface_match.group(1)) if surface_match else None
-                
-                # Ambientes
-                elif 'amb' in feature_clean.lower():
-                    amb_match = re.search(r'(\d+)', feature_clean)
-                    ambientes = int(amb_match.group(1)) if amb_match else None
-                    item['ambientes'] = ambientes
-                    
-                    # Si ambientes = 1, entonces habitaciones = 0
-                    if ambientes == 1:
-                        item['habitaciones'] = 0
-                
-                # Habitaciones/Dormitorios
-                elif 'dorm' in feature_clean.lower() or 'hab' in feature_clean.lower():
-                    hab_match = re.search(r'(\d+)', feature_clean)
-                    item['habitaciones'] = int(hab_match.group(1)) if hab_match else None
-                
-                # Baños
-                elif 'baño' in feature_clean.lower():
-                    bath_match = re.search(r'(\d+)', feature_clean)
-                    item['banos'] = int(bath_match.group(1)) if bath_match else None
-        
-        # Descripción/Título - usando los mismos selectores del spider
-        description_selectors = [
-            'div.postingCard-module__posting-container div.postingCard-module__posting-top h3 a',
-            'h3[data-qa="POSTING_CARD_TITLE"] a',
-            'h3 a'
-        ]
-        
-        description_element = None
-        for selector in description_selectors:
-            try:
-                description_element = property_element.find_element(By.CSS_SELECTOR, selector).text
-                if description_element:
-                    break
-            except NoSuchElementException:
-                continue
-        
-        item['descripcion'] = description_element.strip() if description_element else None
-        
-        # URL de la propiedad - usando los mismos selectores que para la descripción
-        property_url = None
-        for selector in description_selectors:
-            try:
-                property_url = property_element.find_element(By.CSS_SELECTOR, selector).get_attribute('href')
-                if property_url:
-                    break
-            except NoSuchElementException:
-                continue
-        
-        item['url'] = property_url
+        # Extracción compartida con el spider: se toma el HTML de la tarjeta una
+        # sola vez y se procesa con lxml en lugar de consultar cada selector al navegador
+        card_html = property_element.get_attribute('outerHTML')
+        item = extraction.extract_card_html(card_html, driver.current_url)
         
         # Timestamp
         item['scraped_at'] = datetime.now().isoformat()